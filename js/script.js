@@ -17,6 +17,12 @@ document.addEventListener('DOMContentLoaded', () => {
   const exportSection = document.getElementById('export-section');
   const exportCsvBtn = document.getElementById('export-csv');
   const exportJsonBtn = document.getElementById('export-json');
+  const sendLocalBtn = document.getElementById('send-local');
+  const localStatus = document.getElementById('local-status');
+  
+  // Servicio de análisis local (python -m analisis_simulaciones servir)
+  const LOCAL_ANALYZER_URL = 'http://127.0.0.1:8765';
+  const LOCAL_SESSION = 'navegador';
   
   // Elementos para análisis avanzado
   const tabBtns = document.querySelectorAll('.tab-btn');
@@ -58,6 +64,9 @@ document.addEventListener('DOMContentLoaded', () => {
   // Exportación
   exportCsvBtn.addEventListener('click', exportToCSV);
   exportJsonBtn.addEventListener('click', exportToJSON);
+  if (sendLocalBtn) {
+    sendLocalBtn.addEventListener('click', sendToLocalAnalyzer);
+  }
   
   // Descarga de script Python
   if (downloadPythonBtn) {
@@ -162,15 +171,12 @@ document.addEventListener('DOMContentLoaded', () => {
     );
   }
   
-  // Exportar como JSON
-  function exportToJSON() {
-    if (!lastSimulation) return;
-    
+  // Datos de la exportación JSON (también los que recibe el analizador local)
+  function buildExportData() {
     const date = new Date(lastSimulation.timestamp);
     const formattedDate = date.toLocaleDateString('es-ES');
     
-    // Preparar datos para exportar
-    const exportData = {
+    return {
       tipo: "Simulación Educativa Diabetes Tipo 2",
       fecha: formattedDate,
       hora: date.toLocaleTimeString('es-ES', { hour: '2-digit', minute: '2-digit' }),
@@ -188,6 +194,14 @@ document.addEventListener('DOMContentLoaded', () => {
       recomendaciones: generarRecomendaciones(lastSimulation),
       notas: "Esta simulación es educativa. Consulta siempre con tu médico para tu manejo personalizado."
     };
+  }
+  
+  // Exportar como JSON
+  function exportToJSON() {
+    if (!lastSimulation) return;
+    
+    const exportData = buildExportData();
+    const formattedDate = exportData.fecha;
     
     // Convertir a JSON formateado
     const jsonContent = JSON.stringify(exportData, null, 2);
@@ -200,6 +214,39 @@ document.addEventListener('DOMContentLoaded', () => {
     );
   }
   
+  // Enviar la simulación al analizador local (sin descargar archivos)
+  async function sendToLocalAnalyzer() {
+    if (!lastSimulation) return;
+    
+    localStatus.textContent = '⏳ Enviando al analizador local...';
+    let response;
+    try {
+      response = await fetch(`${LOCAL_ANALYZER_URL}/simulaciones?sesion=${LOCAL_SESSION}`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(buildExportData())
+      });
+    } catch (error) {
+      // Sin respuesta: el analizador no está en marcha (o no es accesible)
+      localStatus.textContent = '⚠️ No se pudo contactar con el analizador local. Arráncalo con: ' +
+        'python -m analisis_simulaciones servir';
+      return;
+    }
+    
+    try {
+      const summary = await response.json();
+      if (!response.ok) throw new Error(summary.error || `error ${response.status}`);
+      
+      const reportUrl = `${LOCAL_ANALYZER_URL}/informe?sesion=${LOCAL_SESSION}`;
+      localStatus.innerHTML = `✅ ${summary.simulaciones} simulaciones en el analizador · ` +
+        `glucosa media ${summary.medias.glucosa.toFixed(1)} mg/dL · ` +
+        `<a href="${reportUrl}" target="_blank" rel="noopener">Ver informe</a>`;
+    } catch (error) {
+      // El analizador respondió pero rechazó el envío: se muestra su mensaje
+      localStatus.textContent = `⚠️ El analizador local no aceptó la simulación: ${error.message}`;
+    }
+  }
+  
   // Función genérica para descargar archivos
   function downloadFile(content, filename, mimeType) {
     const blob = new Blob([content], { type: mimeType });
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos de tools/ se importan por su nombre, como al ejecutarlos desde esa carpeta
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools"))
@@ -0,0 +1,44 @@
+import sys
+import types
+
+import pytest
+
+
+class _Widget:
+    """Widget de Tkinter simulado: acepta cualquier llamada y devuelve 0"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, nombre):
+        return lambda *args, **kwargs: 0
+
+
+class _Modulo(types.ModuleType):
+    def __getattr__(self, nombre):
+        return _Widget
+
+
+@pytest.fixture
+def tkinter_simulado(monkeypatch):
+    """Sustituye tkinter para construir la ventana sin pantalla"""
+    tkinter = _Modulo("tkinter")
+    tkinter.__path__ = []
+    monkeypatch.setitem(sys.modules, "tkinter", tkinter)
+    for nombre in ("ttk", "filedialog", "messagebox", "font"):
+        submodulo = _Modulo("tkinter." + nombre)
+        setattr(tkinter, nombre, submodulo)
+        monkeypatch.setitem(sys.modules, submodulo.__name__, submodulo)
+    tkinter.font.BOLD = "bold"
+    # interfaz y lista_archivos se importan de nuevo con el tkinter simulado
+    for modulo in ("interfaz", "lista_archivos"):
+        monkeypatch.delitem(sys.modules, modulo, raising=False)
+    return tkinter
+
+
+def test_la_ventana_se_construye(tkinter_simulado):
+    import interfaz
+
+    app = interfaz.AnalizadorDiabetesApp(tkinter_simulado.Tk())
+    app.limpiar_seleccion()
+    assert app.archivos_seleccionados == [] and app._seleccion == 1
@@ -0,0 +1,15 @@
+import pytest
+
+import servidor
+
+
+@pytest.mark.parametrize("nombre", ["<img src=x onerror=alert(1)>", "", "x" * 65, "a/b"])
+def test_nombre_de_sesion_no_valido(nombre):
+    with pytest.raises(servidor.PeticionIncorrecta) as error:
+        servidor.ServicioAnalisis().atender("GET", "/informe", {"sesion": [nombre]})
+    assert error.value.estado == 400
+
+
+def test_nombre_de_sesion_valido():
+    estado, _, _ = servidor.ServicioAnalisis().atender("DELETE", "/simulaciones", {"sesion": ["paciente-1.a_b"]})
+    assert estado == 404
@@ -0,0 +1,44 @@
+import os
+
+import informe
+import vigilancia
+
+CABECERA = "Fecha,Hora,Hidratos (g),Caminata (min),Sueño (h),Glucosa (mg/dL),Efecto HC,Efecto Caminar,Efecto Sueño\n"
+ANTIGUO_NS = 1_000_000_000 * 10**9  # mtime muy anterior: el archivo ya se considera estable
+
+
+def _exportar(ruta, glucosa):
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(CABECERA + f"23/11/2025,08:30,50,20,7,{glucosa},+60,-16,0 por sueño óptimo\n")
+    os.utime(ruta, ns=(ANTIGUO_NS, ANTIGUO_NS))
+
+
+def _vigilante(raiz, salida):
+    return vigilancia.Vigilante([raiz], salida, espera=3600, modo_informe=informe.MODO_INTERACTIVO)
+
+
+def test_reinicio_tras_guardar_otro_grupo_no_pierde_filas(tmp_path):
+    raiz, salida = tmp_path / "exportaciones", tmp_path / "informes"
+    carpeta_a, carpeta_b = raiz / "a", raiz / "b"
+    carpeta_a.mkdir(parents=True)
+    carpeta_b.mkdir()
+    _exportar(carpeta_a / "a1.csv", 100)
+    _exportar(carpeta_b / "b1.csv", 110)
+
+    vigilante = _vigilante(str(raiz), str(salida))
+    vigilante.procesar_pendiente()
+
+    # a2 entra en el grupo a, que sigue dentro de `espera`; el grupo b se
+    # reconstruye y guarda el estado. El proceso muere sin el guardado final.
+    _exportar(carpeta_a / "a2.csv", 120)
+    _exportar(carpeta_b / "b1.csv", 1300)
+    vigilante.ciclo(completo=True)
+    grupo_a = vigilante.grupos[str(carpeta_a)]
+    assert grupo_a.pendiente and grupo_a.resumen.filas == 2
+
+    reiniciado = _vigilante(str(raiz), str(salida))
+    reiniciado.procesar_pendiente()
+    grupo_a = reiniciado.grupos[str(carpeta_a)]
+    assert sorted(os.path.basename(ruta) for ruta in grupo_a.firmas) == ["a1.csv", "a2.csv"]
+    assert grupo_a.resumen.filas == 2
+    assert reiniciado.grupos[str(carpeta_b)].resumen.filas == 1
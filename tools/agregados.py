@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Agregación en streaming para archivos mayores que la memoria
+============================================================
+
+En lugar de concatenar todas las simulaciones en un DataFrame y calcular
+`df[...].mean()`, aquí las entradas se leen por bloques mediante generadores
+y se acumulan en estadísticos combinables:
+
+- número de valores, suma, mínimo y máximo
+- media y varianza con el algoritmo de Welford (combinación de Chan para
+  unir bloques o acumuladores de distintos procesos)
+- recuento por bandas de glucosa con los umbrales de 80 y 140 mg/dL
+
+Para el gráfico de tendencia se conservan, por tramos de tiempo, las filas
+con la glucosa mínima y máxima (`ExtremosTendencia`): un número acotado de
+puntos, así que la memoria máxima no crece con el tamaño del archivo, y
+ninguna excursión fuera de 80-140 mg/dL desaparece del gráfico.
+El perfil de glucosa (`perfil.PerfilGlucosa`) son histogramas que también
+se suman bloque a bloque.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import ingesta
+import compacto
+
+UMBRAL_BAJO = 80
+UMBRAL_ALTO = 140
+FILAS_POR_BLOQUE = 50_000
+TAMANO_MUESTRA = 5_000  # Puntos de la tendencia: extremos de TAMANO_MUESTRA / 2 tramos y excursiones
+ANCHO_TRAMO_NS = 60 * 10**9  # Ancho inicial de los tramos de la tendencia (un minuto)
+TAMANO_ARCHIVO_GRANDE = 1 << 20  # Más de 1 MiB: se lee por trozos con pandas
+BYTES_POR_LOTE = 8 * TAMANO_ARCHIVO_GRANDE  # Tope de bytes de un lote de archivos pequeños
+
+# Columna del DataFrame -> clave en las estadísticas del informe
+COLUMNAS_RESUMEN = {
+    "Glucosa (mg/dL)": "glucosa",
+    "Hidratos (g)": "hidratos",
+    "Caminata (min)": "caminata",
+    "Sueño (h)": "sueño",
+}
+
+
+class Acumulador:
+    """Estadísticos combinables de una columna numérica"""
+
+    def __init__(self, bandas=False):
+        self.n = 0
+        self.suma = 0.0
+        self.minimo = float("inf")
+        self.maximo = float("-inf")
+        self.media = 0.0
+        self.m2 = 0.0
+        self.bandas = {"bajo": 0, "rango": 0, "alto": 0} if bandas else None
+
+    def actualizar(self, valores):
+        """Incorpora un bloque de valores (los NaN se ignoran)"""
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        if valores.size == 0:
+            return
+
+        bloque = Acumulador(bandas=self.bandas is not None)
+        bloque.n = int(valores.size)
+        bloque.suma = float(valores.sum())
+        bloque.minimo = float(valores.min())
+        bloque.maximo = float(valores.max())
+        bloque.media = bloque.suma / bloque.n
+        bloque.m2 = float(((valores - bloque.media) ** 2).sum())
+        if bloque.bandas is not None:
+            bajo = int(np.count_nonzero(valores < UMBRAL_BAJO))
+            alto = int(np.count_nonzero(valores > UMBRAL_ALTO))
+            bloque.bandas = {"bajo": bajo, "rango": bloque.n - bajo - alto, "alto": alto}
+        self.combinar(bloque)
+
+    def combinar(self, otro):
+        """Une otro acumulador a este (fórmula de Chan para la varianza)"""
+        if otro.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.suma, self.media, self.m2 = otro.n, otro.suma, otro.media, otro.m2
+        else:
+            n = self.n + otro.n
+            delta = otro.media - self.media
+            self.media += delta * otro.n / n
+            self.m2 += otro.m2 + delta * delta * self.n * otro.n / n
+            self.suma += otro.suma
+            self.n = n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        if self.bandas is not None and otro.bandas is not None:
+            for banda, cuenta in otro.bandas.items():
+                self.bandas[banda] += cuenta
+        return self
+
+    @property
+    def varianza(self):
+        """Varianza muestral (ddof=1, como pandas)"""
+        return self.m2 / (self.n - 1) if self.n > 1 else float("nan")
+
+    @property
+    def desviacion(self):
+        return float(np.sqrt(self.varianza))
+
+    def a_dict(self):
+        """Estado serializable (JSON) del acumulador"""
+        return {"n": self.n, "suma": self.suma, "minimo": self.minimo, "maximo": self.maximo,
+                "media": self.media, "m2": self.m2, "bandas": self.bandas}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        acumulador = cls(bandas=datos.get("bandas") is not None)
+        for clave in ("n", "suma", "minimo", "maximo", "media", "m2"):
+            setattr(acumulador, clave, datos[clave])
+        if datos.get("bandas") is not None:
+            acumulador.bandas = dict(datos["bandas"])
+        return acumulador
+
+
+def indices_excursiones(valores, puntos):
+    """Índices de los valores fuera de UMBRAL_BAJO-UMBRAL_ALTO que se conservan al reducir una serie
+
+    Si no son más de `puntos` se conservan todos. Si no, de cada racha de
+    valores consecutivos del mismo lado del rango quedan el primero, el
+    último y el más extremo. Si ni así caben (muchas rachas muy cortas) no se
+    devuelve ninguno: entonces solo quedan el mínimo y el máximo de cada tramo.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    alto = valores > UMBRAL_ALTO
+    fuera = np.flatnonzero((valores < UMBRAL_BAJO) | alto)
+    if len(fuera) <= puntos:
+        return fuera
+    lado = alto[fuera]
+    nueva = np.concatenate([[True], (np.diff(fuera) != 1) | (lado[1:] != lado[:-1])])
+    inicios = np.flatnonzero(nueva)
+    if 3 * len(inicios) > puntos:
+        return fuera[:0]
+    racha = np.cumsum(nueva) - 1
+    extremo = np.where(lado, valores[fuera], -valores[fuera])
+    orden = np.lexsort((-extremo, racha))  # Dentro de cada racha, primero el más extremo
+    picos = orden[np.concatenate([[True], racha[orden][1:] != racha[orden][:-1]])]
+    finales = np.concatenate([inicios[1:], [len(fuera)]]) - 1
+    return np.unique(fuera[np.concatenate([inicios, finales, picos])])
+
+
+class ExtremosTendencia:
+    """Filas con la glucosa mínima y máxima de cada tramo, para el gráfico de tendencia
+
+    La clave de cada fila es su momento en ns (o su posición si no tiene
+    fecha) y los tramos son intervalos de `ancho` claves; de cada tramo se
+    guardan el mínimo y el máximo y, además, las filas fuera de 80-140 mg/dL
+    (`indices_excursiones`). Cuando hay más de puntos/2 tramos el ancho se
+    duplica: los tramos nuevos son uniones de los anteriores, así que reducir
+    otra vez lo guardado conserva los mismos extremos que reducir todas las filas.
+    """
+
+    def __init__(self, puntos, ancho):
+        self.puntos = puntos
+        self.ancho = ancho
+        self.claves = np.empty(0, dtype=np.int64)
+        self.glucosa = np.empty(0)
+
+    def __len__(self):
+        return len(self.claves)
+
+    def actualizar(self, claves, glucosa, ancho=1):
+        """Incorpora filas (claves int64, glucosa float; las NaN se descartan)"""
+        if self.puntos <= 0:
+            return
+        validas = ~np.isnan(glucosa)
+        claves = np.concatenate([self.claves, claves[validas]])
+        glucosa = np.concatenate([self.glucosa, glucosa[validas]])
+        self.ancho = max(self.ancho, ancho)
+        if len(claves) > self.puntos:
+            orden = np.argsort(claves, kind="stable")
+            claves, glucosa = claves[orden], glucosa[orden]
+            tramos_maximos = max(self.puntos // 2, 1)
+            while np.count_nonzero(np.diff(claves // self.ancho)) + 1 > tramos_maximos:
+                self.ancho *= 2
+            tramos = claves // self.ancho
+            orden = np.lexsort((glucosa, tramos))
+            cambios = tramos[orden][1:] != tramos[orden][:-1]
+            extremos = orden[np.concatenate([[True], cambios]) | np.concatenate([cambios, [True]])]
+            conservar = np.union1d(extremos, indices_excursiones(glucosa, self.puntos))
+            claves, glucosa = claves[conservar], glucosa[conservar]
+        self.claves, self.glucosa = claves, glucosa
+
+    def combinar(self, otro, desplazamiento=0):
+        """Une los extremos de otro acumulador (con sus claves desplazadas)"""
+        self.actualizar(otro.claves + desplazamiento, otro.glucosa, otro.ancho)
+
+
+class ResumenStreaming:
+    """Acumuladores de las columnas del informe y extremos para la tendencia"""
+
+    def __init__(self, tamano_muestra=TAMANO_MUESTRA):
+        import perfil  # Importa los umbrales de este módulo
+
+        self.acumuladores = {columna: Acumulador(bandas=(columna == "Glucosa (mg/dL)"))
+                             for columna in COLUMNAS_RESUMEN}
+        self.filas = 0
+        self.perfil = perfil.PerfilGlucosa()
+        self.tamano_muestra = tamano_muestra
+        self._con_fecha = ExtremosTendencia(tamano_muestra, ANCHO_TRAMO_NS)
+        self._sin_fecha = ExtremosTendencia(tamano_muestra, 1)  # Por posición, si ninguna fila tiene fecha
+
+    def actualizar(self, df):
+        """Incorpora un bloque de filas"""
+        import perfil
+
+        posicion = self.filas
+        self.filas += len(df)
+        for columna, acumulador in self.acumuladores.items():
+            if columna in df.columns:
+                acumulador.actualizar(pd.to_numeric(df[columna], errors="coerce").to_numpy())
+        if "Glucosa (mg/dL)" in df.columns and not df.empty:
+            momentos = perfil.momentos_ns(df)  # Las fechas se interpretan una sola vez por bloque
+            self.perfil.actualizar(df, momentos)
+            self._actualizar_tendencia(df, momentos, posicion)
+
+    def _actualizar_tendencia(self, df, momentos, posicion):
+        glucosa = pd.to_numeric(df["Glucosa (mg/dL)"], errors="coerce").to_numpy(dtype=np.float64)
+        con_fecha = np.zeros(len(df), dtype=bool) if momentos is None else momentos != np.iinfo(np.int64).min
+        if con_fecha.any():
+            self._con_fecha.actualizar(momentos[con_fecha], glucosa[con_fecha])
+        if not con_fecha.all():
+            posiciones = posicion + np.flatnonzero(~con_fecha)
+            self._sin_fecha.actualizar(posiciones, glucosa[~con_fecha])
+
+    def combinar(self, otro):
+        """Une el resumen de otro proceso o lote"""
+        posicion = self.filas
+        self.filas += otro.filas
+        for columna, acumulador in self.acumuladores.items():
+            acumulador.combinar(otro.acumuladores[columna])
+        self.perfil.combinar(otro.perfil)
+        self._con_fecha.combinar(otro._con_fecha)
+        self._sin_fecha.combinar(otro._sin_fecha, posicion)
+        return self
+
+    @property
+    def muestra(self):
+        """Filas acotadas (mínimo y máximo de cada tramo) para el gráfico de tendencia
+
+        Con fecha: columnas datetime y glucosa; si ninguna fila tiene fecha,
+        solo la glucosa en el orden de las filas.
+        """
+        if len(self._con_fecha):
+            extremos = self._con_fecha
+            orden = np.argsort(extremos.claves, kind="stable")
+            return pd.DataFrame({"datetime": extremos.claves[orden].astype("datetime64[ns]"),
+                                 "Glucosa (mg/dL)": extremos.glucosa[orden]})
+        if len(self._sin_fecha):
+            orden = np.argsort(self._sin_fecha.claves, kind="stable")
+            return pd.DataFrame({"Glucosa (mg/dL)": self._sin_fecha.glucosa[orden]})
+        return pd.DataFrame()
+
+    def estadisticas(self):
+        """Medias por columna con las mismas claves que calcular_estadisticas"""
+        resultado = {"simulaciones": self.filas}
+        for columna, clave in COLUMNAS_RESUMEN.items():
+            acumulador = self.acumuladores[columna]
+            resultado[clave] = acumulador.media if acumulador.n else None
+        resultado["bandas_glucosa"] = self.acumuladores["Glucosa (mg/dL)"].bandas
+        return resultado
+
+
+def iterar_bloques(rutas, filas_por_bloque=FILAS_POR_BLOQUE, errores=None):
+    """Genera DataFrames de como mucho ~filas_por_bloque filas a partir de las rutas
+
+    Los archivos pequeños (una exportación por archivo) se agrupan en lotes
+    de como mucho filas_por_bloque archivos y BYTES_POR_LOTE bytes, que pasan
+    por la ingesta masiva; los grandes y los archivos compactos
+    (`compacto`) se leen por trozos. La ruta "-" es un flujo de exportaciones
+    JSON (NDJSON) por la entrada estándar.
+    """
+    pequenos, bytes_pequenos = [], 0
+    for ruta in rutas:
+        if ruta == "-":
+            yield from ingesta.iterar_ndjson(sys.stdin.buffer, filas_por_bloque, errores=errores)
+            continue
+        if ruta.lower().endswith(compacto.EXTENSION):
+            try:
+                with compacto.ArchivoCompacto(ruta) as archivo:
+                    yield from archivo.bloques(filas_por_bloque)
+            except (OSError, compacto.ArchivoCompactoError) as e:
+                if errores is not None:
+                    errores.append((ruta, str(e)))
+            continue
+        try:
+            tamano = os.path.getsize(ruta)
+        except OSError as e:
+            if errores is not None:
+                errores.append((ruta, str(e)))
+            continue
+
+        if tamano <= TAMANO_ARCHIVO_GRANDE:
+            pequenos.append(ruta)
+            bytes_pequenos += tamano
+            if len(pequenos) >= filas_por_bloque or bytes_pequenos >= BYTES_POR_LOTE:
+                yield from _bloque_pequenos(pequenos, errores)
+                pequenos, bytes_pequenos = [], 0
+            continue
+
+        if ruta.lower().endswith(ingesta.EXTENSIONES_JSON):
+            yield from ingesta.iterar_ndjson(ruta, filas_por_bloque, errores=errores)
+            continue
+        try:
+            for trozo in pd.read_csv(ruta, chunksize=filas_por_bloque):
+                trozo['archivo_origen'] = os.path.basename(ruta)
+                yield trozo
+        except Exception as e:
+            if errores is not None:
+                errores.append((ruta, str(e)))
+
+    if pequenos:
+        yield from _bloque_pequenos(pequenos, errores)
+
+
+def _bloque_pequenos(rutas, errores):
+    """Carga un lote de archivos pequeños como un único bloque"""
+    resultado = ingesta.cargar_archivos(rutas)
+    if errores is not None:
+        errores.extend(resultado.errores)
+    if not resultado.df.empty:
+        yield resultado.df
+
+
+def agregar(rutas, filas_por_bloque=FILAS_POR_BLOQUE, tamano_muestra=TAMANO_MUESTRA, avance=None):
+    """Recorre todas las entradas por bloques y devuelve (ResumenStreaming, errores)"""
+    resumen = ResumenStreaming(tamano_muestra)
+    errores = []
+    for bloque in iterar_bloques(rutas, filas_por_bloque, errores):
+        resumen.actualizar(bloque)
+        if avance:
+            avance(resumen.filas)
+    return resumen, errores
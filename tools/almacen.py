@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Almacén SQLite de simulaciones
+==============================
+
+Base de datos local (un solo archivo, `simulaciones.sqlite` en la carpeta de
+informes) con todas las simulaciones importadas, para no volver a leer el
+archivo histórico de CSV cada vez que se quiere un informe de unos días o de
+una fuente:
+
+- `archivos`: una fila por exportación importada, con el hash SHA-256 de su
+  contenido, la ruta, el nombre y la fuente (la carpeta que la contiene, por
+  ejemplo la del paciente). Un archivo con el mismo contenido no se vuelve a
+  importar aunque cambie de nombre o de carpeta; si una ruta ya importada
+  cambia de contenido, sus filas se sustituyen.
+- `simulaciones`: filas tipadas (momento en segundos desde 1970, números
+  REAL), con índices por momento y por archivo y momento.
+
+La importación lee los archivos nuevos con la ingesta masiva (CSV y JSON),
+los normaliza con `esquema` y los inserta con `executemany` en una sola
+transacción. `consultar` devuelve solo las filas del intervalo de fechas y
+de las fuentes pedidas, con el mismo esquema que `nucleo.cargar_datos`.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+
+NOMBRE_ARCHIVO = "simulaciones.sqlite"
+VERSION = 1
+TAMANO_BLOQUE_HASH = 1 << 20
+CACHE_KIB = 64 * 1024  # Caché de páginas de SQLite: los índices caben en memoria al importar
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS archivos (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    ruta TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    fuente TEXT NOT NULL,
+    tamano INTEGER NOT NULL,
+    filas INTEGER NOT NULL,
+    importado INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_archivos_ruta ON archivos (ruta);
+CREATE INDEX IF NOT EXISTS idx_archivos_fuente ON archivos (fuente);
+CREATE INDEX IF NOT EXISTS idx_archivos_nombre ON archivos (nombre);
+CREATE TABLE IF NOT EXISTS simulaciones (
+    archivo_id INTEGER NOT NULL REFERENCES archivos (id),
+    momento INTEGER,
+    hidratos REAL,
+    caminata REAL,
+    sueno REAL,
+    glucosa REAL,
+    efecto_hc REAL,
+    efecto_caminar REAL,
+    efecto_sueno REAL
+);
+CREATE INDEX IF NOT EXISTS idx_simulaciones_momento ON simulaciones (momento);
+CREATE INDEX IF NOT EXISTS idx_simulaciones_archivo ON simulaciones (archivo_id, momento);
+"""
+
+# Columna de la tabla simulaciones -> columna del DataFrame normalizado (esquema)
+COLUMNAS = {
+    "hidratos": "Hidratos (g)",
+    "caminata": "Caminata (min)",
+    "sueno": "Sueño (h)",
+    "glucosa": "Glucosa (mg/dL)",
+    "efecto_hc": "Efecto HC",
+    "efecto_caminar": "Efecto Caminar",
+    "efecto_sueno": "Efecto Sueño",
+}
+COLUMNA_RUTA = "_ruta"
+
+
+def ruta_por_defecto():
+    """Base de datos en la carpeta de informes (Documentos/Informes Diabetes)"""
+    import nucleo
+    return os.path.join(nucleo.obtener_carpeta_informes(), NOMBRE_ARCHIVO)
+
+
+def hash_archivo(ruta):
+    """SHA-256 del contenido del archivo"""
+    resumen = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(TAMANO_BLOQUE_HASH), b""):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def fuente_de(ruta):
+    """Fuente de una exportación: el nombre de la carpeta que la contiene"""
+    return os.path.basename(os.path.dirname(os.path.abspath(ruta)))
+
+
+def _segundos(momento):
+    """Fecha (texto aaaa-mm-dd, d/m/aaaa, datetime o Timestamp) en segundos desde 1970"""
+    import pandas as pd
+
+    if isinstance(momento, str) and "/" in momento:
+        momento = pd.to_datetime(momento, dayfirst=True)
+    return int(pd.Timestamp(momento).timestamp())
+
+
+def _a_objetos(valores):
+    """Array de NumPy como lista para SQLite, con None en lugar de NaN/NaT"""
+    import numpy as np
+
+    objetos = valores.astype(object)
+    objetos[np.isnan(valores)] = None
+    return objetos
+
+
+class Almacen:
+    """Simulaciones importadas en SQLite, consultables por fechas y fuentes"""
+
+    def __init__(self, ruta=None):
+        self.ruta = os.path.abspath(ruta or ruta_por_defecto())
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.conexion = sqlite3.connect(self.ruta)
+        self.conexion.execute("PRAGMA journal_mode = WAL")
+        self.conexion.execute("PRAGMA synchronous = NORMAL")
+        self.conexion.execute(f"PRAGMA cache_size = -{CACHE_KIB}")
+        version = self.conexion.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, VERSION):
+            self.conexion.close()
+            raise ValueError(f"{self.ruta} es de otra versión del almacén ({version})")
+        self.conexion.executescript(ESQUEMA)
+        self.conexion.execute(f"PRAGMA user_version = {VERSION}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def importar(self, rutas, avisar=None, avance=None):
+        """Importa las exportaciones nuevas y devuelve un resumen (dict)
+
+        Los archivos cuyo contenido ya está en el almacén se saltan sin
+        leerlos con pandas; solo se calcula su hash.
+        """
+        import ingesta
+        import esquema
+
+        inicio = time.perf_counter()
+        resumen = {"nuevos": 0, "duplicados": 0, "sustituidos": 0, "filas": 0, "errores": []}
+        conocidos = {fila[0] for fila in self.conexion.execute("SELECT hash FROM archivos")}
+        pendientes = {}  # ruta -> (hash, tamaño)
+        for ruta in (os.path.abspath(r) for r in rutas):
+            try:
+                firma = hash_archivo(ruta), os.path.getsize(ruta)
+            except OSError as e:
+                resumen["errores"].append((ruta, str(e)))
+                continue
+            if firma[0] in conocidos:
+                resumen["duplicados"] += 1
+            else:
+                conocidos.add(firma[0])  # Copias dentro del mismo lote
+                pendientes[ruta] = firma
+
+        if pendientes:
+            resultado = ingesta.cargar_archivos(list(pendientes), avance=avance, columna_ruta=COLUMNA_RUTA)
+            resumen["errores"].extend(resultado.errores)
+            for ruta, _ in resultado.errores:
+                pendientes.pop(ruta, None)
+            df = esquema.normalizar(resultado.df) if resultado.filas else None
+            with self.conexion:
+                resumen["sustituidos"] = self._borrar_rutas(list(pendientes))
+                resumen["filas"] = self._insertar(df, pendientes)
+            resumen["nuevos"] = len(pendientes)
+
+        for ruta, error in resumen["errores"]:
+            if avisar:
+                avisar(f"⚠️ Error al importar {os.path.basename(ruta)}: {error}")
+        resumen["segundos"] = time.perf_counter() - inicio
+        return resumen
+
+    def _borrar_rutas(self, rutas):
+        """Quita las importaciones anteriores de rutas que han cambiado de contenido"""
+        ids = []
+        for ruta in rutas:
+            ids.extend(fila[0] for fila in self.conexion.execute("SELECT id FROM archivos WHERE ruta = ?", (ruta,)))
+        self.conexion.executemany("DELETE FROM simulaciones WHERE archivo_id = ?", [(i,) for i in ids])
+        self.conexion.executemany("DELETE FROM archivos WHERE id = ?", [(i,) for i in ids])
+        return len(ids)
+
+    def _insertar(self, df, pendientes):
+        """Inserta los archivos y sus filas (dentro de la transacción abierta); devuelve las filas"""
+        import numpy as np
+        import pandas as pd
+        import esquema
+
+        primero = self.conexion.execute("SELECT COALESCE(MAX(id), 0) FROM archivos").fetchone()[0] + 1
+        ids = {ruta: primero + i for i, ruta in enumerate(pendientes)}
+        filas = df[COLUMNA_RUTA].value_counts().to_dict() if df is not None else {}
+        ahora = int(time.time())
+        self.conexion.executemany(
+            "INSERT INTO archivos (id, hash, ruta, nombre, fuente, tamano, filas, importado) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(ids[ruta], hash_, ruta, os.path.basename(ruta), fuente_de(ruta), tamano, int(filas.get(ruta, 0)), ahora)
+             for ruta, (hash_, tamano) in pendientes.items()])
+        if df is None or df.empty:
+            return 0
+
+        df = df[df[COLUMNA_RUTA].isin(ids)]
+        archivo_id = df[COLUMNA_RUTA].map(ids).to_numpy(dtype=np.int64)
+        if esquema.COLUMNA_MOMENTO in df.columns:
+            momentos = df[esquema.COLUMNA_MOMENTO].to_numpy(dtype="datetime64[s]")
+        else:
+            momentos = np.full(len(df), np.datetime64("NaT"), dtype="datetime64[s]")
+        # En orden de archivo y momento, los índices se rellenan casi siempre por el final
+        orden = np.lexsort((momentos.astype(np.int64), archivo_id))
+        momentos = momentos[orden]
+        segundos = momentos.astype(np.int64).astype(object)
+        segundos[np.isnat(momentos)] = None
+        columnas = [archivo_id[orden].astype(object), segundos]
+        for columna in COLUMNAS.values():
+            if columna in df.columns:
+                valores = pd.to_numeric(df[columna], errors="coerce").to_numpy(dtype=np.float64)
+                columnas.append(_a_objetos(valores[orden]))
+            else:
+                columnas.append(np.full(len(df), None, dtype=object))
+        self.conexion.executemany(
+            f"INSERT INTO simulaciones (archivo_id, momento, {', '.join(COLUMNAS)}) "
+            f"VALUES ({', '.join('?' * (len(COLUMNAS) + 2))})",
+            zip(*columnas))
+        return len(df)
+
+    def consultar(self, desde=None, hasta=None, fuentes=None):
+        """Simulaciones de [desde, hasta) y de las fuentes indicadas: (DataFrame normalizado, rutas)
+
+        desde y hasta son fechas (texto aaaa-mm-dd o d/m/aaaa, datetime o
+        Timestamp); fuentes es una lista de nombres de carpeta o de archivo.
+        Con un intervalo, las filas sin fecha no se devuelven.
+        """
+        import numpy as np
+        import pandas as pd
+        import esquema
+
+        condiciones, parametros = [], []
+        if desde is not None:
+            condiciones.append("s.momento >= ?")
+            parametros.append(_segundos(desde))
+        if hasta is not None:
+            condiciones.append("s.momento < ?")
+            parametros.append(_segundos(hasta))
+        if fuentes:
+            marcas = ", ".join("?" * len(fuentes))
+            condiciones.append(f"s.archivo_id IN (SELECT id FROM archivos WHERE fuente IN ({marcas}) "
+                               f"OR nombre IN ({marcas}))")
+            parametros.extend(list(fuentes) * 2)
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+        cursor = self.conexion.execute(
+            f"SELECT s.archivo_id, s.momento, {', '.join('s.' + c for c in COLUMNAS)} "
+            f"FROM simulaciones s {donde}", parametros)
+        filas = cursor.fetchall()
+        datos = pd.DataFrame.from_records(filas, columns=["archivo_id", "momento", *COLUMNAS], coerce_float=True)
+
+        archivos = pd.read_sql_query("SELECT id, ruta, nombre FROM archivos", self.conexion, index_col="id")
+        usados = archivos.loc[np.unique(datos["archivo_id"].to_numpy(dtype=np.int64))]
+        df = pd.DataFrame({esquema.COLUMNA_MOMENTO: pd.to_datetime(datos["momento"], unit="s")})
+        for columna_sql, columna in COLUMNAS.items():
+            df[columna] = pd.to_numeric(datos[columna_sql], errors="coerce")
+        df["archivo_origen"] = datos["archivo_id"].map(archivos["nombre"]).astype("category")
+        return esquema.normalizar(df), sorted(usados["ruta"])
+
+    def resumen(self):
+        """Archivos, filas, fuentes e intervalo de fechas del almacén"""
+        archivos, filas_archivos = self.conexion.execute(
+            "SELECT COUNT(*), COALESCE(SUM(filas), 0) FROM archivos").fetchone()
+        fuentes = self.conexion.execute("SELECT COUNT(DISTINCT fuente) FROM archivos").fetchone()[0]
+        primero, ultimo = self.conexion.execute("SELECT MIN(momento), MAX(momento) FROM simulaciones").fetchone()
+        formato = "%Y-%m-%d %H:%M"
+        return {
+            "ruta": self.ruta,
+            "archivos": archivos,
+            "filas": filas_archivos,
+            "fuentes": fuentes,
+            "desde": time.strftime(formato, time.gmtime(primero)) if primero is not None else None,
+            "hasta": time.strftime(formato, time.gmtime(ultimo)) if ultimo is not None else None,
+            "bytes": os.path.getsize(self.ruta),
+        }
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Caché persistente de la ingesta de CSV
+======================================
+
+Guarda las filas ya leídas y tipadas de cada archivo fuente para que
+"GENERAR INFORME" solo vuelva a leer los archivos nuevos o modificados.
+
+- Cada archivo se identifica por ruta absoluta, tamaño y mtime (ns).
+- Las filas se guardan en segmentos columnares (Parquet si pyarrow está
+  instalado; si no, pickle de pandas) dentro de `.cache_ingesta/`, junto a la
+  carpeta de informes de `obtener_ruta_segura`.
+- Cada ejecución escribe como mucho un segmento nuevo con los archivos leídos;
+  las entradas obsoletas (archivo modificado o borrado) se desalojan y los
+  segmentos se compactan cuando hay demasiados.
+- `indice.json` guarda las entradas y las estadísticas de aciertos/fallos.
+"""
+
+import os
+import json
+import time
+import shutil
+
+import pandas as pd
+
+import ingesta
+
+NOMBRE_CARPETA = ".cache_ingesta"
+NOMBRE_INDICE = "indice.json"
+COLUMNA_RUTA = "_ruta"
+MAX_SEGMENTOS = 16
+VERSION = 1
+
+try:
+    import pyarrow  # noqa: F401
+    FORMATO = "parquet"
+except ImportError:
+    FORMATO = "pkl"
+
+
+def _escribir_segmento(df, ruta):
+    """Guarda un segmento en el formato disponible"""
+    if FORMATO == "parquet":
+        df.to_parquet(ruta, index=False)
+    else:
+        df.to_pickle(ruta)
+
+
+def _leer_segmento(ruta):
+    """Lee un segmento según su extensión"""
+    if ruta.endswith(".parquet"):
+        return pd.read_parquet(ruta)
+    return pd.read_pickle(ruta)
+
+
+def _firma(ruta):
+    """Tamaño y mtime del archivo, o None si ya no existe"""
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class CacheIngesta:
+    """Caché en disco de filas por archivo fuente"""
+
+    def __init__(self, carpeta):
+        self.carpeta = os.path.join(carpeta, NOMBRE_CARPETA)
+        self.ruta_indice = os.path.join(self.carpeta, NOMBRE_INDICE)
+        self.entradas = {}
+        self.estadisticas = {"aciertos": 0, "fallos": 0, "desalojados": 0,
+                             "ejecuciones": 0, "ultima_ejecucion": None}
+        self._cargar_indice()
+
+    def _cargar_indice(self):
+        """Lee indice.json; un índice dañado o de otra versión se descarta"""
+        try:
+            with open(self.ruta_indice, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return
+        if datos.get("version") != VERSION:
+            return
+        self.entradas = datos.get("entradas", {})
+        self.estadisticas.update(datos.get("estadisticas", {}))
+
+    def _guardar_indice(self):
+        """Escribe indice.json de forma atómica"""
+        os.makedirs(self.carpeta, exist_ok=True)
+        temporal = self.ruta_indice + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "entradas": self.entradas,
+                       "estadisticas": self.estadisticas}, f)
+        os.replace(temporal, self.ruta_indice)
+
+    def _ruta_segmento(self, nombre):
+        return os.path.join(self.carpeta, nombre)
+
+    def segmentos(self):
+        """Nombres de los segmentos referenciados por alguna entrada"""
+        return sorted({e["segmento"] for e in self.entradas.values()})
+
+    def cargar(self, rutas, avisar=None, avance=None):
+        """Devuelve un ResultadoIngesta leyendo del disco solo los archivos nuevos o modificados"""
+        rutas = [os.path.abspath(r) for r in rutas]
+        aciertos = []
+        pendientes = []
+        firmas = {}
+        desalojados = 0
+
+        for ruta in rutas:
+            firma = firmas[ruta] = _firma(ruta)
+            entrada = self.entradas.get(ruta)
+            if entrada is not None and firma is not None and entrada["firma"] == firma:
+                aciertos.append(ruta)
+            else:
+                if entrada is not None:
+                    del self.entradas[ruta]
+                    desalojados += 1
+                pendientes.append(ruta)
+
+        # Filas en caché, leyendo solo los segmentos necesarios
+        partes = []
+        por_segmento = {}
+        for ruta in aciertos:
+            if self.entradas[ruta]["filas"] == 0:
+                continue  # Archivo sin filas: no tiene segmento en disco
+            por_segmento.setdefault(self.entradas[ruta]["segmento"], set()).add(ruta)
+        for segmento, rutas_segmento in por_segmento.items():
+            try:
+                df = _leer_segmento(self._ruta_segmento(segmento))
+            except Exception:
+                # Segmento perdido o dañado: sus archivos se vuelven a leer
+                for ruta in rutas_segmento:
+                    del self.entradas[ruta]
+                pendientes.extend(rutas_segmento)
+                aciertos = [r for r in aciertos if r not in rutas_segmento]
+                continue
+            partes.append(df[df[COLUMNA_RUTA].isin(rutas_segmento)])
+
+        # Archivos nuevos o modificados
+        errores = []
+        tiempos = []
+        leidos = len(aciertos)
+        if pendientes:
+            nuevos = ingesta.cargar_archivos(pendientes, avance=avance, columna_ruta=COLUMNA_RUTA)
+            errores = nuevos.errores
+            tiempos = nuevos.tiempos
+            leidos += nuevos.archivos_leidos
+            if not nuevos.df.empty:
+                partes.append(nuevos.df)
+            self._guardar_nuevos(nuevos.df, pendientes, firmas, {r for r, _ in errores})
+
+        self.estadisticas["aciertos"] += len(aciertos)
+        self.estadisticas["fallos"] += len(pendientes)
+        self.estadisticas["desalojados"] += desalojados + self._podar(set(rutas))
+        self.estadisticas["ejecuciones"] += 1
+        self.estadisticas["ultima_ejecucion"] = {
+            "aciertos": len(aciertos), "fallos": len(pendientes),
+            "fecha": time.strftime("%Y-%m-%d %H:%M:%S")}
+        self._compactar_si_necesario()
+        self._guardar_indice()
+
+        if partes:
+            df = pd.concat(partes, ignore_index=True).drop(columns=[COLUMNA_RUTA])
+        else:
+            df = pd.DataFrame(columns=ingesta.COLUMNAS_EXPORTACION + ["archivo_origen"])
+        return ingesta.ResultadoIngesta(df, errores, leidos, tiempos)
+
+    def _guardar_nuevos(self, df, rutas, firmas, fallidas):
+        """Escribe un segmento con las filas recién leídas y registra sus entradas"""
+        nombre = f"seg_{time.time_ns()}.{FORMATO}"
+        if not df.empty:
+            os.makedirs(self.carpeta, exist_ok=True)
+            _escribir_segmento(df, self._ruta_segmento(nombre))
+        filas = df[COLUMNA_RUTA].value_counts().to_dict() if not df.empty else {}
+        for ruta in rutas:
+            if ruta in fallidas:
+                continue
+            firma = firmas.get(ruta)
+            if firma is not None:
+                self.entradas[ruta] = {"firma": firma, "segmento": nombre,
+                                       "filas": int(filas.get(ruta, 0))}
+
+    def _podar(self, vistas):
+        """Desaloja las entradas de archivos que ya no existen en disco"""
+        obsoletas = [r for r in self.entradas if r not in vistas and not os.path.exists(r)]
+        for ruta in obsoletas:
+            del self.entradas[ruta]
+        self._borrar_segmentos_huerfanos()
+        return len(obsoletas)
+
+    def _borrar_segmentos_huerfanos(self):
+        """Elimina los segmentos que ya no referencia ninguna entrada"""
+        if not os.path.isdir(self.carpeta):
+            return
+        vivos = set(self.segmentos())
+        for nombre in os.listdir(self.carpeta):
+            if nombre.startswith("seg_") and nombre not in vivos:
+                try:
+                    os.remove(self._ruta_segmento(nombre))
+                except OSError:
+                    pass
+
+    def _compactar_si_necesario(self):
+        """Une todos los segmentos vivos en uno cuando hay demasiados"""
+        segmentos = self.segmentos()
+        if len(segmentos) <= MAX_SEGMENTOS:
+            return
+        partes = []
+        for segmento in segmentos:
+            try:
+                df = _leer_segmento(self._ruta_segmento(segmento))
+            except Exception:
+                continue
+            partes.append(df[df[COLUMNA_RUTA].isin(self.entradas)])
+        nombre = f"seg_{time.time_ns()}.{FORMATO}"
+        if partes:
+            _escribir_segmento(pd.concat(partes, ignore_index=True), self._ruta_segmento(nombre))
+        for entrada in self.entradas.values():
+            entrada["segmento"] = nombre
+        self._borrar_segmentos_huerfanos()
+
+    def resumen(self):
+        """Estadísticas de la caché para el comando cache-stats"""
+        tamano = 0
+        if os.path.isdir(self.carpeta):
+            for nombre in os.listdir(self.carpeta):
+                tamano += os.path.getsize(self._ruta_segmento(nombre))
+        consultas = self.estadisticas["aciertos"] + self.estadisticas["fallos"]
+        return {
+            "carpeta": self.carpeta,
+            "formato": FORMATO,
+            "archivos": len(self.entradas),
+            "filas": sum(e["filas"] for e in self.entradas.values()),
+            "segmentos": len(self.segmentos()),
+            "bytes": tamano,
+            "tasa_aciertos": self.estadisticas["aciertos"] / consultas if consultas else 0.0,
+            **self.estadisticas,
+        }
+
+    def limpiar(self):
+        """Borra la caché completa"""
+        shutil.rmtree(self.carpeta, ignore_errors=True)
+        self.__init__(os.path.dirname(self.carpeta))
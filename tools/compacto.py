@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Archivo compacto de exportaciones (memoria mapeada)
+===================================================
+
+Cada descarga de `exportToCSV` es un archivo de ~150 bytes con la cabecera y
+una fila: años de exportaciones son cientos de miles de archivos diminutos y
+abrirlos domina el tiempo de carga. `compactar` los vuelca en un único
+archivo binario (`.eqd`) que se abre con `numpy.memmap`:
+
+    cabecera (64 bytes)   magia, versión, ancho de registro, registros,
+                          posición y tamaño de la tabla de fuentes
+    registros             array de registros de ancho fijo (`REGISTRO`, 40 bytes):
+                          momento datetime64[s], 7 columnas float32 (NaN si
+                          falta el valor) e índice de la fuente
+    tabla de fuentes      JSON con [ruta, tamaño, mtime_ns] de cada archivo
+                          compactado; el índice del registro apunta aquí
+
+Cargar el archivo es un `mmap`: `ArchivoCompacto.columna` devuelve vistas sin
+copia de cada campo y `a_dataframe` construye el DataFrame normalizado de
+`esquema` directamente desde ellas, sin interpretar texto.
+
+Los registros nuevos se añaden al final. La tabla de fuentes va detrás de
+los registros, así que al añadir se escribe primero la tabla nueva sin pisar
+la anterior, después la cabecera, después los registros y por último la
+cabecera con el total: si el proceso se interrumpe, la cabecera siempre
+describe un archivo válido. Un archivo con la misma ruta, tamaño y mtime no
+se vuelve a compactar; si ya está guardado pero cambió, tampoco se añade (sus
+registros antiguos no se pueden quitar sin reescribir el archivo y quedaría
+contado dos veces): se avisa y se cuenta en "modificados".
+"""
+
+import os
+import json
+import time
+import struct
+
+import numpy as np
+
+from almacen import COLUMNAS
+
+EXTENSION = ".eqd"
+MAGIA = b"EQDIAB\x00\x1a"
+VERSION = 1
+TAMANO_CABECERA = 64
+_CABECERA = struct.Struct("<8sIIQQQ")  # magia, versión, ancho, registros, inicio y bytes de la tabla
+ARCHIVOS_POR_TANDA = 100_000  # Archivos leídos y añadidos de cada vez al compactar
+
+REGISTRO = np.dtype([("momento", "<M8[s]")] + [(columna, "<f4") for columna in COLUMNAS] + [("fuente", "<u4")])
+
+
+class ArchivoCompactoError(Exception):
+    """El archivo no es un archivo compacto válido o es de otra versión"""
+
+
+def _leer_cabecera(f, ruta):
+    """(registros, inicio de la tabla, bytes de la tabla) de un archivo abierto en binario"""
+    f.seek(0)
+    datos = f.read(TAMANO_CABECERA)
+    if len(datos) < TAMANO_CABECERA:
+        raise ArchivoCompactoError(f"{ruta}: archivo compacto truncado")
+    magia, version, ancho, registros, inicio_tabla, bytes_tabla = _CABECERA.unpack_from(datos)
+    if magia != MAGIA:
+        raise ArchivoCompactoError(f"{ruta} no es un archivo compacto de simulaciones")
+    if version != VERSION or ancho != REGISTRO.itemsize:
+        raise ArchivoCompactoError(f"{ruta} es de otra versión del archivo compacto ({version})")
+    return registros, inicio_tabla, bytes_tabla
+
+
+def _escribir_cabecera(f, registros, inicio_tabla, bytes_tabla):
+    f.seek(0)
+    f.write(_CABECERA.pack(MAGIA, VERSION, REGISTRO.itemsize, registros, inicio_tabla, bytes_tabla)
+            .ljust(TAMANO_CABECERA, b"\0"))
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _leer_fuentes(f, inicio_tabla, bytes_tabla):
+    f.seek(inicio_tabla)
+    return json.loads(f.read(bytes_tabla).decode("utf-8")) if bytes_tabla else []
+
+
+def crear(ruta):
+    """Crea un archivo compacto vacío"""
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(carpeta, exist_ok=True)
+    with open(ruta, "wb") as f:
+        _escribir_cabecera(f, 0, TAMANO_CABECERA, 0)
+
+
+def anadir(ruta, registros, fuentes_nuevas):
+    """Añade registros (array de REGISTRO) y sus fuentes al final del archivo
+
+    El campo fuente de los registros cuenta desde 0 dentro de fuentes_nuevas;
+    aquí se desplaza detrás de las fuentes que ya tiene el archivo.
+    """
+    with open(ruta, "r+b") as f:
+        total, inicio_tabla, bytes_tabla = _leer_cabecera(f, ruta)
+        fuentes = _leer_fuentes(f, inicio_tabla, bytes_tabla)
+        registros = registros.copy()
+        registros["fuente"] += len(fuentes)
+        tabla = json.dumps(fuentes + list(fuentes_nuevas), ensure_ascii=False).encode("utf-8")
+
+        fin_registros = TAMANO_CABECERA + total * REGISTRO.itemsize
+        # La tabla nueva va detrás de los registros nuevos y sin pisar la anterior
+        nuevo_inicio = max(fin_registros + registros.nbytes, inicio_tabla + bytes_tabla)
+        f.seek(nuevo_inicio)
+        f.write(tabla)
+        f.truncate()
+        _escribir_cabecera(f, total, nuevo_inicio, len(tabla))  # Fuentes nuevas, aún sin registros
+        f.seek(fin_registros)
+        f.write(registros.tobytes())
+        _escribir_cabecera(f, total + len(registros), nuevo_inicio, len(tabla))
+    return len(registros)
+
+
+class ArchivoCompacto:
+    """Registros de un archivo compacto mapeados en memoria (solo lectura)"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._codigos_origen = None
+        with open(ruta, "rb") as f:
+            registros, inicio_tabla, bytes_tabla = _leer_cabecera(f, ruta)
+            self.fuentes = _leer_fuentes(f, inicio_tabla, bytes_tabla)
+        if registros:
+            self.registros = np.memmap(ruta, dtype=REGISTRO, mode="r", offset=TAMANO_CABECERA,
+                                       shape=(registros,))
+        else:
+            self.registros = np.empty(0, dtype=REGISTRO)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def cerrar(self):
+        """Suelta el mapa (se deshace cuando no quedan vistas de sus columnas)"""
+        self.registros = np.empty(0, dtype=REGISTRO)
+
+    def __len__(self):
+        return len(self.registros)
+
+    def columna(self, nombre):
+        """Vista sin copia de un campo: "momento", "fuente" o una clave de almacen.COLUMNAS"""
+        return self.registros[nombre]
+
+    def firmas(self):
+        """{ruta: (tamaño, mtime_ns)} de los archivos compactados"""
+        return {ruta: (tamano, mtime) for ruta, tamano, mtime in self.fuentes}
+
+    def a_dataframe(self, inicio=0, fin=None):
+        """DataFrame normalizado (el de `nucleo.cargar_datos`) de los registros [inicio, fin)"""
+        import pandas as pd
+        import esquema
+
+        registros = self.registros[inicio:fin]
+        datos = {esquema.COLUMNA_MOMENTO: registros["momento"].astype("datetime64[ns]")}
+        for columna_archivo, columna in COLUMNAS.items():
+            datos[columna] = registros[columna_archivo]
+        codigos, nombres = self._origenes()
+        indices = np.asarray(registros["fuente"], dtype=np.int64)
+        datos["archivo_origen"] = pd.Categorical.from_codes(codigos[indices] if len(codigos) else indices,
+                                                            categories=nombres)
+        return esquema.normalizar(pd.DataFrame(datos))
+
+    def _origenes(self):
+        """(código por fuente, nombres): archivo_origen es el nombre del archivo, como en la carga de CSV"""
+        if self._codigos_origen is None:
+            import pandas as pd
+            # Los nombres pueden repetirse entre carpetas: comparten categoría
+            self._codigos_origen = pd.factorize(pd.Series([os.path.basename(f[0]) for f in self.fuentes]))
+        return self._codigos_origen
+
+    def bloques(self, filas_por_bloque):
+        """DataFrames normalizados de como mucho filas_por_bloque registros"""
+        for inicio in range(0, len(self), filas_por_bloque):
+            yield self.a_dataframe(inicio, inicio + filas_por_bloque)
+
+
+def _registros(df, rutas):
+    """Array de REGISTRO a partir de un DataFrame normalizado con la columna de ruta"""
+    import esquema
+    import almacen
+
+    registros = np.zeros(len(df), dtype=REGISTRO)
+    if esquema.COLUMNA_MOMENTO in df.columns:
+        registros["momento"] = df[esquema.COLUMNA_MOMENTO].to_numpy(dtype="datetime64[s]")
+    else:
+        registros["momento"] = np.datetime64("NaT")
+    for columna_archivo, columna in COLUMNAS.items():
+        if columna in df.columns:
+            registros[columna_archivo] = df[columna].to_numpy(dtype=np.float32, na_value=np.nan)
+        else:
+            registros[columna_archivo] = np.nan
+    posicion = {ruta: i for i, ruta in enumerate(rutas)}
+    registros["fuente"] = df[almacen.COLUMNA_RUTA].map(posicion).to_numpy(dtype=np.uint32)
+    return registros
+
+
+def compactar(rutas, destino, borrar=False, avisar=None, avance=None):
+    """Añade las exportaciones nuevas al archivo compacto destino y devuelve un resumen (dict)
+
+    Se leen por tandas de ARCHIVOS_POR_TANDA con la ingesta masiva. Con
+    borrar=True, los archivos ya guardados se eliminan después de cada tanda.
+    Los archivos ya compactados que cambiaron desde entonces no se añaden ni
+    se borran.
+    avance(hechos, total) se llama tras cada tanda.
+    """
+    import ingesta
+    import esquema
+    import almacen
+
+    inicio = time.perf_counter()
+    if not os.path.exists(destino):
+        crear(destino)
+    with ArchivoCompacto(destino) as archivo:
+        conocidas = archivo.firmas()
+
+    resumen = {"nuevos": 0, "repetidos": 0, "modificados": 0, "filas": 0, "borrados": 0, "errores": []}
+    pendientes = []  # (ruta, tamaño, mtime_ns)
+    vistas = {os.path.abspath(destino)}
+    for ruta in (os.path.abspath(r) for r in rutas):
+        if ruta in vistas:
+            continue
+        vistas.add(ruta)
+        try:
+            st = os.stat(ruta)
+        except OSError as e:
+            resumen["errores"].append((ruta, str(e)))
+            continue
+        if ruta not in conocidas:
+            pendientes.append((ruta, st.st_size, st.st_mtime_ns))
+        elif conocidas[ruta] == (st.st_size, st.st_mtime_ns):
+            resumen["repetidos"] += 1
+        else:
+            resumen["modificados"] += 1
+            if avisar:
+                avisar(f"⚠️ {os.path.basename(ruta)}: cambió desde que se compactó; no se añade otra vez")
+
+    for desde in range(0, len(pendientes), ARCHIVOS_POR_TANDA):
+        tanda = pendientes[desde:desde + ARCHIVOS_POR_TANDA]
+        resultado = ingesta.cargar_archivos([ruta for ruta, _, _ in tanda], columna_ruta=almacen.COLUMNA_RUTA)
+        fallidos = {ruta for ruta, _ in resultado.errores}
+        resumen["errores"].extend(resultado.errores)
+        tanda = [fuente for fuente in tanda if fuente[0] not in fallidos]
+        if resultado.filas:
+            df = esquema.normalizar(resultado.df)
+            registros = _registros(df, [ruta for ruta, _, _ in tanda])
+        else:
+            registros = np.empty(0, dtype=REGISTRO)
+        resumen["filas"] += anadir(destino, registros, [list(fuente) for fuente in tanda])
+        resumen["nuevos"] += len(tanda)
+
+        if borrar:
+            for ruta, _, _ in tanda:
+                try:
+                    os.remove(ruta)
+                    resumen["borrados"] += 1
+                except OSError as e:
+                    resumen["errores"].append((ruta, f"no se pudo borrar: {e}"))
+        if avance:
+            avance(min(desde + ARCHIVOS_POR_TANDA, len(pendientes)), len(pendientes))
+
+    for ruta, error in resumen["errores"]:
+        if avisar:
+            avisar(f"⚠️ {os.path.basename(ruta)}: {error}")
+    resumen["registros"] = len(ArchivoCompacto(destino))
+    resumen["bytes"] = os.path.getsize(destino)
+    resumen["segundos"] = time.perf_counter() - inicio
+    return resumen
+
+
+def leer(rutas):
+    """DataFrame normalizado con los registros de uno o varios archivos compactos"""
+    import pandas as pd
+
+    partes = []
+    for ruta in rutas:
+        with ArchivoCompacto(ruta) as archivo:
+            partes.append(archivo.a_dataframe())
+    if len(partes) == 1:
+        return partes[0]
+    df = pd.concat(partes, ignore_index=True)
+    df["archivo_origen"] = df["archivo_origen"].astype("category")
+    return df
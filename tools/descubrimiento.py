@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Descubrimiento de exportaciones en árboles de carpetas
+======================================================
+
+`descubrir` recorre carpetas con `os.scandir` (el tipo de cada entrada
+viene del propio listado, sin un `stat` por archivo) y genera las rutas de
+las exportaciones a medida que las encuentra, así que quien las consume
+puede ir mostrándolas o leyéndolas sin esperar al final del recorrido.
+
+- Las carpetas se recorren en orden alfabético; dentro de cada una, primero
+  sus archivos y después sus subcarpetas. Las carpetas ocultas (".algo") y
+  los enlaces a carpetas no se recorren, para evitar ciclos.
+- `incluir` y `excluir` son patrones glob (`fnmatch`) que se comparan con
+  el nombre del archivo y con su ruta relativa a la carpeta indicada
+  (separada por "/"); un patrón de `excluir` que coincide con una carpeta
+  la descarta entera.
+- Los duplicados se descartan con un conjunto: por dispositivo e inodo
+  (una misma exportación enlazada o indicada dos veces se cuenta una vez)
+  y, en Windows, donde el inodo exige un `stat`, por ruta absoluta.
+- Los archivos indicados explícitamente se aceptan con cualquier extensión.
+"""
+
+import os
+import re
+import stat
+import fnmatch
+
+EXTENSIONES = (".csv", ".json", ".ndjson", ".jsonl")
+_POR_RUTA = os.name == "nt"
+
+
+def _compilar(patrones):
+    """Expresión regular que reconoce cualquiera de los patrones glob (None si no hay)"""
+    if not patrones:
+        return None
+    return re.compile("|".join(fnmatch.translate(p.replace("\\", "/")) for p in patrones),
+                      re.IGNORECASE if _POR_RUTA else 0)
+
+
+def _coincide(patron, nombre, relativa):
+    return patron.match(nombre) is not None or patron.match(relativa) is not None
+
+
+def _clave_archivo(ruta, st):
+    if _POR_RUTA or not st.st_ino:
+        return os.path.normcase(os.path.abspath(ruta))
+    return (st.st_dev, st.st_ino)
+
+
+def _clave_entrada(entrada, dispositivo):
+    """Clave de duplicado de una entrada de scandir sin llamar a stat si no hace falta"""
+    if _POR_RUTA:
+        return os.path.normcase(os.path.abspath(entrada.path))
+    if entrada.is_symlink():
+        return _clave_archivo(entrada.path, os.stat(entrada.path))
+    return (dispositivo, entrada.inode())
+
+
+def descubrir(rutas, extensiones=EXTENSIONES, incluir=None, excluir=None, recursivo=True,
+              vistos=None, errores=None):
+    """Genera las rutas de las exportaciones de carpetas y archivos, sin duplicados
+
+    vistos es el conjunto de claves ya descubiertas: pasando el mismo en
+    varias llamadas tampoco se repiten los archivos de llamadas anteriores.
+    Las rutas que no se pueden leer se añaden a errores como (ruta, mensaje).
+    """
+    incluir, excluir = _compilar(incluir), _compilar(excluir)
+    vistos = set() if vistos is None else vistos
+    for ruta in rutas:
+        try:
+            st = os.stat(ruta)
+        except OSError as e:
+            if errores is not None:
+                errores.append((ruta, str(e)))
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            yield from _recorrer(ruta, extensiones, incluir, excluir, recursivo, vistos, errores)
+            continue
+        clave = _clave_archivo(ruta, st)
+        if clave not in vistos:
+            vistos.add(clave)
+            yield ruta
+
+
+def _recorrer(carpeta, extensiones, incluir, excluir, recursivo, vistos, errores):
+    pendientes = [(carpeta, "")]
+    while pendientes:
+        carpeta, prefijo = pendientes.pop()
+        try:
+            dispositivo = None if _POR_RUTA else os.stat(carpeta).st_dev
+            with os.scandir(carpeta) as listado:
+                entradas = sorted(listado, key=lambda entrada: entrada.name)
+        except OSError as e:
+            if errores is not None:
+                errores.append((carpeta, str(e)))
+            continue
+
+        subcarpetas = []
+        for entrada in entradas:
+            nombre = entrada.name
+            relativa = prefijo + nombre
+            try:
+                if entrada.is_dir(follow_symlinks=False):
+                    if recursivo and not nombre.startswith(".") and not (
+                            excluir and _coincide(excluir, nombre, relativa)):
+                        subcarpetas.append((entrada.path, relativa + "/"))
+                    continue
+                if not nombre.lower().endswith(extensiones):
+                    continue
+                if excluir and _coincide(excluir, nombre, relativa):
+                    continue
+                if incluir and not _coincide(incluir, nombre, relativa):
+                    continue
+                if not entrada.is_file():
+                    continue
+                clave = _clave_entrada(entrada, dispositivo)
+            except OSError as e:
+                if errores is not None:
+                    errores.append((entrada.path, str(e)))
+                continue
+            if clave not in vistos:
+                vistos.add(clave)
+                yield entrada.path
+        pendientes.extend(reversed(subcarpetas))
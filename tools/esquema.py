@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Esquema tipado y compacto de las simulaciones cargadas
+======================================================
+
+Tras `cargar_datos` las columnas de efectos siguen siendo texto ("+60", "-16",
+"+5.0 por <7h sueño"), Fecha/Hora son dos cadenas y `archivo_origen` repite
+el nombre completo en cada fila. `normalizar` convierte el DataFrame a:
+
+- Efecto HC / Efecto Caminar: enteros int16 con signo
+- Efecto Sueño: float32 con el número extraído del texto
+- Hidratos, Caminata, Glucosa: int16 si todos los valores son enteros, si no float32
+- Sueño: float32
+- Fecha + Hora: una única columna datetime64 (`datetime`)
+- archivo_origen: categórica
+
+Los textos se interpretan una sola vez por valor distinto (factorize) y el
+resultado se reparte a todas las filas, así que el coste no depende de
+cuántas veces se repite cada texto. Fecha y Hora se interpretan por separado
+con el formato de exportación de la app (es-ES): un archivo de un millón de
+filas tiene unos cientos de fechas y como mucho 1.440 horas distintas.
+"""
+
+import numpy as np
+import pandas as pd
+
+COLUMNA_MOMENTO = "datetime"
+FORMATO_MOMENTO = "%d/%m/%Y %H:%M"  # toLocaleDateString/TimeString('es-ES')
+
+COLUMNAS_EFECTO_ENTERO = ["Efecto HC", "Efecto Caminar"]
+COLUMNA_EFECTO_SUEÑO = "Efecto Sueño"
+COLUMNAS_ENTERAS = ["Hidratos (g)", "Caminata (min)", "Glucosa (mg/dL)"]
+COLUMNAS_DECIMALES = ["Sueño (h)"]
+
+# Primer número del texto, con signo opcional: "+60", "-16 mg/dL", "-2.1 por >8h sueño"
+_PATRON_NUMERO = r"([+-]?\d+(?:[.,]\d+)?)"
+# toLocaleDateString('es-ES') no rellena con ceros: "1/11/2025"; la hora sí: "08:30"
+_PATRON_FECHA = r"^\s*(\d{1,2})/(\d{1,2})/(\d{4})\s*$"
+_PATRON_HORA = r"^\s*(\d{1,2}):(\d{2})(?::(\d{2}))?\s*$"
+
+
+def _numeros_desde_texto(serie):
+    """Extrae el primer número de cada texto, interpretando cada valor distinto una sola vez"""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.to_numpy(dtype=np.float64, na_value=np.nan)
+    codigos, unicos = pd.factorize(serie)
+    textos = pd.Series(unicos, dtype=object).astype(str)
+    numeros = pd.to_numeric(textos.str.extract(_PATRON_NUMERO, expand=False).str.replace(",", "."),
+                            errors="coerce").to_numpy(dtype=np.float64)
+    valores = numeros[codigos] if len(numeros) else np.full(len(codigos), np.nan)
+    valores[codigos < 0] = np.nan
+    return valores
+
+
+def _compactar(valores, entero):
+    """int16 si se pide entero y todos los valores caben sin pérdida; si no, float32"""
+    if entero and valores.size and np.isfinite(valores).all():
+        if (valores == np.round(valores)).all() and valores.min() >= -32768 and valores.max() <= 32767:
+            return valores.astype(np.int16)
+    return valores.astype(np.float32)
+
+
+def _partes_numericas(unicos, patron):
+    """Grupos numéricos del patrón para cada texto (NaN si no encaja)"""
+    return pd.Series(unicos, dtype=object).astype(str).str.extract(patron).astype(np.float64).to_numpy()
+
+
+def _fechas_desde_texto(unicos):
+    """Textos "d/m/aaaa" como datetime64[D] (NaT si no son una fecha válida)"""
+    dia, mes, año = _partes_numericas(unicos, _PATRON_FECHA).T
+    fechas = np.full(len(unicos), np.datetime64("NaT"), dtype="datetime64[D]")
+    validos = (mes >= 1) & (mes <= 12) & (dia >= 1)  # False también con NaN
+    if validos.any():
+        meses = ((año[validos] - 1970) * 12 + mes[validos] - 1).astype(np.int64).astype("datetime64[M]")
+        dias = meses.astype("datetime64[D]") + (dia[validos] - 1).astype(np.int64)
+        # 31/02 pasaría al mes siguiente: solo valen los días que caen en su mes
+        fechas[validos] = np.where(dias.astype("datetime64[M]") == meses, dias, np.datetime64("NaT"))
+    return fechas
+
+
+def _horas_desde_texto(unicos):
+    """Textos "HH:MM" (o "HH:MM:SS") como timedelta64[s] (NaT si no son una hora válida)"""
+    horas, minutos, segundos = _partes_numericas(unicos, _PATRON_HORA).T
+    segundos = np.nan_to_num(segundos) if len(segundos) else segundos
+    duraciones = np.full(len(unicos), np.timedelta64("NaT"), dtype="timedelta64[s]")
+    validos = (horas < 24) & (minutos < 60) & (segundos < 60)
+    duraciones[validos] = (horas[validos] * 3600 + minutos[validos] * 60
+                           + segundos[validos]).astype(np.int64).astype("timedelta64[s]")
+    return duraciones
+
+
+def interpretar_fecha_hora(fecha, hora):
+    """Une Fecha y Hora en datetime64 y devuelve (momentos, filas no interpretables)
+
+    Cada fecha y cada hora distinta se interpreta una sola vez con el formato
+    de exportación y se reparte a sus filas. Las combinaciones que no encajan
+    (exportaciones editadas a mano) se intentan una vez por valor distinto con
+    inferencia de día primero. La máscara devuelta marca las filas con Fecha y
+    Hora presentes que aun así no se pudieron interpretar; las filas sin Fecha
+    u Hora quedan como NaT sin contarse como error.
+    """
+    codigos_fecha, fechas = pd.factorize(fecha)
+    codigos_hora, horas = pd.factorize(hora)
+    dias = _fechas_desde_texto(fechas)
+    duraciones = _horas_desde_texto(horas)
+
+    presentes = (codigos_fecha >= 0) & (codigos_hora >= 0)
+    valores = np.full(len(codigos_fecha), np.datetime64("NaT"), dtype="datetime64[s]")
+    valores[presentes] = (dias[codigos_fecha[presentes]].astype("datetime64[s]")
+                          + duraciones[codigos_hora[presentes]])
+
+    fallidos = presentes & np.isnat(valores)
+    if fallidos.any():
+        # Otros formatos: inferencia con día primero, una vez por combinación distinta
+        pares = pd.factorize(pd.Series(fechas[codigos_fecha[fallidos]]).astype(str) + " "
+                             + pd.Series(horas[codigos_hora[fallidos]]).astype(str))
+        inferidos = pd.to_datetime(pd.Series(pares[1]), format="mixed", dayfirst=True, errors="coerce")
+        valores[fallidos] = inferidos.to_numpy(dtype="datetime64[s]")[pares[0]]
+        fallidos = presentes & np.isnat(valores)
+
+    indice = fecha.index if isinstance(fecha, pd.Series) else None
+    return pd.Series(valores.astype("datetime64[ns]"), index=indice), fallidos
+
+
+def combinar_fecha_hora(fecha, hora):
+    """Une Fecha y Hora en datetime64 con el formato de exportación (d/m/aaaa HH:MM)"""
+    return interpretar_fecha_hora(fecha, hora)[0]
+
+
+def _avisar_fechas_invalidas(df, fallidos, avisar):
+    """Avisa de cuántas filas tienen Fecha/Hora no interpretable, con un ejemplo"""
+    fila = int(np.flatnonzero(fallidos)[0])
+    ejemplo = f"'{df['Fecha'].iloc[fila]} {df['Hora'].iloc[fila]}'"
+    if "archivo_origen" in df.columns:
+        ejemplo += f" en {df['archivo_origen'].iloc[fila]}"
+    avisar(f"⚠️ {int(fallidos.sum())} filas con Fecha/Hora no reconocida (p. ej. {ejemplo}): "
+           f"no aparecen en la tendencia temporal")
+
+
+def normalizar(df, avisar=None):
+    """Devuelve una copia compacta y tipada del DataFrame de simulaciones
+
+    Si se pasa avisar, se informa de las filas con Fecha/Hora no interpretable.
+    """
+    datos = {}
+
+    if "Fecha" in df.columns and "Hora" in df.columns:
+        datos[COLUMNA_MOMENTO], fallidos = interpretar_fecha_hora(df["Fecha"], df["Hora"])
+        if avisar and fallidos.any():
+            _avisar_fechas_invalidas(df, fallidos, avisar)
+    elif COLUMNA_MOMENTO in df.columns:
+        datos[COLUMNA_MOMENTO] = df[COLUMNA_MOMENTO]
+
+    for columna in df.columns:
+        if columna in ("Fecha", "Hora", COLUMNA_MOMENTO):
+            continue
+        serie = df[columna]
+        if columna in COLUMNAS_EFECTO_ENTERO:
+            datos[columna] = _compactar(_numeros_desde_texto(serie), entero=True)
+        elif columna == COLUMNA_EFECTO_SUEÑO:
+            datos[columna] = _numeros_desde_texto(serie).astype(np.float32)
+        elif columna in COLUMNAS_ENTERAS or columna in COLUMNAS_DECIMALES:
+            valores = pd.to_numeric(serie, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            datos[columna] = _compactar(valores, entero=columna in COLUMNAS_ENTERAS)
+        elif columna == "archivo_origen":
+            datos[columna] = serie.astype("category")
+        else:
+            datos[columna] = serie
+
+    return pd.DataFrame(datos, index=df.index)
+
+
+def memoria(df):
+    """Bytes que ocupa el DataFrame, contando el contenido de los textos"""
+    return int(df.memory_usage(deep=True).sum())
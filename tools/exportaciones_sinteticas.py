@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Exportaciones sintéticas con el formato exacto de `exportToCSV`
+===============================================================
+
+Genera carpetas de prueba realistas para medir el analizador:
+
+- Mismo CSV que descarga la app: cabecera y textos entre comillas, números
+  sin comillas, líneas separadas por "\\n" sin salto final y sin BOM.
+- Fecha/Hora plausibles: cada paciente tiene su propio historial de varios
+  meses, con unas tres simulaciones al día alrededor de las comidas.
+- Deslizadores con valores enteros y repartos creíbles (hidratos alrededor de
+  55 g, caminatas cortas, sueño de 7 h) y columnas de efecto calculadas con
+  el modelo de la app (`modelo.simular_exportaciones`).
+- Dos disposiciones: muchos archivos de una fila (una descarga por
+  simulación, con el nombre del navegador "simulacion_diabetes_1-11-2025 (2).csv")
+  o unos pocos archivos grandes con las filas de varios pacientes.
+- Con `--formato json`, los mismos datos como los escribe `exportToJSON`:
+  cada descarga es un documento con formato y los archivos grandes son NDJSON
+  (un documento por línea).
+
+Las filas se generan y escriben por tramos, así que 10 millones de filas no
+necesitan más memoria que un tramo.
+
+Uso:
+    python exportaciones_sinteticas.py --filas 100000 --archivos 100000 --salida datos_100k
+    python exportaciones_sinteticas.py --filas 10000000 --archivos 10 --salida datos_10M
+    python exportaciones_sinteticas.py --filas 1000000 --archivos 4 --formato json --salida datos_1M_json
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+
+import numpy as np
+
+import modelo
+
+SIMULACIONES_POR_PACIENTE = 1_000  # Unos 11 meses a tres simulaciones por día
+SIMULACIONES_POR_DIA = 3
+INICIO_HISTORIALES = np.datetime64("2024-01-01")
+DIAS_INICIO = 540  # Los historiales empiezan en algún día de 2024 o del primer semestre de 2025
+
+# Minuto del día de desayuno, comida y cena (y su peso), con ±25 min de dispersión
+MINUTOS_COMIDAS = np.array([8 * 60, 14 * 60, 21 * 60])
+PESOS_COMIDAS = np.array([0.3, 0.35, 0.25])  # El 10 % restante, a cualquier hora entre 7:00 y 23:00
+DISPERSION_MINUTOS = 25
+
+FILAS_POR_TRAMO = 500_000
+NOMBRE_DESCARGA = "simulacion_diabetes_{fecha}"
+NOMBRE_ARCHIVO_GRANDE = "simulaciones_{numero:03d}"
+FORMATOS = ("csv", "json")
+EXTENSION_GRANDE = {"csv": ".csv", "json": ".ndjson"}
+NOTA_JSON = "Esta simulación es educativa. Consulta siempre con tu médico para tu manejo personalizado."
+
+
+def pacientes_por_defecto(filas):
+    """Número de pacientes para que cada uno tenga un historial de tamaño realista"""
+    return max(1, -(-filas // SIMULACIONES_POR_PACIENTE))
+
+
+def _reparto(total, partes):
+    """Tamaños de `partes` trozos consecutivos que suman total"""
+    base, resto = divmod(total, partes)
+    return np.full(partes, base, dtype=np.int64) + (np.arange(partes) < resto)
+
+
+def generar_momentos(filas_por_paciente, rng):
+    """Momentos ordenados de las simulaciones de cada paciente (datetime64[m])
+
+    Cada paciente reparte sus simulaciones en días de un historial propio y
+    dentro del día las sitúa cerca de las comidas.
+    """
+    n = int(filas_por_paciente.sum())
+    paciente = np.repeat(np.arange(len(filas_por_paciente)), filas_por_paciente)
+    dias_historial = np.maximum(filas_por_paciente // SIMULACIONES_POR_DIA, 1)
+    dia = (rng.random(n) * dias_historial[paciente]).astype(np.int64)
+
+    comida = rng.choice(len(MINUTOS_COMIDAS) + 1, size=n, p=np.append(PESOS_COMIDAS, 1 - PESOS_COMIDAS.sum()))
+    minuto = np.where(comida < len(MINUTOS_COMIDAS),
+                      MINUTOS_COMIDAS[np.minimum(comida, len(MINUTOS_COMIDAS) - 1)]
+                      + rng.normal(0, DISPERSION_MINUTOS, n),
+                      rng.uniform(7 * 60, 23 * 60, n))
+    minuto = np.clip(np.rint(minuto), 6 * 60, 24 * 60 - 1).astype(np.int64)
+
+    orden = np.lexsort((minuto, dia, paciente))
+    inicio = INICIO_HISTORIALES + rng.integers(0, DIAS_INICIO, len(filas_por_paciente))
+    dias = inicio[paciente[orden]] + dia[orden]
+    return dias.astype("datetime64[m]") + minuto[orden].astype("timedelta64[m]")
+
+
+def generar_deslizadores(n, rng):
+    """Posiciones enteras de hidratos, caminata y sueño dentro de los rangos de la app"""
+    hidratos = np.clip(np.rint(rng.normal(55, 22, n)), *modelo.RANGO_HIDRATOS).astype(np.int64)
+    caminata = np.clip(np.rint(rng.exponential(18, n)), *modelo.RANGO_CAMINATA).astype(np.int64)
+    sueño = np.clip(np.rint(rng.normal(7, 1.3, n)), *modelo.RANGO_SUEÑO).astype(np.int64)
+    return hidratos, caminata, sueño
+
+
+def generar_tramos(filas, pacientes=None, semilla=None, filas_por_tramo=FILAS_POR_TRAMO):
+    """Genera DataFrames con el esquema de exportación, de como mucho ~filas_por_tramo filas
+
+    Cada tramo contiene pacientes completos (salvo que un paciente solo ya
+    supere el tramo), en orden de paciente y de fecha.
+    """
+    rng = np.random.default_rng(semilla)
+    pacientes = pacientes or pacientes_por_defecto(filas)
+    por_paciente = _reparto(filas, pacientes)
+
+    actual = []
+    for numero, cantidad in enumerate(por_paciente, start=1):
+        actual.append(cantidad)
+        if sum(actual) >= filas_por_tramo or numero == pacientes:
+            tamaños = np.array(actual, dtype=np.int64)
+            momentos = generar_momentos(tamaños, rng)
+            df = modelo.simular_exportaciones(*generar_deslizadores(len(momentos), rng), momentos)
+            df.insert(0, "_paciente", np.repeat(np.arange(numero - len(actual), numero), tamaños) + 1)
+            yield df
+            actual = []
+
+
+def a_csv(df):
+    """Líneas CSV como las escribe la app (textos entre comillas, números sin ellas)"""
+    texto = df.to_csv(index=False, header=False, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+    return texto.split("\n")[:-1]
+
+
+def _recomendaciones_app(glucosa, sueño, caminata):
+    """Lista de `generarRecomendaciones` (js/script.js) para una simulación"""
+    if glucosa > 140:
+        lista = ["⚠️ Glucosa alta: Reduce hidratos de carbono en la próxima comida",
+                 "💡 Aumenta el tiempo de caminata a 30-40 minutos para mejorar el control"]
+    elif glucosa < 80:
+        lista = ["⚠️ Glucosa baja: Asegúrate de consumir hidratos suficientes",
+                 "💡 Reduce el tiempo de caminata si es muy intenso"]
+    else:
+        lista = ["✅ ¡Excelente equilibrio! Mantén estos hábitos"]
+    if sueño < 7:
+        lista.append("💤 Prioriza dormir 7-8 horas para mejorar la sensibilidad a la insulina")
+    elif sueño > 8:
+        lista.append("💤 El sueño excesivo puede afectar el metabolismo. 7-8 horas es ideal")
+    if caminata < 30:
+        lista.append("🚶‍♂️ Intenta caminar al menos 30 minutos diarios para un mejor control glucémico")
+    return lista
+
+
+def a_json(df):
+    """Documentos como los de exportToJSON, uno por fila"""
+    columnas = [df[c].tolist() for c in ("Fecha", "Hora", "Hidratos (g)", "Caminata (min)", "Sueño (h)",
+                                          "Glucosa (mg/dL)", "Efecto HC", "Efecto Caminar", "Efecto Sueño")]
+    return [{
+        "tipo": "Simulación Educativa Diabetes Tipo 2",
+        "fecha": fecha,
+        "hora": hora,
+        "parametros": {"hidratos_carbono_gramos": hidratos, "minutos_caminando": caminata, "horas_sueño": sueño},
+        "resultados": {
+            "glucosa_estimada_mg_dl": glucosa,
+            "efecto_hidratos": f"{efecto_hc} mg/dL",
+            "efecto_caminata": f"{efecto_caminar} mg/dL",
+            "efecto_sueño": efecto_sueño,
+        },
+        "recomendaciones": _recomendaciones_app(glucosa, sueño, caminata),
+        "notas": NOTA_JSON,
+    } for fecha, hora, hidratos, caminata, sueño, glucosa, efecto_hc, efecto_caminar, efecto_sueño in zip(*columnas)]
+
+
+def cabecera():
+    """Cabecera entrecomillada de exportToCSV"""
+    import ingesta
+    return ",".join(f'"{columna}"' for columna in ingesta.COLUMNAS_EXPORTACION)
+
+
+def _nombre_descarga(fecha, usados, extension=".csv"):
+    """Nombre que daría el navegador a la descarga, con " (n)" si ya existe"""
+    base = NOMBRE_DESCARGA.format(fecha=fecha.replace("/", "-"))
+    n = usados.get(base, 0)
+    usados[base] = n + 1
+    return base + extension if n == 0 else f"{base} ({n}){extension}"
+
+
+def escribir_descargas(tramos, carpeta, por_paciente, formato="csv"):
+    """Un archivo de una fila por simulación; en subcarpetas paciente_NNN si hay varios"""
+    linea_cabecera = cabecera()
+    usados = {}
+    archivos = 0
+    for df in tramos:
+        df_app = df.drop(columns="_paciente")
+        if formato == "json":  # JSON.stringify(datos, null, 2)
+            contenidos = [json.dumps(d, ensure_ascii=False, indent=2) for d in a_json(df_app)]
+        else:
+            contenidos = [linea_cabecera + "\n" + linea for linea in a_csv(df_app)]
+        for paciente, fecha, contenido in zip(df["_paciente"], df["Fecha"], contenidos):
+            destino = os.path.join(carpeta, f"paciente_{paciente:03d}") if por_paciente else carpeta
+            if destino not in usados:
+                os.makedirs(destino, exist_ok=True)
+                usados[destino] = {}
+            ruta = os.path.join(destino, _nombre_descarga(fecha, usados[destino], "." + formato))
+            with open(ruta, "w", encoding="utf-8", newline="") as f:
+                f.write(contenido)
+            archivos += 1
+    return archivos
+
+
+def escribir_grandes(tramos, carpeta, archivos, filas, formato="csv"):
+    """Reparte las filas en `archivos` CSV (o NDJSON) grandes, escritos tramo a tramo"""
+    os.makedirs(carpeta, exist_ok=True)
+    cupos = iter(_reparto(filas, archivos))
+    numero, restante, f = 0, 0, None
+    try:
+        for df in tramos:
+            df_app = df.drop(columns="_paciente")
+            if formato == "json":
+                lineas = [json.dumps(d, ensure_ascii=False) for d in a_json(df_app)]
+            else:
+                lineas = a_csv(df_app)
+            inicio = 0
+            while inicio < len(lineas):
+                if restante == 0:
+                    if f:
+                        f.close()
+                    numero, restante = numero + 1, int(next(cupos))
+                    nombre = NOMBRE_ARCHIVO_GRANDE.format(numero=numero) + EXTENSION_GRANDE[formato]
+                    f = open(os.path.join(carpeta, nombre), "w", encoding="utf-8", newline="")
+                    if formato == "csv":
+                        f.write(cabecera())
+                parte = lineas[inicio:inicio + restante]
+                if formato == "csv":
+                    f.write("\n" + "\n".join(parte))
+                else:
+                    f.write("\n".join(parte) + "\n")
+                inicio += len(parte)
+                restante -= len(parte)
+    finally:
+        if f:
+            f.close()
+    return numero
+
+
+def generar(carpeta, filas, archivos, pacientes=None, semilla=None, formato="csv"):
+    """Escribe `filas` simulaciones en `archivos` CSV (o JSON) dentro de carpeta y devuelve cuántos escribió
+
+    Con tantos archivos como filas cada archivo es una descarga de una fila,
+    como las de la app; con menos, las filas se reparten en archivos grandes.
+    """
+    if filas < 1 or not 1 <= archivos <= filas:
+        raise ValueError("Hace falta al menos una fila y entre 1 y tantos archivos como filas")
+    pacientes = pacientes or pacientes_por_defecto(filas)
+    tramos = generar_tramos(filas, pacientes, semilla)
+    if archivos == filas:
+        return escribir_descargas(tramos, carpeta, pacientes > 1, formato)
+    return escribir_grandes(tramos, carpeta, archivos, filas, formato)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera exportaciones sintéticas de la app")
+    parser.add_argument("--filas", type=int, required=True, help="Simulaciones en total")
+    parser.add_argument("--archivos", type=int, default=None,
+                        help="Número de CSV (por defecto uno por fila, como las descargas de la app)")
+    parser.add_argument("--pacientes", type=int, default=None,
+                        help=f"Historiales distintos (por defecto uno cada {SIMULACIONES_POR_PACIENTE} filas)")
+    parser.add_argument("--semilla", type=int, default=None, help="Semilla aleatoria")
+    parser.add_argument("--formato", choices=FORMATOS, default="csv",
+                        help="csv (exportToCSV) o json (exportToJSON; NDJSON en los archivos grandes)")
+    parser.add_argument("--salida", required=True, help="Carpeta de salida")
+    args = parser.parse_args(argv)
+
+    try:
+        escritos = generar(args.salida, args.filas, args.archivos or args.filas, args.pacientes, args.semilla,
+                           args.formato)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    print(f"✅ {args.filas} simulaciones en {escritos} archivos: {os.path.abspath(args.salida)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,440 @@
+/*
+ * Gráficos interactivos del informe de simulaciones diabéticas
+ * ============================================================
+ *
+ * Se incrusta tal cual en el HTML del modo de informe "interactivo": no usa
+ * bibliotecas ni red. Lee los datos de <script id="datos-informe"> (series en
+ * base64 de Float32 little-endian) y dibuja sobre <canvas>:
+ *
+ * - Tendencia de glucosa: rueda del ratón para ampliar, arrastrar para
+ *   desplazarse, doble clic para volver a la vista completa. Con más puntos
+ *   visibles que píxeles se dibuja el mínimo y el máximo de cada columna.
+ * - Factores: barras con las medias de hidratos, caminata y sueño.
+ */
+(function () {
+  'use strict';
+
+  var COLOR_LINEA = '#2980b9';
+  var COLOR_ALTO = '#e74c3c';
+  var COLOR_BAJO = '#2ecc71';
+  var COLOR_TEXTO = '#2c3742';
+  var COLOR_REJILLA = 'rgba(0, 0, 0, 0.08)';
+  var FUENTE = "12px 'Segoe UI', system-ui, sans-serif";
+  var MARGEN = { izq: 56, der: 16, sup: 16, inf: 44 };
+  var PUNTOS_CON_MARCADOR = 200;
+  var MINUTO = 60000;
+  // Pasos posibles de las marcas de tiempo, en minutos
+  var PASOS_TIEMPO = [1, 5, 15, 30, 60, 180, 360, 720, 1440, 2880, 10080, 20160, 43200, 129600, 525600];
+
+  function decodificarFloat32(texto) {
+    var binario = atob(texto);
+    var bytes = new Uint8Array(binario.length);
+    for (var i = 0; i < binario.length; i++) {
+      bytes[i] = binario.charCodeAt(i);
+    }
+    return new Float32Array(bytes.buffer);
+  }
+
+  function prepararLienzo(canvas) {
+    var ratio = window.devicePixelRatio || 1;
+    var ancho = canvas.clientWidth;
+    var alto = canvas.clientHeight;
+    canvas.width = Math.round(ancho * ratio);
+    canvas.height = Math.round(alto * ratio);
+    var ctx = canvas.getContext('2d');
+    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+    ctx.clearRect(0, 0, ancho, alto);
+    ctx.font = FUENTE;
+    return { ctx: ctx, ancho: ancho, alto: alto };
+  }
+
+  function marcasNumericas(min, max, cuantas) {
+    if (!(max > min)) {
+      return [min];
+    }
+    var bruto = (max - min) / cuantas;
+    var paso = Math.pow(10, Math.floor(Math.log(bruto) / Math.LN10));
+    var relativo = bruto / paso;
+    paso *= relativo > 5 ? 10 : relativo > 2 ? 5 : relativo > 1 ? 2 : 1;
+    var marcas = [];
+    for (var v = Math.ceil(min / paso) * paso; v <= max + paso * 1e-9; v += paso) {
+      marcas.push(v);
+    }
+    return marcas;
+  }
+
+  function dosCifras(n) {
+    return (n < 10 ? '0' : '') + n;
+  }
+
+  // Los momentos se guardan como hora local sin zona: se formatean en UTC para no desplazarlos
+  function formatearMomento(ms, conHora, conAño) {
+    var d = new Date(ms);
+    var texto = dosCifras(d.getUTCDate()) + '/' + dosCifras(d.getUTCMonth() + 1);
+    if (conAño) {
+      texto += '/' + d.getUTCFullYear();
+    }
+    if (conHora) {
+      texto += ' ' + dosCifras(d.getUTCHours()) + ':' + dosCifras(d.getUTCMinutes());
+    }
+    return texto;
+  }
+
+  // Primer índice con x[i] >= valor (x ordenado)
+  function buscar(x, valor) {
+    var bajo = 0;
+    var alto = x.length;
+    while (bajo < alto) {
+      var medio = (bajo + alto) >> 1;
+      if (x[medio] < valor) {
+        bajo = medio + 1;
+      } else {
+        alto = medio;
+      }
+    }
+    return bajo;
+  }
+
+  function GraficoTendencia(canvas, datos, umbrales) {
+    this.canvas = canvas;
+    this.modo = datos.modo;
+    this.inicio = datos.inicio;
+    this.x = decodificarFloat32(datos.x);
+    this.y = decodificarFloat32(datos.y);
+    this.umbrales = umbrales;
+    var n = this.x.length;
+    this.completo = n ? [this.x[0], this.x[n - 1]] : [0, 1];
+    if (this.completo[1] <= this.completo[0]) {
+      this.completo = [this.completo[0] - 1, this.completo[0] + 1];
+    }
+    this.vista = this.completo.slice();
+    this.cursor = null;
+    this.arrastre = null;
+    this.escuchar();
+  }
+
+  GraficoTendencia.prototype.escuchar = function () {
+    var self = this;
+    var canvas = this.canvas;
+
+    canvas.addEventListener('wheel', function (evento) {
+      evento.preventDefault();
+      var centro = self.valorEn(evento.offsetX);
+      var factor = evento.deltaY < 0 ? 0.8 : 1.25;
+      self.ajustarVista(centro - (centro - self.vista[0]) * factor,
+                        centro + (self.vista[1] - centro) * factor);
+    }, { passive: false });
+
+    canvas.addEventListener('mousedown', function (evento) {
+      self.arrastre = { x: evento.offsetX, vista: self.vista.slice() };
+    });
+
+    window.addEventListener('mouseup', function () {
+      self.arrastre = null;
+    });
+
+    canvas.addEventListener('mousemove', function (evento) {
+      if (self.arrastre) {
+        var ancho = canvas.clientWidth - MARGEN.izq - MARGEN.der;
+        var desplazamiento = (evento.offsetX - self.arrastre.x) / ancho *
+          (self.arrastre.vista[1] - self.arrastre.vista[0]);
+        self.ajustarVista(self.arrastre.vista[0] - desplazamiento, self.arrastre.vista[1] - desplazamiento);
+      } else {
+        self.cursor = evento.offsetX;
+        self.dibujar();
+      }
+    });
+
+    canvas.addEventListener('mouseleave', function () {
+      self.cursor = null;
+      self.dibujar();
+    });
+
+    canvas.addEventListener('dblclick', function () {
+      self.ajustarVista(self.completo[0], self.completo[1]);
+    });
+  };
+
+  GraficoTendencia.prototype.valorEn = function (px) {
+    var ancho = this.canvas.clientWidth - MARGEN.izq - MARGEN.der;
+    return this.vista[0] + (px - MARGEN.izq) / ancho * (this.vista[1] - this.vista[0]);
+  };
+
+  GraficoTendencia.prototype.ajustarVista = function (desde, hasta) {
+    var total = this.completo[1] - this.completo[0];
+    // Como mínimo se ven unos pocos minutos (o simulaciones)
+    var minimo = Math.min(total, this.modo === 'tiempo' ? 10 : 5);
+    var ancho = Math.min(Math.max(hasta - desde, minimo), total);
+    desde = Math.max(this.completo[0], Math.min(desde, this.completo[1] - ancho));
+    this.vista = [desde, desde + ancho];
+    this.dibujar();
+  };
+
+  GraficoTendencia.prototype.textoX = function (valor, paso) {
+    if (this.modo !== 'tiempo') {
+      return String(Math.round(valor) + 1);
+    }
+    return formatearMomento(this.inicio + valor * MINUTO, paso < 1440, paso >= 43200);
+  };
+
+  GraficoTendencia.prototype.marcasX = function (ancho) {
+    var v0 = this.vista[0];
+    var v1 = this.vista[1];
+    var cuantas = Math.max(2, Math.floor(ancho / 110));
+    if (this.modo !== 'tiempo') {
+      return { marcas: marcasNumericas(v0, v1, cuantas), paso: 1 };
+    }
+    var paso = PASOS_TIEMPO[PASOS_TIEMPO.length - 1];
+    for (var i = 0; i < PASOS_TIEMPO.length; i++) {
+      if ((v1 - v0) / PASOS_TIEMPO[i] <= cuantas) {
+        paso = PASOS_TIEMPO[i];
+        break;
+      }
+    }
+    var marcas = [];
+    for (var v = Math.ceil(v0 / paso) * paso; v <= v1; v += paso) {
+      marcas.push(v);
+    }
+    return { marcas: marcas, paso: paso };
+  };
+
+  GraficoTendencia.prototype.dibujar = function () {
+    var lienzo = prepararLienzo(this.canvas);
+    var ctx = lienzo.ctx;
+    var izq = MARGEN.izq;
+    var der = lienzo.ancho - MARGEN.der;
+    var sup = MARGEN.sup;
+    var inf = lienzo.alto - MARGEN.inf;
+    var x = this.x;
+    var y = this.y;
+    var v0 = this.vista[0];
+    var v1 = this.vista[1];
+
+    // Puntos visibles, más uno a cada lado para que la línea llegue al borde
+    var i0 = Math.max(0, buscar(x, v0) - 1);
+    var i1 = Math.min(x.length, buscar(x, v1) + 1);
+
+    var yMin = this.umbrales[0];
+    var yMax = this.umbrales[1];
+    for (var i = i0; i < i1; i++) {
+      if (y[i] < yMin) { yMin = y[i]; }
+      if (y[i] > yMax) { yMax = y[i]; }
+    }
+    var holgura = (yMax - yMin) * 0.05 || 1;
+    yMin -= holgura;
+    yMax += holgura;
+
+    function px(valor) { return izq + (valor - v0) / (v1 - v0) * (der - izq); }
+    function py(valor) { return inf - (valor - yMin) / (yMax - yMin) * (inf - sup); }
+
+    // Rejilla y ejes
+    ctx.strokeStyle = COLOR_REJILLA;
+    ctx.fillStyle = COLOR_TEXTO;
+    ctx.lineWidth = 1;
+    ctx.textAlign = 'right';
+    ctx.textBaseline = 'middle';
+    marcasNumericas(yMin, yMax, 6).forEach(function (valor) {
+      ctx.beginPath();
+      ctx.moveTo(izq, Math.round(py(valor)) + 0.5);
+      ctx.lineTo(der, Math.round(py(valor)) + 0.5);
+      ctx.stroke();
+      ctx.fillText(String(Math.round(valor * 10) / 10), izq - 6, py(valor));
+    });
+    var ejeX = this.marcasX(der - izq);
+    ctx.textAlign = 'center';
+    ctx.textBaseline = 'top';
+    var self = this;
+    ejeX.marcas.forEach(function (valor) {
+      ctx.beginPath();
+      ctx.moveTo(Math.round(px(valor)) + 0.5, sup);
+      ctx.lineTo(Math.round(px(valor)) + 0.5, inf);
+      ctx.stroke();
+      ctx.fillText(self.textoX(valor, ejeX.paso), px(valor), inf + 6);
+    });
+    ctx.strokeStyle = COLOR_TEXTO;
+    ctx.strokeRect(izq + 0.5, sup + 0.5, der - izq, inf - sup);
+    ctx.save();
+    ctx.translate(14, (sup + inf) / 2);
+    ctx.rotate(-Math.PI / 2);
+    ctx.textBaseline = 'middle';
+    ctx.fillText('Glucosa (mg/dL)', 0, 0);
+    ctx.restore();
+
+    ctx.save();
+    ctx.beginPath();
+    ctx.rect(izq, sup, der - izq, inf - sup);
+    ctx.clip();
+
+    // Líneas de 80 y 140 mg/dL
+    ctx.setLineDash([6, 4]);
+    ctx.lineWidth = 1.5;
+    [[this.umbrales[1], COLOR_ALTO], [this.umbrales[0], COLOR_BAJO]].forEach(function (linea) {
+      ctx.strokeStyle = linea[1];
+      ctx.beginPath();
+      ctx.moveTo(izq, py(linea[0]));
+      ctx.lineTo(der, py(linea[0]));
+      ctx.stroke();
+    });
+    ctx.setLineDash([]);
+
+    // Serie: mínimo y máximo por columna de píxeles si hay más puntos que píxeles
+    ctx.strokeStyle = COLOR_LINEA;
+    ctx.fillStyle = COLOR_LINEA;
+    ctx.beginPath();
+    var visibles = i1 - i0;
+    var empezada = false;
+    if (visibles > 2 * (der - izq)) {
+      ctx.lineWidth = 1;
+      var columna = null;
+      var primero, ultimo, minimo, maximo;
+      var vaciar = function () {
+        if (columna === null) { return; }
+        if (empezada) {
+          ctx.lineTo(columna, py(primero));
+        } else {
+          ctx.moveTo(columna, py(primero));
+          empezada = true;
+        }
+        ctx.lineTo(columna, py(minimo));
+        ctx.lineTo(columna, py(maximo));
+        ctx.lineTo(columna, py(ultimo));
+      };
+      for (var j = i0; j < i1; j++) {
+        if (isNaN(y[j])) { continue; }
+        var c = Math.round(px(x[j]));
+        if (c !== columna) {
+          vaciar();
+          columna = c;
+          primero = minimo = maximo = y[j];
+        }
+        if (y[j] < minimo) { minimo = y[j]; }
+        if (y[j] > maximo) { maximo = y[j]; }
+        ultimo = y[j];
+      }
+      vaciar();
+      ctx.stroke();
+    } else {
+      ctx.lineWidth = visibles <= PUNTOS_CON_MARCADOR ? 2 : 1.5;
+      for (var k = i0; k < i1; k++) {
+        if (isNaN(y[k])) { empezada = false; continue; }
+        if (empezada) {
+          ctx.lineTo(px(x[k]), py(y[k]));
+        } else {
+          ctx.moveTo(px(x[k]), py(y[k]));
+          empezada = true;
+        }
+      }
+      ctx.stroke();
+      if (visibles <= PUNTOS_CON_MARCADOR) {
+        for (var m = i0; m < i1; m++) {
+          if (isNaN(y[m])) { continue; }
+          ctx.beginPath();
+          ctx.arc(px(x[m]), py(y[m]), 4, 0, 2 * Math.PI);
+          ctx.fill();
+        }
+      }
+    }
+
+    // Valor más cercano al cursor
+    if (this.cursor !== null && this.cursor >= izq && this.cursor <= der && x.length) {
+      var valor = this.valorEn(this.cursor);
+      var indice = Math.min(buscar(x, valor), x.length - 1);
+      if (indice > 0 && valor - x[indice - 1] < x[indice] - valor) {
+        indice -= 1;
+      }
+      if (!isNaN(y[indice])) {
+        ctx.beginPath();
+        ctx.arc(px(x[indice]), py(y[indice]), 5, 0, 2 * Math.PI);
+        ctx.fill();
+        var etiqueta = (this.modo === 'tiempo'
+          ? formatearMomento(this.inicio + x[indice] * MINUTO, true, true)
+          : 'Simulación ' + (x[indice] + 1)) + ' · ' + Math.round(y[indice]) + ' mg/dL';
+        var anchoEtiqueta = ctx.measureText(etiqueta).width + 12;
+        var ex = Math.min(Math.max(px(x[indice]) - anchoEtiqueta / 2, izq + 2), der - anchoEtiqueta - 2);
+        ctx.fillStyle = 'rgba(255, 255, 255, 0.92)';
+        ctx.fillRect(ex, sup + 4, anchoEtiqueta, 22);
+        ctx.strokeStyle = COLOR_LINEA;
+        ctx.strokeRect(ex + 0.5, sup + 4.5, anchoEtiqueta, 22);
+        ctx.fillStyle = COLOR_TEXTO;
+        ctx.textAlign = 'left';
+        ctx.textBaseline = 'middle';
+        ctx.fillText(etiqueta, ex + 6, sup + 15);
+      }
+    }
+    ctx.restore();
+  };
+
+  function dibujarFactores(canvas, datos) {
+    var lienzo = prepararLienzo(canvas);
+    var ctx = lienzo.ctx;
+    var izq = MARGEN.izq;
+    var der = lienzo.ancho - MARGEN.der;
+    var sup = MARGEN.sup + 8;
+    var inf = lienzo.alto - MARGEN.inf;
+    var valores = datos.valores;
+    var yMax = datos.ejemplo ? 60 : Math.max(Math.max.apply(null, valores) * 1.3, 1);
+
+    function py(valor) { return inf - valor / yMax * (inf - sup); }
+
+    ctx.strokeStyle = COLOR_REJILLA;
+    ctx.fillStyle = COLOR_TEXTO;
+    ctx.textAlign = 'right';
+    ctx.textBaseline = 'middle';
+    marcasNumericas(0, yMax, 6).forEach(function (valor) {
+      ctx.beginPath();
+      ctx.moveTo(izq, Math.round(py(valor)) + 0.5);
+      ctx.lineTo(der, Math.round(py(valor)) + 0.5);
+      ctx.stroke();
+      ctx.fillText(String(valor), izq - 6, py(valor));
+    });
+    ctx.strokeStyle = COLOR_TEXTO;
+    ctx.strokeRect(izq + 0.5, sup + 0.5, der - izq, inf - sup);
+
+    var hueco = (der - izq) / valores.length;
+    valores.forEach(function (valor, i) {
+      var centro = izq + hueco * (i + 0.5);
+      var anchoBarra = hueco * 0.8;
+      ctx.globalAlpha = 0.85;
+      ctx.fillStyle = datos.colores[i];
+      ctx.fillRect(centro - anchoBarra / 2, py(valor), anchoBarra, inf - py(valor));
+      ctx.globalAlpha = 1;
+      ctx.fillStyle = COLOR_TEXTO;
+      ctx.textAlign = 'center';
+      ctx.textBaseline = 'top';
+      ctx.fillText(datos.nombres[i], centro, inf + 6);
+      if (!datos.ejemplo) {
+        ctx.font = 'bold ' + FUENTE;
+        ctx.textBaseline = 'bottom';
+        ctx.fillText(valor.toFixed(1) + ' ' + datos.unidades[i], centro, py(valor) - 3);
+        ctx.font = FUENTE;
+      }
+    });
+  }
+
+  function iniciar() {
+    var nodo = document.getElementById('datos-informe');
+    if (!nodo) { return; }
+    var datos = JSON.parse(nodo.textContent);
+    var dibujos = [];
+
+    var lienzoTendencia = document.getElementById('grafico-tendencia');
+    if (lienzoTendencia && datos.tendencia) {
+      var tendencia = new GraficoTendencia(lienzoTendencia, datos.tendencia, datos.umbrales);
+      dibujos.push(function () { tendencia.dibujar(); });
+    }
+    var lienzoFactores = document.getElementById('grafico-factores');
+    if (lienzoFactores && datos.factores) {
+      dibujos.push(function () { dibujarFactores(lienzoFactores, datos.factores); });
+    }
+
+    var redibujar = function () { dibujos.forEach(function (dibujo) { dibujo(); }); };
+    window.addEventListener('resize', redibujar);
+    redibujar();
+  }
+
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', iniciar);
+  } else {
+    iniciar();
+  }
+})();
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Gráficos del informe con la API orientada a objetos de Matplotlib
+=================================================================
+
+Los gráficos se construyen sobre objetos `Figure`/`Axes` explícitos, sin el
+estado global de `pyplot`, así que pueden dibujarse en paralelo:
+
+- `datos_tendencia` / `datos_factores` preparan en el proceso principal
+  datos simples (arrays y números) que se pueden enviar a otro proceso.
+- `renderizar` dibuja un gráfico reutilizando una plantilla por tipo: la
+  figura, ejes, líneas de referencia y leyenda se crean una vez por proceso
+  y en cada informe solo se actualizan los datos.
+- `renderizar_varios` reparte los gráficos en un pool de procesos cuando se
+  le pasa uno (`crear_pool`), para informes por lotes.
+
+Las series largas de glucosa se reducen antes de dibujar (`reducir_serie`,
+mínimo/máximo por tramo) a un presupuesto fijo de puntos, así que el tiempo
+de dibujo no depende de la longitud del historial.
+
+Los gráficos se pueden generar en PNG, SVG (texto como <text>, sin trazos de
+glifos, para que ocupe menos) o WebP.
+"""
+
+import base64
+import threading
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import esquema
+from agregados import indices_excursiones
+
+# matplotlib se importa al dibujar: el informe interactivo solo necesita los datos
+
+COLOR_LINEA = "#2980b9"
+COLOR_ALTO = "#e74c3c"
+COLOR_BAJO = "#2ecc71"
+COLORES_FACTORES = ['#c2185b', '#1976d2', '#2e7d32']
+NOMBRES_FACTORES = ['Hidratos de carbono', 'Minutos caminando', 'Horas de sueño']
+UNIDADES_FACTORES = ['gramos', 'minutos', 'horas']
+VALORES_EJEMPLO = [50, 20, 7]
+
+TAMANO_FIGURA = (10, 5)
+DPI = 100
+
+PUNTOS_TENDENCIA = 1000  # Presupuesto de puntos: ~1 por píxel de ancho de la figura
+PUNTOS_INTERACTIVO = 20_000  # En el informe interactivo: más detalle para ampliar en el navegador
+PUNTOS_CON_MARCADOR = 200  # Con más puntos los marcadores se solapan y solo se dibuja la línea
+
+FORMATOS = ("png", "svg", "webp")
+TIPOS_MIME = {"png": "image/png", "svg": "image/svg+xml", "webp": "image/webp"}
+CALIDAD_WEBP = 90
+# SVG con texto real y los identificadores internos estables entre ejecuciones
+OPCIONES_SVG = {"svg.fonttype": "none", "svg.hashsalt": "equilibrio-diabetico"}
+
+# Plantillas ya construidas en este proceso, por tipo de gráfico
+_PLANTILLAS = {}
+_CANDADO = threading.Lock()
+
+
+def reducir_serie(y, puntos=PUNTOS_TENDENCIA):
+    """Índices de los puntos que se dibujan de una serie de más de `puntos` valores
+
+    La serie se divide en puntos/2 tramos consecutivos y de cada uno se
+    conservan el mínimo y el máximo (además del primer y último punto), así
+    que el pico de cada tramo nunca se recorta. Los valores por encima de 140
+    o por debajo de 80 mg/dL se conservan además todos mientras no sean más
+    de `puntos`; si lo son, cada racha queda en su primer, último y más
+    extremo valor (`agregados.indices_excursiones`), y el resultado puede
+    tener hasta el doble de puntos. Todo el cálculo es vectorizado.
+    """
+    n = len(y)
+    if not puntos or n <= max(puntos, 2):
+        return np.arange(n)
+
+    tramos = max(puntos // 2, 1)
+    ancho = -(-n // tramos)
+    relleno = tramos * ancho - n
+    valores = np.asarray(y, dtype=np.float64)
+    altos = np.concatenate([np.where(np.isnan(valores), -np.inf, valores), np.full(relleno, -np.inf)])
+    bajos = np.concatenate([np.where(np.isnan(valores), np.inf, valores), np.full(relleno, np.inf)])
+
+    base = np.arange(tramos) * ancho
+    maximos = base + altos.reshape(tramos, ancho).argmax(axis=1)
+    minimos = base + bajos.reshape(tramos, ancho).argmin(axis=1)
+    indices = np.unique(np.concatenate([[0, n - 1], maximos, minimos, indices_excursiones(valores, puntos)]))
+    return indices[indices < n]
+
+
+def datos_tendencia(df, puntos=PUNTOS_TENDENCIA):
+    """Serie de glucosa ordenada para el gráfico de tendencia (None si no hay glucosa)
+
+    Con más de `puntos` filas la serie se reduce con `reducir_serie`.
+    """
+    if df is None or 'Glucosa (mg/dL)' not in df.columns:
+        return None
+
+    if 'datetime' not in df.columns and 'Fecha' in df.columns and 'Hora' in df.columns:
+        df = df.assign(datetime=esquema.combinar_fecha_hora(df['Fecha'], df['Hora']))
+
+    if 'datetime' in df.columns:
+        ordenado = df[['datetime', 'Glucosa (mg/dL)']].dropna(subset=['datetime']).sort_values('datetime')
+        if not ordenado.empty:
+            x = ordenado['datetime'].to_numpy()
+            y = ordenado['Glucosa (mg/dL)'].to_numpy(dtype=np.float64)
+            indices = reducir_serie(y, puntos)
+            return {'modo': 'tiempo', 'x': x[indices], 'y': y[indices], 'total': len(y)}
+
+    y = df['Glucosa (mg/dL)'].to_numpy(dtype=np.float64)
+    indices = reducir_serie(y, puntos)
+    return {'modo': 'indice', 'x': indices, 'y': y[indices], 'total': len(y)}
+
+
+def datos_factores(valores, ejemplo=False):
+    """Valores medios de hidratos, caminata y sueño para el gráfico de barras"""
+    return {'valores': [float(v) for v in valores], 'ejemplo': ejemplo}
+
+
+class PlantillaTendencia:
+    """Figura de tendencia reutilizable: solo cambian los datos de la línea"""
+
+    def __init__(self, modo):
+        from matplotlib.figure import Figure
+        self.figura = Figure(figsize=TAMANO_FIGURA, dpi=DPI)
+        self.ejes = self.figura.add_subplot()
+        self.modo = modo
+
+        if modo == 'tiempo':
+            # Un primer punto de tipo fecha fija el conversor de unidades del eje X
+            marcador = np.array(['2025-01-01T00:00'], dtype='datetime64[us]')
+            (self.linea,) = self.ejes.plot(marcador, [np.nan], marker='o', linewidth=2, markersize=8,
+                                           color=COLOR_LINEA, label='Glucosa medida')
+            self.ejes.set_title('Tendencia de Glucosa en Sangre', fontsize=14, pad=15)
+            self.ejes.set_xlabel('Fecha y Hora', fontsize=10)
+            self.figura.autofmt_xdate()
+        else:
+            (self.linea,) = self.ejes.plot([], [], marker='o', linewidth=2, markersize=8,
+                                           color=COLOR_LINEA, label='Glucosa medida')
+            self.ejes.set_title('Valores de Glucosa Registrados', fontsize=14, pad=15)
+            self.ejes.set_xlabel('Número de Simulación', fontsize=10)
+
+        self.ejes.axhline(y=140, color=COLOR_ALTO, linestyle='--', alpha=0.7, label='Límite alto (>140 mg/dL)')
+        self.ejes.axhline(y=80, color=COLOR_BAJO, linestyle='--', alpha=0.7, label='Límite bajo (<80 mg/dL)')
+        self.ejes.set_ylabel('Glucosa (mg/dL)', fontsize=10)
+        self.ejes.legend(loc='best')
+        self.ejes.grid(True, alpha=0.2)
+
+    def actualizar(self, datos):
+        """Sustituye los datos de la línea y reajusta los ejes"""
+        self.linea.set_data(datos['x'], datos['y'])
+        pocos = len(datos['y']) <= PUNTOS_CON_MARCADOR
+        self.linea.set_marker('o' if pocos else 'None')
+        self.linea.set_linewidth(2 if pocos else 1)
+        self.ejes.relim()
+        self.ejes.autoscale_view()
+        self.figura.tight_layout()
+
+
+class PlantillaFactores:
+    """Gráfico de barras de factores reutilizable: cambian alturas y etiquetas"""
+
+    def __init__(self):
+        from matplotlib.figure import Figure
+        self.figura = Figure(figsize=TAMANO_FIGURA, dpi=DPI)
+        self.ejes = self.figura.add_subplot()
+        self.barras = self.ejes.bar(NOMBRES_FACTORES, VALORES_EJEMPLO, color=COLORES_FACTORES,
+                                    alpha=0.85, edgecolor='white', linewidth=1.5)
+        self.etiquetas = [self.ejes.text(barra.get_x() + barra.get_width()/2, 0, '',
+                                         ha='center', va='bottom', fontweight='bold', fontsize=9)
+                          for barra in self.barras]
+        self.ejes.set_ylabel('Valor Promedio', fontsize=10)
+        self.ejes.grid(True, alpha=0.1, axis='y')
+
+    def actualizar(self, datos):
+        """Aplica los valores medios (o los de ejemplo si falló el cálculo)"""
+        valores = VALORES_EJEMPLO if datos['ejemplo'] else datos['valores']
+        for barra, etiqueta, valor, unidad in zip(self.barras, self.etiquetas, valores, UNIDADES_FACTORES):
+            barra.set_height(valor)
+            etiqueta.set_position((barra.get_x() + barra.get_width()/2, valor + 0.3))
+            etiqueta.set_text(f'{valor:.1f} {unidad}')
+            etiqueta.set_visible(not datos['ejemplo'])
+
+        if datos['ejemplo']:
+            self.ejes.set_title('Factores que Influyen en la Glucosa (Datos de Ejemplo)', fontsize=14, pad=15)
+            self.ejes.set_ylim(0, 60)
+        else:
+            self.ejes.set_title('Factores que Influyen en la Glucosa', fontsize=14, pad=15)
+            self.ejes.set_ylim(0, max(max(valores) * 1.3, 1))  # Añadir espacio para etiquetas
+        self.figura.tight_layout()
+
+
+def _plantilla(tipo, datos):
+    """Plantilla de este proceso para el tipo de gráfico, creada la primera vez"""
+    clave = (tipo, datos['modo']) if tipo == 'tendencia' and datos else (tipo, None)
+    if clave not in _PLANTILLAS:
+        if tipo == 'tendencia':
+            _PLANTILLAS[clave] = PlantillaTendencia(datos['modo']) if datos else None
+        else:
+            _PLANTILLAS[clave] = PlantillaFactores()
+    return _PLANTILLAS[clave]
+
+
+def _figura_vacia():
+    """Figura en blanco cuando no hay columna de glucosa"""
+    from matplotlib.figure import Figure
+    return Figure(figsize=TAMANO_FIGURA, dpi=DPI)
+
+
+def renderizar(tipo, datos, formato='png'):
+    """Dibuja un gráfico ('tendencia' o 'factores') y devuelve los bytes de la imagen"""
+    import matplotlib
+
+    with _CANDADO:
+        plantilla = _plantilla(tipo, datos)
+        if plantilla is None:
+            figura = _figura_vacia()
+        else:
+            plantilla.actualizar(datos)
+            figura = plantilla.figura
+
+        buf = BytesIO()
+        opciones = {'pil_kwargs': {'quality': CALIDAD_WEBP}} if formato == 'webp' else {}
+        with matplotlib.rc_context(OPCIONES_SVG if formato == 'svg' else {}):
+            figura.savefig(buf, format=formato, dpi=DPI, bbox_inches='tight', **opciones)
+        return buf.getvalue()
+
+
+def crear_pool(procesos=None):
+    """Pool de procesos para dibujar gráficos en paralelo (reutilizable entre informes)"""
+    return ProcessPoolExecutor(max_workers=procesos)
+
+
+def renderizar_varios(trabajos, pool=None, formato='png'):
+    """Dibuja una lista de (tipo, datos); en paralelo si se pasa un pool"""
+    if pool is None:
+        return [renderizar(tipo, datos, formato) for tipo, datos in trabajos]
+    futuros = [pool.submit(renderizar, tipo, datos, formato) for tipo, datos in trabajos]
+    return [futuro.result() for futuro in futuros]
+
+
+class Imagen:
+    """Bytes de un gráfico ya dibujado y su formato"""
+
+    def __init__(self, datos, formato='png'):
+        self.datos = datos
+        self.formato = formato
+
+    @property
+    def tipo_mime(self):
+        return TIPOS_MIME[self.formato]
+
+    def a_data_uri(self):
+        return a_data_uri(self.datos, self.formato)
+
+
+def a_data_uri(imagen, formato='png'):
+    """Codifica la imagen en base64 para incrustarla en el informe"""
+    return f"data:{TIPOS_MIME[formato]};base64,{base64.b64encode(imagen).decode('utf-8')}"
@@ -0,0 +1,680 @@
+#!/usr/bin/env python3
+"""
+Escritura del informe HTML
+==========================
+
+La plantilla se analiza una sola vez al importar el módulo (trozos de texto
+fijo y campos) y el informe se escribe por partes directamente en el archivo,
+sin construir antes todo el HTML en memoria. Las imágenes en base64 también
+se codifican y escriben por trozos.
+
+Modos de salida:
+- autonomo: un único archivo HTML con los gráficos incrustados (data URI en
+  PNG/WebP, o el SVG directamente en el HTML, sin base64)
+- carpeta: el HTML y, al lado, una carpeta `<informe>_archivos/` con los
+  gráficos como archivos; el HTML ocupa unos pocos KiB
+- interactivo: sin imágenes; la serie de glucosa (reducida) y las medias se
+  incrustan como Float32 en base64 y `grafico_interactivo.js` las dibuja en
+  <canvas> en el navegador, con zoom y desplazamiento, sin red ni bibliotecas
+
+Tras los gráficos va el perfil de glucosa (`seccion_perfil`): tiempo en
+rango, gráfico AGP en SVG directamente en el HTML (igual en los tres modos)
+y tablas por día y por origen. Opcionalmente el informe termina con una
+sección de diagnóstico con los tiempos de cada etapa del análisis
+(`seccion_diagnostico`).
+"""
+
+import os
+import html
+import json
+import base64
+import string
+from urllib.parse import quote
+
+import numpy as np
+
+MODO_AUTONOMO = "autonomo"
+MODO_CARPETA = "carpeta"
+MODO_INTERACTIVO = "interactivo"
+MODOS = (MODO_AUTONOMO, MODO_CARPETA, MODO_INTERACTIVO)
+
+SUFIJO_CARPETA = "_archivos"
+TAMANO_TROZO = 3 * 16 * 1024  # Múltiplo de 3: cada trozo se codifica en base64 sin relleno intermedio
+ESTILO_IMAGEN = "max-width: 100%; border-radius: 8px;"
+ESTILO_LIENZO = "display: block; width: 100%; height: 380px; cursor: grab;"
+ARCHIVO_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grafico_interactivo.js")
+AYUDA_ZOOM = "Rueda del ratón: ampliar · Arrastrar: desplazarse · Doble clic: vista completa"
+DIAS_EN_INFORME = 14
+ORIGENES_EN_INFORME = 10
+COLORES_BANDAS = {"bajo": "var(--warning)", "rango": "var(--success)", "alto": "var(--danger)"}
+
+PLANTILLA = """    <!DOCTYPE html>
+    <html lang="es">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>📋 Informe de Simulaciones Diabéticas</title>
+        <style>
+            :root {{
+                --primary: #2980b9;
+                --success: #2ecc71;
+                --warning: #f39c12;
+                --danger: #e74c3c;
+                --light: #f9fbfd;
+                --dark: #2c3742;
+            }}
+            * {{
+                box-sizing: border-box;
+                margin: 0;
+                padding: 0;
+            }}
+            body {{
+                font-family: 'Segoe UI', system-ui, sans-serif;
+                background: var(--light);
+                color: var(--dark);
+                line-height: 1.6;
+                padding: 1rem;
+                max-width: 1000px;
+                margin: 0 auto;
+            }}
+            header {{
+                text-align: center;
+                padding: 1.5rem 0;
+                background: white;
+                border-radius: 16px;
+                margin-bottom: 1.5rem;
+                box-shadow: 0 4px 8px rgba(0,0,0,0.08);
+            }}
+            h1 {{
+                color: var(--primary);
+                font-size: 2rem;
+                margin-bottom: 0.5rem;
+            }}
+            .subtitle {{
+                color: #7f8c8d;
+                font-size: 1.1rem;
+            }}
+            .stats-grid {{
+                display: grid;
+                grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+                gap: 1rem;
+                margin-bottom: 1.5rem;
+            }}
+            .stat-card {{
+                background: white;
+                border-radius: 12px;
+                padding: 1rem;
+                text-align: center;
+                box-shadow: 0 2px 6px rgba(0,0,0,0.08);
+                border: 2px solid #e0e6ed;
+            }}
+            .stat-value {{
+                font-size: 1.8rem;
+                font-weight: bold;
+                margin: 0.5rem 0;
+            }}
+            .stat-label {{
+                color: #7f8c8d;
+                font-size: 0.95rem;
+            }}
+            .estado {{
+                padding: 0.8rem;
+                border-radius: 12px;
+                font-weight: bold;
+                font-size: 1.2rem;
+                text-align: center;
+                margin: 1rem 0;
+            }}
+            .graficos {{
+                display: grid;
+                grid-template-columns: 1fr;
+                gap: 1.5rem;
+                margin: 1.5rem 0;
+            }}
+            .grafico-container {{
+                background: white;
+                border-radius: 12px;
+                padding: 1rem;
+                box-shadow: 0 2px 6px rgba(0,0,0,0.08);
+            }}
+            .grafico-container svg {{
+                max-width: 100%;
+                height: auto;
+            }}
+            .recomendaciones {{
+                background: #e8f4fc;
+                border-radius: 12px;
+                padding: 1.5rem;
+                margin: 1.5rem 0;
+                border-left: 3px solid #3498db;
+            }}
+            .recomendaciones h2 {{
+                color: #2980b9;
+                margin-bottom: 0.8rem;
+            }}
+            .recomendaciones ul {{
+                margin-left: 1.2rem;
+                margin-top: 0.5rem;
+            }}
+            .recomendaciones li {{
+                margin-bottom: 0.6rem;
+                line-height: 1.5;
+            }}
+            .archivos {{
+                background: #fff8e1;
+                border-radius: 12px;
+                padding: 1rem;
+                margin: 1rem 0;
+                border-left: 3px solid #ffc107;
+                font-size: 0.95rem;
+            }}
+            .diagnostico {{
+                background: white;
+                border-radius: 12px;
+                padding: 1rem 1.5rem;
+                margin: 1.5rem 0;
+                border-left: 3px solid #95a5a6;
+                font-size: 0.9rem;
+            }}
+            .diagnostico summary {{
+                cursor: pointer;
+                color: #7f8c8d;
+                font-weight: 600;
+            }}
+            .diagnostico table {{
+                border-collapse: collapse;
+                margin-top: 0.8rem;
+                width: 100%;
+            }}
+            .diagnostico th, .diagnostico td {{
+                padding: 0.3rem 0.6rem;
+                border-bottom: 1px solid #eee;
+                text-align: left;
+            }}
+            .diagnostico .numero {{
+                text-align: right;
+                font-variant-numeric: tabular-nums;
+            }}
+            .perfil {{
+                background: white;
+                border-radius: 12px;
+                padding: 1rem;
+                margin: 1.5rem 0;
+                box-shadow: 0 2px 6px rgba(0,0,0,0.08);
+            }}
+            .perfil h2 {{
+                color: var(--primary);
+                margin-bottom: 1rem;
+            }}
+            .perfil svg {{
+                width: 100%;
+                height: auto;
+            }}
+            .tir {{
+                display: flex;
+                height: 2rem;
+                border-radius: 8px;
+                overflow: hidden;
+                margin-bottom: 0.4rem;
+                color: white;
+                font-weight: bold;
+                font-size: 0.9rem;
+            }}
+            .tir div {{
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                white-space: nowrap;
+            }}
+            .perfil details {{
+                margin-top: 1rem;
+                font-size: 0.9rem;
+            }}
+            .perfil summary {{
+                cursor: pointer;
+                color: #7f8c8d;
+                font-weight: 600;
+            }}
+            .perfil table {{
+                border-collapse: collapse;
+                margin-top: 0.6rem;
+                width: 100%;
+            }}
+            .perfil th, .perfil td {{
+                padding: 0.3rem 0.6rem;
+                border-bottom: 1px solid #eee;
+                text-align: left;
+            }}
+            .perfil .numero {{
+                text-align: right;
+                font-variant-numeric: tabular-nums;
+            }}
+            footer {{
+                text-align: center;
+                margin-top: 2rem;
+                padding: 1rem;
+                color: #7f8c8d;
+                font-size: 0.9rem;
+                border-top: 1px solid #eee;
+            }}
+            @media (max-width: 768px) {{
+                .stats-grid {{
+                    grid-template-columns: 1fr;
+                }}
+                .stat-value {{
+                    font-size: 1.5rem;
+                }}
+            }}
+        </style>
+    </head>
+    <body>
+        <header>
+            <h1>⚕️ Informe de Simulaciones Diabéticas</h1>
+            <p class="subtitle">Análisis generado el {fecha}</p>
+        </header>
+
+        <div class="archivos">
+            <strong>📁 Archivos analizados:</strong> {archivos} archivos CSV
+            <br><strong>📍 Origen:</strong> {origen}
+        </div>
+
+        <div class="stats-grid">
+            <div class="stat-card">
+                <div class="stat-label">Glucosa Promedio</div>
+                <div class="stat-value" style="color: {color_glucosa};">{glucosa_promedio:.1f} mg/dL</div>
+                <div>{simulaciones} simulaciones</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-label">Hidratos de Carbono</div>
+                <div class="stat-value">{hc_promedio:.1f} g</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-label">Actividad Física</div>
+                <div class="stat-value">{caminata_promedio:.1f} min</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-label">Sueño</div>
+                <div class="stat-value">{sueño_promedio:.1f} h</div>
+            </div>
+        </div>
+
+        <div class="estado" style="background: {color_estado}15; border-color: {color_estado};">
+            Estado General: {estado}
+        </div>
+
+        <div class="graficos">
+            <div class="grafico-container">
+                <h2 style="color: var(--primary); margin-bottom: 1rem;">Tendencia de Glucosa en el Tiempo</h2>
+                {grafico_tendencia}
+            </div>
+
+            <div class="grafico-container">
+                <h2 style="color: var(--primary); margin-bottom: 1rem;">Factores que Influyen en la Glucosa</h2>
+                {grafico_factores}
+            </div>
+        </div>
+        {perfil}
+
+        <div class="recomendaciones">
+            <h2>💡 Recomendaciones Personalizadas</h2>
+            <ul>
+                {recomendaciones}
+            </ul>
+        </div>
+        {diagnostico}
+
+        <footer>
+            <p>Informe educativo generado por 'Equilibrio Diabético'</p>
+            <p>Basado en guías de la American Diabetes Association (ADA) • MIT License © 2025</p>
+            <p style="margin-top: 0.5rem; font-style: italic; color: var(--danger);">
+                * Este informe es con fines educativos. Consulta siempre con tu médico para tu manejo personalizado.
+            </p>
+        </footer>
+        {scripts}
+    </body>
+    </html>
+"""
+
+
+PLANTILLA_INDICE = """<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>📋 Índice de informes por grupo</title>
+    <style>
+        body {{ font-family: 'Segoe UI', system-ui, sans-serif; background: #f9fbfd; color: #2c3742;
+               max-width: 1000px; margin: 0 auto; padding: 1rem; line-height: 1.5; }}
+        header {{ text-align: center; padding: 1.5rem 0; background: white; border-radius: 16px;
+                 margin-bottom: 1.5rem; box-shadow: 0 4px 8px rgba(0,0,0,0.08); }}
+        h1 {{ color: #2980b9; font-size: 1.8rem; }}
+        .subtitle {{ color: #7f8c8d; }}
+        table {{ width: 100%; border-collapse: collapse; background: white; border-radius: 12px;
+                overflow: hidden; box-shadow: 0 2px 6px rgba(0,0,0,0.08); }}
+        th, td {{ padding: 0.6rem 0.8rem; text-align: left; border-bottom: 1px solid #eef2f6; }}
+        th {{ background: #e8f4fc; color: #2980b9; }}
+        td.numero {{ text-align: right; font-variant-numeric: tabular-nums; }}
+        .pendiente {{ color: #7f8c8d; font-style: italic; }}
+        footer {{ text-align: center; margin-top: 2rem; color: #7f8c8d; font-size: 0.9rem; }}
+    </style>
+</head>
+<body>
+    <header>
+        <h1>⚕️ Informes por {agrupacion}</h1>
+        <p class="subtitle">{resumen}</p>
+    </header>
+    <table>
+        <thead>
+            <tr><th>Grupo</th><th>Simulaciones</th><th>Glucosa media</th><th>Estado</th></tr>
+        </thead>
+        <tbody>
+{filas}
+        </tbody>
+    </table>
+    <footer>
+        <p>Generado el {fecha} por 'Equilibrio Diabético'</p>
+    </footer>
+</body>
+</html>
+"""
+
+
+def compilar(plantilla):
+    """Separa la plantilla en [(texto fijo, campo, formato)] para rellenarla sin volver a analizarla"""
+    partes, texto = [], []
+    for literal, campo, formato, _ in string.Formatter().parse(plantilla):
+        texto.append(literal)
+        if campo is not None:
+            partes.append(("".join(texto), campo, formato))
+            texto = []
+    partes.append(("".join(texto), None, None))
+    return partes
+
+
+PARTES = compilar(PLANTILLA)
+PARTES_INDICE = compilar(PLANTILLA_INDICE)
+
+
+def escribir(archivo, valores, partes=PARTES):
+    """Escribe la plantilla compilada en el archivo abierto
+
+    Cada valor puede ser un texto/número o una función que recibe el archivo
+    y escribe ella misma su contenido (las imágenes).
+    """
+    for texto, campo, formato in partes:
+        archivo.write(texto)
+        if campo is None:
+            continue
+        valor = valores[campo]
+        if callable(valor):
+            valor(archivo)
+        else:
+            archivo.write(format(valor, formato or ""))
+
+
+def _escribir_base64(archivo, datos):
+    """Codifica los bytes en base64 y los escribe por trozos"""
+    vista = memoryview(datos)
+    for inicio in range(0, len(vista), TAMANO_TROZO):
+        archivo.write(base64.b64encode(vista[inicio:inicio + TAMANO_TROZO]).decode("ascii"))
+
+
+def _svg_en_linea(datos):
+    """Elemento <svg> del archivo SVG, sin la declaración XML ni el DOCTYPE"""
+    texto = datos.decode("utf-8")
+    return texto[texto.index("<svg"):]
+
+
+def elemento_imagen(imagen, alt, modo=MODO_AUTONOMO, carpeta_recursos=None, nombre=None):
+    """Función que escribe el elemento HTML del gráfico según el modo de salida
+
+    imagen puede ser un graficos.Imagen o un data URI ya construido (texto).
+    En modo carpeta el archivo del gráfico se guarda ya en carpeta_recursos.
+    """
+    if isinstance(imagen, str):
+        return lambda archivo: archivo.write(f'<img src="{imagen}" alt="{alt}" style="{ESTILO_IMAGEN}">')
+
+    if modo == MODO_CARPETA:
+        os.makedirs(carpeta_recursos, exist_ok=True)
+        nombre_archivo = f"{nombre}.{imagen.formato}"
+        with open(os.path.join(carpeta_recursos, nombre_archivo), "wb") as f:
+            f.write(imagen.datos)
+        src = quote(f"{os.path.basename(carpeta_recursos)}/{nombre_archivo}")
+        return lambda archivo: archivo.write(f'<img src="{src}" alt="{alt}" style="{ESTILO_IMAGEN}">')
+
+    if imagen.formato == "svg":
+        return lambda archivo: archivo.write(
+            f'<div role="img" aria-label="{alt}">{_svg_en_linea(imagen.datos)}</div>')
+
+    def escribir_img(archivo):
+        archivo.write(f'<img src="data:{imagen.tipo_mime};base64,')
+        _escribir_base64(archivo, imagen.datos)
+        archivo.write(f'" alt="{alt}" style="{ESTILO_IMAGEN}">')
+    return escribir_img
+
+
+def _float32_base64(valores):
+    """Array como Float32 little-endian en base64 (Float32Array en el navegador)"""
+    return base64.b64encode(np.ascontiguousarray(valores, dtype="<f4").tobytes()).decode("ascii")
+
+
+def datos_interactivos(tendencia, factores):
+    """Datos compactos de los gráficos para el script del modo interactivo
+
+    tendencia es el dict de graficos.datos_tendencia (o None) y factores el de
+    graficos.datos_factores. Los momentos se guardan en minutos desde el
+    primero, que en Float32 son exactos durante más de 30 años.
+    """
+    import agregados
+    import graficos
+
+    datos = {"umbrales": [agregados.UMBRAL_BAJO, agregados.UMBRAL_ALTO]}
+    if tendencia is not None and len(tendencia["y"]):
+        x = tendencia["x"]
+        inicio = 0
+        if tendencia["modo"] == "tiempo":
+            milisegundos = x.astype("datetime64[ms]").astype(np.int64)
+            inicio = int(milisegundos[0])
+            x = (milisegundos - inicio) / 60000
+        datos["tendencia"] = {"modo": tendencia["modo"], "inicio": inicio, "total": tendencia["total"],
+                              "x": _float32_base64(x), "y": _float32_base64(tendencia["y"])}
+
+    valores = graficos.VALORES_EJEMPLO if factores["ejemplo"] else factores["valores"]
+    datos["factores"] = {"valores": [float(v) for v in valores], "ejemplo": factores["ejemplo"],
+                         "nombres": graficos.NOMBRES_FACTORES, "unidades": graficos.UNIDADES_FACTORES,
+                         "colores": graficos.COLORES_FACTORES}
+    return datos
+
+
+def _script_interactivo():
+    """Código del renderizador en canvas"""
+    with open(ARCHIVO_SCRIPT, encoding="utf-8") as f:
+        return f.read()
+
+
+def elementos_interactivos(graficos_informe):
+    """Lienzos de los gráficos y scripts del modo interactivo"""
+    (tendencia, alt_tendencia), (factores, alt_factores) = (graficos_informe["grafico_tendencia"],
+                                                            graficos_informe["grafico_factores"])
+    datos = datos_interactivos(tendencia, factores)
+    # "</" dentro de un <script> lo cerraría antes de tiempo
+    carga = json.dumps(datos, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+
+    nota = ""
+    if "tendencia" in datos and datos["tendencia"]["total"] > len(tendencia["y"]):
+        nota = (f" Se muestran {len(tendencia['y'])} de {datos['tendencia']['total']} simulaciones "
+                f"(mínimos y máximos de cada tramo).")
+
+    def escribir_scripts(archivo):
+        archivo.write('<script type="application/json" id="datos-informe">')
+        archivo.write(carga)
+        archivo.write("</script>\n        <script>\n")
+        archivo.write(_script_interactivo())
+        archivo.write("</script>")
+
+    return {
+        "grafico_tendencia": (f'<canvas id="grafico-tendencia" role="img" aria-label="{alt_tendencia}" '
+                              f'style="{ESTILO_LIENZO}"></canvas>'
+                              f'<p style="color: #7f8c8d; font-size: 0.85rem; margin-top: 0.5rem;">'
+                              f'{AYUDA_ZOOM}.{nota}</p>'),
+        "grafico_factores": (f'<canvas id="grafico-factores" role="img" aria-label="{alt_factores}" '
+                             f'style="{ESTILO_LIENZO} cursor: default;"></canvas>'),
+        "scripts": escribir_scripts,
+    }
+
+
+def _celda_numero(valor, formato):
+    return f'<td class="numero">{"" if valor is None else format(valor, formato)}</td>'
+
+
+def seccion_diagnostico(mediciones):
+    """Sección plegable con los tiempos por etapa (instrumentacion.Medidor.a_dict())
+
+    La escritura del propio informe no aparece: está en curso al generar la sección.
+    """
+    memoria = "Pico asignado (MB)" if any(e["memoria"] == "asignaciones" for e in mediciones["etapas"]) \
+        else "Pico RSS (MB)"
+    filas = "".join(
+        f'<tr><td>{html.escape(e["etapa"])}</td>{_celda_numero(e["segundos"], ".3f")}'
+        f'{_celda_numero(e["cpu"], ".3f")}{_celda_numero(e["filas"], "d")}{_celda_numero(e["pico_mb"], ".0f")}</tr>'
+        for e in mediciones["etapas"])
+    lentos = ""
+    if mediciones["archivos"]:
+        lentos = ("<p style=\"margin-top: 0.8rem;\">Archivos más lentos de leer: " + ", ".join(
+            f'{html.escape(os.path.basename(a["archivo"]))} ({a["segundos"] * 1000:.1f} ms)'
+            for a in sorted(mediciones["archivos"], key=lambda a: -a["segundos"])[:3]) + "</p>")
+    return (f'<details class="diagnostico"><summary>🩺 Diagnóstico: {mediciones["segundos"]:.2f} s '
+            f'de análisis, {mediciones["archivos_leidos"]} archivos leídos</summary>'
+            f'<table><tr><th>Etapa</th><th class="numero">Tiempo real (s)</th><th class="numero">CPU (s)</th>'
+            f'<th class="numero">Filas</th><th class="numero">{memoria}</th></tr>{filas}</table>{lentos}</details>')
+
+
+def _svg_agp(horario):
+    """Gráfico AGP en SVG: bandas 5-95 y 25-75, mediana y límites de 80 y 140 mg/dL por hora"""
+    horas = horario[horario["simulaciones"] > 0]
+    ancho, alto, margen = 800, 280, 40
+    minimo = min(70, np.floor(horas["p5"].min() / 20) * 20)
+    maximo = max(160, np.ceil(horas["p95"].max() / 20) * 20)
+
+    def x(hora):
+        return margen + (ancho - 2 * margen) * hora / 23
+
+    def y(glucosa):
+        return alto - margen - (alto - 2 * margen) * (glucosa - minimo) / (maximo - minimo)
+
+    def banda(inferior, superior, color):
+        puntos = [(x(h), y(v)) for h, v in zip(horas["hora"], horas[superior])]
+        puntos += [(x(h), y(v)) for h, v in zip(horas["hora"][::-1], horas[inferior][::-1])]
+        return (f'<polygon points="{" ".join(f"{px:.1f},{py:.1f}" for px, py in puntos)}" '
+                f'fill="{color}" stroke="none"/>')
+
+    mediana = " ".join(f"{x(h):.1f},{y(v):.1f}" for h, v in zip(horas["hora"], horas["p50"]))
+    partes = [f'<svg viewBox="0 0 {ancho} {alto}" xmlns="http://www.w3.org/2000/svg" role="img" '
+              f'aria-label="Perfil de glucosa por hora del día" font-size="12" fill="#7f8c8d">',
+              banda("p5", "p95", "#2980b933"), banda("p25", "p75", "#2980b966"),
+              f'<polyline points="{mediana}" fill="none" stroke="#2980b9" stroke-width="2.5"/>']
+    for limite, color in ((140, "#e74c3c"), (80, "#2ecc71")):
+        partes.append(f'<line x1="{margen}" x2="{ancho - margen}" y1="{y(limite):.1f}" y2="{y(limite):.1f}" '
+                      f'stroke="{color}" stroke-dasharray="6 4"/>'
+                      f'<text x="{margen - 6}" y="{y(limite) + 4:.1f}" text-anchor="end">{limite}</text>')
+    for hora in range(0, 24, 3):
+        partes.append(f'<text x="{x(hora):.1f}" y="{alto - margen + 18}" text-anchor="middle">{hora:02d}:00</text>')
+    partes.append("</svg>")
+    return "".join(partes)
+
+
+def _barra_tiempo_en_rango(fracciones):
+    segmentos = "".join(
+        f'<div style="width: {fraccion * 100:.2f}%; background: {COLORES_BANDAS[banda]};">'
+        f'{f"{fraccion * 100:.0f} %" if fraccion >= 0.06 else ""}</div>'
+        for banda, fraccion in fracciones.items() if fraccion > 0)
+    return (f'<div class="tir">{segmentos}</div><p style="font-size: 0.9rem; color: #7f8c8d;">'
+            f'Por debajo de 80 mg/dL: {fracciones["bajo"] * 100:.1f} % · '
+            f'entre 80 y 140: {fracciones["rango"] * 100:.1f} % · '
+            f'por encima de 140: {fracciones["alto"] * 100:.1f} %</p>')
+
+
+def _tabla_dias(diario):
+    recientes = diario.tail(DIAS_EN_INFORME).iloc[::-1]
+    filas = "".join(
+        f'<tr><td>{fila.fecha:%d/%m/%Y}</td>{_celda_numero(int(fila.simulaciones), "d")}'
+        f'{_celda_numero(fila.media, ".1f")}{_celda_numero(fila.minimo, ".0f")}'
+        f'{_celda_numero(fila.maximo, ".0f")}{_celda_numero(fila.rango * 100, ".0f")}</tr>'
+        for fila in recientes.itertuples())
+    return (f'<details><summary>📅 Últimos {len(recientes)} de {len(diario)} días con simulaciones</summary>'
+            f'<table><tr><th>Día</th><th class="numero">Simulaciones</th><th class="numero">Media</th>'
+            f'<th class="numero">Mínimo</th><th class="numero">Máximo</th><th class="numero">En rango (%)</th></tr>'
+            f'{filas}</table></details>')
+
+
+def _tabla_origenes(origenes):
+    principales = origenes.head(ORIGENES_EN_INFORME)
+    filas = "".join(
+        f'<tr><td>{html.escape(str(fila.origen))}</td>{_celda_numero(int(fila.simulaciones), "d")}'
+        f'{_celda_numero(fila.media, ".1f")}{_celda_numero(fila.rango * 100, ".0f")}</tr>'
+        for fila in principales.itertuples())
+    return (f'<details><summary>📁 {len(principales)} de {len(origenes)} archivos de origen, '
+            f'de más a menos simulaciones</summary>'
+            f'<table><tr><th>Archivo</th><th class="numero">Simulaciones</th><th class="numero">Media</th>'
+            f'<th class="numero">En rango (%)</th></tr>{filas}</table></details>')
+
+
+def seccion_perfil(perfil):
+    """Tiempo en rango, gráfico AGP y tablas por día y por origen (perfil.PerfilGlucosa)"""
+    if perfil is None or perfil.simulaciones == 0:
+        return ""
+    partes = ['<div class="perfil"><h2>🎯 Tiempo en Rango</h2>', _barra_tiempo_en_rango(perfil.tiempo_en_rango())]
+    horario = perfil.perfil_horario()
+    if horario["simulaciones"].any():
+        partes.append('<h2 style="margin-top: 1.5rem;">🕒 Perfil de Glucosa por Hora del Día</h2>')
+        partes.append(_svg_agp(horario))
+        partes.append('<p style="font-size: 0.9rem; color: #7f8c8d;">Línea: mediana de cada hora · '
+                      'banda oscura: del percentil 25 al 75 · banda clara: del 5 al 95</p>')
+        partes.append(_tabla_dias(perfil.resumen_diario()))
+    if perfil.origenes:
+        partes.append(_tabla_origenes(perfil.por_origen()))
+    partes.append("</div>")
+    return "".join(partes)
+
+
+def carpeta_recursos(ruta_informe):
+    """Carpeta de los gráficos del modo carpeta, junto al HTML"""
+    return os.path.splitext(ruta_informe)[0] + SUFIJO_CARPETA
+
+
+def guardar(ruta_informe, valores, graficos_informe, modo=MODO_AUTONOMO, archivo=None):
+    """Escribe el informe en ruta_informe
+
+    graficos_informe es un dict campo -> (imagen, texto alternativo); los
+    gráficos se añaden a valores como funciones de escritura. En modo
+    interactivo en lugar de imágenes llegan los dicts de graficos.datos_tendencia
+    y graficos.datos_factores. Con archivo (de texto, por ejemplo
+    io.StringIO) el informe se escribe en él y se devuelve archivo.
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo de informe desconocido: {modo}")
+    if archivo is not None and modo == MODO_CARPETA:
+        raise ValueError("El modo carpeta necesita guardar el informe en disco")
+    valores = dict(valores, scripts="")
+    valores.setdefault("diagnostico", "")
+    valores.setdefault("perfil", "")
+    if modo == MODO_INTERACTIVO:
+        valores.update(elementos_interactivos(graficos_informe))
+    else:
+        recursos = carpeta_recursos(ruta_informe) if ruta_informe else None
+        for campo, (imagen, alt) in graficos_informe.items():
+            valores[campo] = elemento_imagen(imagen, alt, modo, recursos, campo.replace("grafico_", ""))
+
+    if archivo is not None:
+        escribir(archivo, valores)
+        return archivo
+    with open(ruta_informe, "w", encoding="utf-8", buffering=1 << 16) as f:
+        escribir(f, valores)
+    return ruta_informe
+
+
+def guardar_indice(ruta_indice, valores):
+    """Escribe la página índice de los informes por grupo"""
+    with open(ruta_indice, "w", encoding="utf-8", buffering=1 << 16) as f:
+        escribir(f, valores, PARTES_INDICE)
+    return ruta_indice
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Un informe por paciente o por origen, en paralelo
+=================================================
+
+En lugar de un único informe con todo lo seleccionado, las simulaciones se
+reparten en grupos y cada grupo genera su propio informe en un pool de
+procesos:
+
+- archivo: un informe por CSV
+- carpeta: un informe por carpeta de origen (una carpeta por paciente)
+- cualquier otro nombre: una columna del CSV (por ejemplo "Paciente")
+
+Con archivo o carpeta cada proceso lee solo los CSV de su grupo; con una
+columna se carga todo una vez (con la caché de ingesta) y a cada proceso se
+le envía su parte. Los grupos más grandes se lanzan primero para acortar el
+tiempo total, y con un presupuesto de tiempo los grupos que no han empezado
+cuando se agota quedan como pendientes en el índice.
+
+Los informes se guardan en `<salida>/<grupo>/` y una página índice
+`<salida>/indice_<fecha>.html` enlaza todos.
+"""
+
+import os
+import re
+import time
+import html
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import nucleo
+
+POR_ARCHIVO = "archivo"
+POR_CARPETA = "carpeta"
+
+
+class ResultadoGrupo:
+    """Resultado del informe de un grupo (también si falló o no llegó a empezar)"""
+
+    def __init__(self, clave, carpeta, ruta=None, simulaciones=0, glucosa=None, avisos=None, error=None):
+        self.clave = clave
+        self.carpeta = carpeta
+        self.ruta = ruta
+        self.simulaciones = simulaciones
+        self.glucosa = glucosa
+        self.avisos = avisos or []
+        self.error = error
+
+    @property
+    def generado(self):
+        return self.ruta is not None
+
+
+def nombre_carpeta(clave, usados):
+    """Nombre de carpeta seguro y único para la clave del grupo"""
+    base = re.sub(r"[^\w.-]+", "_", str(clave)).strip("._") or "grupo"
+    nombre, n = base, 2
+    while nombre.lower() in usados:
+        nombre, n = f"{base}_{n}", n + 1
+    usados.add(nombre.lower())
+    return nombre
+
+
+def agrupar_archivos(archivos, por):
+    """Reparte las rutas por archivo o por carpeta de origen: {clave: [rutas]}"""
+    grupos = {}
+    for ruta in archivos:
+        if por == POR_ARCHIVO:
+            clave = os.path.splitext(os.path.basename(ruta))[0]
+        else:
+            clave = os.path.basename(os.path.dirname(os.path.abspath(ruta)))
+        grupos.setdefault(clave, []).append(ruta)
+    return grupos
+
+
+def _informe_grupo(clave, carpeta, archivos, df, opciones):
+    """Trabajo de un proceso: carga (si hace falta), gráficos e informe de un grupo"""
+    import perfil
+
+    avisos = []
+    try:
+        if df is None:
+            df = nucleo.cargar_datos(archivos, avisos.append, usar_cache=False)
+        estadisticas = nucleo.calcular_estadisticas(df)
+        tendencia, factores = nucleo.preparar_graficos(
+            df, avisos.append, estadisticas, formato=opciones["formato_graficos"],
+            puntos_tendencia=opciones["puntos_tendencia"], modo_informe=opciones["modo_informe"])
+        ruta = nucleo.generar_informe_html(df, tendencia, factores, archivos, carpeta,
+                                           estadisticas, opciones["modo_informe"],
+                                           perfil_glucosa=perfil.calcular_perfil(df))
+        return ResultadoGrupo(clave, carpeta, ruta, estadisticas["simulaciones"],
+                              estadisticas["glucosa"], avisos)
+    except Exception as e:
+        return ResultadoGrupo(clave, carpeta, avisos=avisos, error=str(e))
+
+
+def _rutas_por_nombre(archivos):
+    """{nombre de archivo: [rutas]}: archivo_origen solo guarda el nombre
+
+    De los archivos compactos se toman las rutas originales de sus fuentes.
+    """
+    import compacto
+
+    rutas = {}
+    for ruta in archivos:
+        if ruta.lower().endswith(compacto.EXTENSION):
+            with compacto.ArchivoCompacto(ruta) as archivo:
+                fuentes = [fuente[0] for fuente in archivo.fuentes]
+        else:
+            fuentes = [ruta]
+        for fuente in fuentes:
+            mismo_nombre = rutas.setdefault(os.path.basename(fuente), [])
+            if fuente not in mismo_nombre:
+                mismo_nombre.append(fuente)
+    return rutas
+
+
+def _trabajos(archivos, por, carpeta_salida, avisar, usar_cache, carpeta_cache):
+    """Lista de (clave, carpeta, archivos, df, tamaño) de cada grupo, del más grande al más pequeño"""
+    usados = set()
+    trabajos = []
+    if por in (POR_ARCHIVO, POR_CARPETA):
+        for clave, rutas in agrupar_archivos(archivos, por).items():
+            carpeta = os.path.join(carpeta_salida, nombre_carpeta(clave, usados))
+            tamaño = sum(os.path.getsize(r) for r in rutas if os.path.exists(r))
+            trabajos.append((clave, carpeta, rutas, None, tamaño))
+    else:
+        df = nucleo.cargar_datos(archivos, avisar, usar_cache=usar_cache, carpeta_cache=carpeta_cache)
+        if por not in df.columns:
+            raise ValueError(f"La columna '{por}' no existe en los CSV (columnas: {', '.join(df.columns)})")
+        rutas_por_nombre = _rutas_por_nombre(archivos)
+        for clave, parte in df.groupby(por, sort=True, observed=True):
+            carpeta = os.path.join(carpeta_salida, nombre_carpeta(clave, usados))
+            origenes = []
+            if "archivo_origen" in parte.columns:
+                # Cada parte conserva las categorías de todos los archivos: se quitan las ajenas
+                parte = parte.assign(archivo_origen=parte["archivo_origen"].cat.remove_unused_categories())
+                origenes = [ruta for nombre in parte["archivo_origen"].cat.categories
+                            for ruta in rutas_por_nombre.get(nombre, ())]
+            trabajos.append((str(clave), carpeta, origenes, parte, len(parte)))
+    trabajos.sort(key=lambda trabajo: -trabajo[4])
+    return trabajos
+
+
+def _fila_indice(resultado, carpeta_salida):
+    """Fila HTML del índice para un grupo"""
+    clave = html.escape(resultado.clave)
+    if not resultado.generado:
+        motivo = html.escape(resultado.error or "Sin tiempo: no llegó a empezar")
+        return (f'            <tr class="pendiente"><td>{clave}</td><td class="numero">-</td>'
+                f'<td class="numero">-</td><td>{motivo}</td></tr>')
+
+    enlace = os.path.relpath(resultado.ruta, carpeta_salida).replace(os.sep, "/")
+    glucosa = resultado.glucosa
+    if glucosa is None:
+        texto_glucosa, estado, color = "-", "Sin datos de glucosa", nucleo.TEXT_COLOR
+    elif glucosa > 140:
+        texto_glucosa, estado, color = f"{glucosa:.1f} mg/dL", "⚠️ ALTO", nucleo.DANGER_COLOR
+    elif glucosa < 80:
+        texto_glucosa, estado, color = f"{glucosa:.1f} mg/dL", "⚠️ BAJO", nucleo.WARNING_COLOR
+    else:
+        texto_glucosa, estado, color = f"{glucosa:.1f} mg/dL", "✅ ÓPTIMO", nucleo.SUCCESS_COLOR
+    return (f'            <tr><td><a href="{html.escape(enlace)}">{clave}</a></td>'
+            f'<td class="numero">{resultado.simulaciones}</td>'
+            f'<td class="numero" style="color: {color};">{texto_glucosa}</td><td>{estado}</td></tr>')
+
+
+def escribir_indice(resultados, carpeta_salida, por, segundos, ruta=None):
+    """Página índice con un enlace a cada informe; devuelve su ruta
+
+    Sin ruta se crea `indice_<fecha>.html` en carpeta_salida.
+    """
+    import informe
+
+    generados = sum(r.generado for r in resultados)
+    resumen = f"{generados} de {len(resultados)} informes generados en {segundos:.1f} s"
+    agrupacion = {POR_ARCHIVO: "archivo", POR_CARPETA: "carpeta"}.get(por, f"«{por}»")
+    valores = {
+        "agrupacion": html.escape(agrupacion),
+        "resumen": resumen,
+        "fecha": datetime.now().strftime("%d/%m/%Y %H:%M"),
+        "filas": "\n".join(_fila_indice(r, carpeta_salida)
+                           for r in sorted(resultados, key=lambda r: r.clave.lower())),
+    }
+    ruta = ruta or os.path.join(carpeta_salida, f"indice_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html")
+    return informe.guardar_indice(ruta, valores)
+
+
+def generar_informes(archivos, por=POR_CARPETA, carpeta_salida=None, avisar=None, progreso=None,
+                     procesos=None, presupuesto=None, usar_cache=True, carpeta_cache=None,
+                     modo_informe=None, formato_graficos='png', puntos_tendencia=None):
+    """Genera un informe por grupo en un pool de procesos y devuelve (ruta del índice, resultados)
+
+    presupuesto son los segundos máximos: al agotarse no se lanzan más grupos
+    (los que ya están en marcha terminan) y los restantes figuran como
+    pendientes en el índice.
+    """
+    avisar = avisar or nucleo._sin_aviso
+    progreso = progreso or nucleo._sin_aviso
+    inicio = time.monotonic()
+    carpeta_salida = carpeta_salida or nucleo.obtener_carpeta_informes()
+    os.makedirs(carpeta_salida, exist_ok=True)
+
+    progreso(5, "🗂️ Agrupando simulaciones...")
+    trabajos = _trabajos(archivos, por, carpeta_salida, avisar, usar_cache, carpeta_cache)
+    if not trabajos:
+        raise nucleo.SinDatosError("No hay grupos que analizar")
+    avisar(f"🗂️ {len(trabajos)} grupos por {por}")
+
+    opciones = {"modo_informe": modo_informe, "formato_graficos": formato_graficos,
+                "puntos_tendencia": puntos_tendencia}
+    limite = None if presupuesto is None else inicio + presupuesto
+    resultados = []
+    pendientes = list(reversed(trabajos))  # pop() saca el más grande
+    en_marcha = {}
+    procesos = procesos or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        while pendientes or en_marcha:
+            # Solo hay en cola tantos grupos como procesos: el resto espera al presupuesto
+            while pendientes and len(en_marcha) < procesos and (limite is None or time.monotonic() < limite):
+                clave, carpeta, rutas, df, _ = pendientes.pop()
+                en_marcha[pool.submit(_informe_grupo, clave, carpeta, rutas, df, opciones)] = clave
+            if not en_marcha:
+                break
+
+            espera = None if limite is None else max(limite - time.monotonic(), 0.1)
+            hechos, _ = wait(en_marcha, timeout=espera, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                del en_marcha[futuro]
+                resultado = futuro.result()
+                resultados.append(resultado)
+                if resultado.error:
+                    avisar(f"⚠️ {resultado.clave}: {resultado.error}")
+                progreso(10 + 85 * len(resultados) // len(trabajos),
+                         f"📄 {len(resultados)}/{len(trabajos)} informes")
+
+    for clave, carpeta, _, _, _ in pendientes:
+        resultados.append(ResultadoGrupo(clave, carpeta))
+    if pendientes:
+        avisar(f"⏱️ Presupuesto de {presupuesto:g} s agotado: {len(pendientes)} grupos pendientes")
+
+    ruta_indice = escribir_indice(resultados, carpeta_salida, por, time.monotonic() - inicio)
+    progreso(100, "✅ Informes generados")
+    return ruta_indice, resultados
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Ingesta masiva de exportaciones CSV
+===================================
+
+`exportToCSV` (js/script.js) escribe siempre la misma cabecera de 9 columnas
+y una fila por archivo. Para carpetas con decenas de miles de exportaciones,
+crear un parser de pandas por archivo domina el tiempo de carga, así que aquí:
+
+- Los archivos con el esquema conocido se leen con un parser directo
+  (split de líneas, `csv` solo si hay comillas).
+- Los archivos se procesan por lotes en un pool de hilos (o de procesos).
+- Las columnas se vuelcan en arrays preasignados y se construye un único
+  DataFrame al final, sin `pd.concat` por archivo.
+- Los errores de cada archivo se acumulan en lugar de perderse.
+
+Los archivos con otra cabecera pasan por `pd.read_csv` como antes.
+
+Las exportaciones JSON de la app (`exportToJSON`: `parametros`, `resultados`
+con textos como "+60 mg/dL", `recomendaciones`) se aplanan a los mismos
+campos que una fila del CSV, sin pasar los números a texto. Un archivo puede
+tener un documento, una lista de documentos o varios concatenados (NDJSON,
+`.ndjson`/`.jsonl`); `iterar_ndjson` recorre un flujo de documentos
+concatenados por bloques de filas, con memoria constante. Si `orjson` está
+instalado se usa para interpretar cada documento.
+"""
+
+import os
+import re
+import csv
+import json
+import time
+import codecs
+import itertools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+    _interpretar_json = orjson.loads
+except ImportError:
+    _interpretar_json = json.loads
+
+COLUMNAS_EXPORTACION = [
+    "Fecha", "Hora", "Hidratos (g)", "Caminata (min)", "Sueño (h)",
+    "Glucosa (mg/dL)", "Efecto HC", "Efecto Caminar", "Efecto Sueño",
+]
+COLUMNAS_NUMERICAS = ["Hidratos (g)", "Caminata (min)", "Sueño (h)", "Glucosa (mg/dL)"]
+COLUMNAS_TEXTO = ["Fecha", "Hora", "Efecto HC", "Efecto Caminar", "Efecto Sueño"]
+
+_INDICES_NUMERICOS = [COLUMNAS_EXPORTACION.index(c) for c in COLUMNAS_NUMERICAS]
+_INDICES_TEXTO = [COLUMNAS_EXPORTACION.index(c) for c in COLUMNAS_TEXTO]
+_CABECERA = ",".join(COLUMNAS_EXPORTACION)
+_CABECERA_ENTRECOMILLADA = ",".join(f'"{c}"' for c in COLUMNAS_EXPORTACION)
+
+TAMANO_LOTE = 256
+EXTENSIONES_JSON = (".json", ".ndjson", ".jsonl")
+EXTENSIONES_NDJSON = (".ndjson", ".jsonl")
+FILAS_POR_BLOQUE_JSON = 50_000
+MAX_LINEAS_DOCUMENTO = 1_000  # Un documento con formato (JSON.stringify(..., null, 2)) ocupa ~25
+
+
+class EsquemaDesconocido(Exception):
+    """La cabecera del archivo no coincide con la de `exportToCSV`"""
+
+
+class ResultadoIngesta:
+    """DataFrame combinado y errores por archivo de una carga masiva"""
+
+    def __init__(self, df, errores, archivos_leidos, tiempos=None):
+        self.df = df
+        self.errores = errores  # Lista de (ruta, mensaje)
+        self.archivos_leidos = archivos_leidos
+        self.tiempos = tiempos or []  # Lista de (ruta, segundos, filas) de cada archivo leído
+
+    @property
+    def filas(self):
+        return 0 if self.df is None else len(self.df)
+
+
+def _a_numero(valor):
+    """Convierte un campo numérico; vacío o inválido se convierte en NaN"""
+    try:
+        return float(valor)
+    except (ValueError, TypeError):  # TypeError: null en una exportación JSON
+        return float("nan")
+
+
+def leer_exportacion(ruta):
+    """Lee un CSV con el esquema de exportación y devuelve sus filas como listas de campos"""
+    with open(ruta, "r", encoding="utf-8-sig", newline="") as f:
+        texto = f.read()
+
+    lineas = texto.splitlines()
+    if not lineas or lineas[0] not in (_CABECERA, _CABECERA_ENTRECOMILLADA):
+        raise EsquemaDesconocido(ruta)
+
+    filas = []
+    for numero, linea in enumerate(lineas[1:], start=2):
+        if not linea:
+            continue
+        if '"' in linea:
+            campos = next(csv.reader([linea]))
+        else:
+            campos = linea.split(",")
+        if len(campos) != len(COLUMNAS_EXPORTACION):
+            raise ValueError(f"línea {numero}: {len(campos)} campos en lugar de {len(COLUMNAS_EXPORTACION)}")
+        filas.append(campos)
+    return filas
+
+
+def aplanar_json(datos):
+    """Campos de una fila del CSV a partir de un documento de `exportToJSON` (números sin pasar a texto)"""
+    try:
+        parametros, resultados = datos["parametros"], datos["resultados"]
+        return [
+            str(datos["fecha"]), str(datos["hora"]),
+            parametros["hidratos_carbono_gramos"], parametros["minutos_caminando"],
+            parametros["horas_sueño"], resultados["glucosa_estimada_mg_dl"],
+            # "+60 mg/dL" -> "+60", como en la columna del CSV
+            str(resultados["efecto_hidratos"]).replace(" mg/dL", ""),
+            str(resultados["efecto_caminata"]).replace(" mg/dL", ""),
+            str(resultados["efecto_sueño"]),
+        ]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"exportación JSON sin el campo {e}") from None
+
+
+def _patron_exportacion_json():
+    """Expresión que captura los 9 campos de un documento de exportToJSON, en el orden en que los escribe"""
+    numero = rb'([-+0-9.eE]+|null)'  # Lo que no sea un número válido queda como NaN
+    texto = rb'"([^"\\]*)"'  # Sin secuencias de escape: si las hay, el documento va por el parser completo
+
+    def campo(clave, valor):
+        return b'"' + clave.encode("utf-8") + rb'"\s*:\s*' + valor
+
+    coma = rb'\s*,\s*'
+    return re.compile(
+        campo("fecha", texto) + coma + campo("hora", texto) + coma
+        + campo("parametros", rb'\{\s*') + campo("hidratos_carbono_gramos", numero) + coma
+        + campo("minutos_caminando", numero) + coma + campo("horas_sueño", numero) + rb'\s*\}' + coma
+        + campo("resultados", rb'\{\s*') + campo("glucosa_estimada_mg_dl", numero) + coma
+        + campo("efecto_hidratos", texto) + coma + campo("efecto_caminata", texto) + coma
+        + campo("efecto_sueño", texto))
+
+
+_PATRON_JSON = _patron_exportacion_json()
+_MARCA_DOCUMENTO = b'"parametros"'
+# "+60 mg/dL" -> "+60", como en las columnas del CSV
+_INDICES_EFECTO_MG_DL = [COLUMNAS_EXPORTACION.index(c) for c in ("Efecto HC", "Efecto Caminar")]
+
+
+def _numeros(valores):
+    """Lista de floats a partir de números en bytes o ya interpretados (null o inválido: NaN)"""
+    try:
+        return list(map(float, valores))
+    except (ValueError, TypeError):
+        return [_a_numero(v) for v in valores]
+
+
+def _textos(valores, quitar=None):
+    """Lista de str a partir de textos UTF-8 en bytes, decodificados de una vez (sin `quitar`)"""
+    unidos = b"\0".join(valores)
+    if quitar:
+        unidos = unidos.replace(quitar, b"")
+    textos = unidos.decode("utf-8").split("\0")
+    if len(textos) != len(valores):  # Algún texto tenía un carácter nulo
+        textos = [(v.replace(quitar, b"") if quitar else v).decode("utf-8") for v in valores]
+    return textos
+
+
+def _columnas_rapidas(datos, documentos=None):
+    """Columnas del CSV leídas directamente de los bytes de documentos de exportToJSON, o None
+
+    Solo se buscan los campos que se usan, sin construir cada documento.
+    documentos es cuántos hay (una línea por documento en NDJSON); si no se
+    sabe, se cuentan las claves "parametros". Si algún documento no tiene la
+    forma exacta de la app (campos en otro orden, secuencias de escape,
+    números como texto...) el número de coincidencias no cuadra y se devuelve
+    None para usar el parser completo.
+    """
+    coincidencias = _PATRON_JSON.findall(datos)
+    esperados = datos.count(_MARCA_DOCUMENTO) if documentos is None else documentos
+    if not coincidencias or len(coincidencias) != esperados:
+        return None
+    campos = list(zip(*coincidencias))
+    columnas = [None] * len(COLUMNAS_EXPORTACION)
+    for i in _INDICES_NUMERICOS:
+        columnas[i] = _numeros(campos[i])
+    for i in _INDICES_TEXTO:
+        columnas[i] = _textos(campos[i], b" mg/dL" if i in _INDICES_EFECTO_MG_DL else None)
+    return columnas
+
+
+def _lineas(datos):
+    """Número de líneas de un texto en bytes, sin contar el espacio del final"""
+    fin = len(datos)
+    while fin and datos[fin - 1] in b" \t\r\n":
+        fin -= 1
+    return datos.count(b"\n", 0, fin) + 1 if fin else 0
+
+
+def _columnas_de_filas(filas):
+    """Columnas del CSV (números como float) a partir de filas aplanadas"""
+    if not filas:
+        return [[] for _ in COLUMNAS_EXPORTACION]
+    columnas = [list(c) for c in zip(*filas)]
+    for i in _INDICES_NUMERICOS:
+        columnas[i] = _numeros(columnas[i])
+    return columnas
+
+
+def _documentos_concatenados(texto):
+    """Documentos JSON seguidos, separados o no por saltos de línea"""
+    decodificador = json.JSONDecoder()
+    posicion, fin = 0, len(texto)
+    while True:
+        while posicion < fin and texto[posicion].isspace():
+            posicion += 1
+        if posicion == fin:
+            return
+        datos, posicion = decodificador.raw_decode(texto, posicion)
+        yield datos
+
+
+def _filas_json(datos, ndjson):
+    """Filas aplanadas de todos los documentos de un archivo (parser JSON completo)"""
+    if ndjson:
+        documentos = [_interpretar_json(linea) for linea in datos.splitlines() if linea.strip()]
+    else:
+        try:
+            documento = _interpretar_json(datos)
+            documentos = documento if isinstance(documento, list) else [documento]
+        except ValueError:  # Varios documentos concatenados en un .json
+            documentos = _documentos_concatenados(datos.decode("utf-8"))
+    filas = []
+    for numero, documento in enumerate(documentos, start=1):
+        try:
+            filas.append(aplanar_json(documento))
+        except ValueError as e:
+            raise ValueError(f"documento {numero}: {e}") from None
+    return filas
+
+
+def leer_columnas_json(ruta):
+    """Lee una exportación JSON de la app (un documento, una lista o NDJSON) como columnas del CSV"""
+    with open(ruta, "rb") as f:
+        return columnas_json(f.read(), ruta.lower().endswith(EXTENSIONES_NDJSON))
+
+
+def columnas_json(datos, ndjson=False):
+    """Columnas del CSV de exportaciones JSON ya leídas (bytes)"""
+    if datos.startswith(codecs.BOM_UTF8):
+        datos = datos[len(codecs.BOM_UTF8):]
+    # En NDJSON cada línea es un documento (si hay líneas en blanco, se usa el parser completo)
+    documentos = _lineas(datos) if ndjson else None
+    columnas = _columnas_rapidas(datos, documentos)
+    return columnas if columnas is not None else _columnas_de_filas(_filas_json(datos, ndjson))
+
+
+def dataframe_json(datos, nombre, ndjson=False):
+    """DataFrame con el esquema del CSV de exportaciones JSON recibidas en memoria (bytes)"""
+    return _bloque_json(columnas_json(datos, ndjson), nombre)
+
+
+def _bloque_json(columnas, nombre):
+    """DataFrame con las columnas del CSV (números como float64) y el archivo de origen"""
+    df = pd.DataFrame({
+        columna: np.array(valores, dtype=np.float64 if i in _INDICES_NUMERICOS else object)
+        for i, (columna, valores) in enumerate(zip(COLUMNAS_EXPORTACION, columnas))})
+    df["archivo_origen"] = nombre
+    return df
+
+
+def _filas_lineas(lineas, estado, nombre, errores):
+    """Filas aplanadas de un lote de líneas con el parser completo
+
+    estado["pendiente"] guarda las líneas de un documento con formato que
+    sigue en el lote siguiente; estado["linea"] es el número de la última línea.
+    """
+    filas = []
+    pendiente = estado["pendiente"]
+    for linea in lineas:
+        estado["linea"] += 1
+        numero = estado["linea"]
+        inicio = linea.lstrip()[:1]
+        if not inicio:
+            continue
+        if pendiente and linea[:1] == b"{":  # Empieza otro documento: el anterior estaba cortado
+            if errores is not None:
+                errores.append((nombre, f"línea {numero - 1}: documento JSON incompleto"))
+            pendiente = []
+        if pendiente:
+            pendiente.append(linea)
+            if inicio not in (b"}", b"]"):
+                continue
+            texto = b"".join(pendiente)
+        else:
+            texto = linea
+        try:
+            datos = _interpretar_json(texto)
+        except ValueError as e:
+            if not pendiente:
+                pendiente.append(linea)
+            if len(pendiente) > MAX_LINEAS_DOCUMENTO:
+                if errores is not None:
+                    errores.append((nombre, f"línea {numero}: {e}"))
+                pendiente = []
+            continue
+        pendiente = []
+        for documento in (datos if isinstance(datos, list) else [datos]):
+            try:
+                filas.append(aplanar_json(documento))
+            except ValueError as e:
+                if errores is not None:
+                    errores.append((nombre, f"línea {numero}: {e}"))
+    estado["pendiente"] = pendiente
+    return filas
+
+
+def iterar_ndjson(origen, filas_por_bloque=FILAS_POR_BLOQUE_JSON, nombre=None, errores=None):
+    """Genera DataFrames de como mucho filas_por_bloque filas de un flujo de exportaciones JSON
+
+    origen es una ruta o un archivo binario abierto (por ejemplo
+    sys.stdin.buffer) con documentos concatenados: uno por línea (NDJSON) o
+    con formato en varias líneas. Se lee por lotes de líneas, así que la
+    memoria no depende del tamaño del flujo. Los documentos que no se pueden
+    interpretar se anotan en errores como (nombre, mensaje) y se saltan.
+    """
+    if isinstance(origen, (str, os.PathLike)):
+        nombre = nombre or os.path.basename(origen)
+        with open(origen, "rb") as f:
+            yield from iterar_ndjson(f, filas_por_bloque, nombre, errores)
+        return
+
+    nombre = nombre or "stdin"
+    estado = {"pendiente": [], "linea": 0}
+    columnas = [[] for _ in COLUMNAS_EXPORTACION]
+    while True:
+        lineas = list(itertools.islice(origen, filas_por_bloque))
+        if not lineas:
+            break
+        if estado["linea"] == 0 and lineas[0].startswith(codecs.BOM_UTF8):
+            lineas[0] = lineas[0][len(codecs.BOM_UTF8):]
+        # Lote NDJSON con la forma de la app: una expresión regular sobre todo el lote
+        documentos = sum(1 for linea in lineas if not linea.isspace())
+        lote = None if estado["pendiente"] else _columnas_rapidas(b"".join(lineas), documentos)
+        if lote is None:
+            lote = _columnas_de_filas(_filas_lineas(lineas, estado, nombre, errores))
+        else:
+            estado["linea"] += len(lineas)
+        for columna, valores in zip(columnas, lote):
+            columna.extend(valores)
+        if len(columnas[0]) >= filas_por_bloque:
+            yield _bloque_json([c[:filas_por_bloque] for c in columnas], nombre)
+            columnas = [c[filas_por_bloque:] for c in columnas]
+    if estado["pendiente"] and errores is not None:
+        errores.append((nombre, "documento JSON incompleto al final del flujo"))
+    if columnas[0]:
+        yield _bloque_json(columnas, nombre)
+
+
+def _leer_lote(rutas):
+    """Lee un lote de archivos; se ejecuta dentro del pool"""
+    columnas = [[] for _ in COLUMNAS_EXPORTACION]
+    filas_por_archivo = []
+    respaldo = []  # (posición en el lote, DataFrame) leídos con pandas
+    errores = []
+    tiempos = []
+
+    for posicion, ruta in enumerate(rutas):
+        inicio = time.perf_counter()
+        try:
+            if ruta.lower().endswith(EXTENSIONES_JSON):
+                filas = None
+                leidas = leer_columnas_json(ruta)
+            else:
+                filas = leer_exportacion(ruta)
+        except EsquemaDesconocido:
+            try:
+                df = pd.read_csv(ruta)
+                respaldo.append((posicion, df))
+                tiempos.append((ruta, time.perf_counter() - inicio, len(df)))
+            except Exception as e:
+                errores.append((ruta, str(e)))
+            filas_por_archivo.append(0)
+            continue
+        except Exception as e:
+            errores.append((ruta, str(e)))
+            filas_por_archivo.append(0)
+            continue
+
+        if filas is None:  # JSON: ya viene por columnas
+            for columna, valores in zip(columnas, leidas):
+                columna.extend(valores)
+            n = len(leidas[0])
+        else:
+            for campos in filas:
+                for i in _INDICES_NUMERICOS:
+                    columnas[i].append(_a_numero(campos[i]))
+                for i in _INDICES_TEXTO:
+                    columnas[i].append(campos[i])
+            n = len(filas)
+        filas_por_archivo.append(n)
+        tiempos.append((ruta, time.perf_counter() - inicio, n))
+
+    return columnas, filas_por_archivo, respaldo, errores, tiempos
+
+
+def _lotes(rutas, tamano):
+    """Divide la lista de rutas en lotes consecutivos"""
+    for inicio in range(0, len(rutas), tamano):
+        yield rutas[inicio:inicio + tamano]
+
+
+def cargar_archivos(rutas, max_workers=None, procesos=False, tamano_lote=TAMANO_LOTE,
+                    avance=None, columna_ruta=None):
+    """Carga en paralelo una lista de exportaciones CSV o JSON en un único DataFrame
+
+    avance(hechos, total) se llama tras cada lote con el número de archivos procesados.
+    Si se indica columna_ruta, se añade esa columna con la ruta completa de cada fila.
+    """
+    rutas = list(rutas)
+    lotes = list(_lotes(rutas, tamano_lote))
+
+    if len(lotes) <= 1:
+        resultados = [_leer_lote(lote) for lote in lotes]
+        if avance and lotes:
+            avance(len(rutas), len(rutas))
+    else:
+        pool_cls = ProcessPoolExecutor if procesos else ThreadPoolExecutor
+        resultados = []
+        hechos = 0
+        with pool_cls(max_workers=max_workers) as pool:
+            for lote, resultado in zip(lotes, pool.map(_leer_lote, lotes)):
+                resultados.append(resultado)
+                hechos += len(lote)
+                if avance:
+                    avance(hechos, len(rutas))
+
+    return _combinar(lotes, resultados, columna_ruta)
+
+
+def _combinar(lotes, resultados, columna_ruta=None):
+    """Vuelca los resultados de los lotes en columnas preasignadas"""
+    total = sum(len(columnas[0]) for columnas, _, _, _, _ in resultados)
+    numericas = {c: np.empty(total, dtype=np.float64) for c in COLUMNAS_NUMERICAS}
+    textos = {c: np.empty(total, dtype=object) for c in COLUMNAS_TEXTO}
+    nombres = []
+    filas_por_archivo = []
+    extras = []
+    errores = []
+    tiempos = []
+    leidos = 0
+
+    inicio = 0
+    for lote, (columnas, filas_lote, respaldo, errores_lote, tiempos_lote) in zip(lotes, resultados):
+        n = len(columnas[0])
+        fin = inicio + n
+        for nombre, i in zip(COLUMNAS_NUMERICAS, _INDICES_NUMERICOS):
+            numericas[nombre][inicio:fin] = columnas[i]
+        for nombre, i in zip(COLUMNAS_TEXTO, _INDICES_TEXTO):
+            textos[nombre][inicio:fin] = columnas[i]
+        inicio = fin
+
+        nombres.extend(os.path.basename(ruta) for ruta in lote)
+        filas_por_archivo.extend(filas_lote)
+        for posicion, df in respaldo:
+            df['archivo_origen'] = os.path.basename(lote[posicion])
+            if columna_ruta:
+                df[columna_ruta] = lote[posicion]
+            extras.append(df)
+        errores.extend(errores_lote)
+        tiempos.extend(tiempos_lote)
+        leidos += len(lote) - len(errores_lote)
+
+    datos = {c: textos[c] if c in textos else numericas[c] for c in COLUMNAS_EXPORTACION}
+    repeticiones = np.array(filas_por_archivo, dtype=np.int64)
+    datos['archivo_origen'] = np.repeat(np.array(nombres, dtype=object), repeticiones)
+    if columna_ruta:
+        rutas = [ruta for lote in lotes for ruta in lote]
+        datos[columna_ruta] = np.repeat(np.array(rutas, dtype=object), repeticiones)
+    df = pd.DataFrame(datos)
+
+    if extras:
+        df = pd.concat([df] + extras, ignore_index=True)
+
+    return ResultadoIngesta(df, errores, leidos, tiempos)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Instrumentación del análisis por etapas
+=======================================
+
+`Medidor` registra de cada etapa del pipeline (carga, normalización,
+gráficos, informe...) el tiempo real, el tiempo de CPU, las filas procesadas
+y el pico de memoria, y de la carga el tiempo real y las filas de cada
+archivo leído. Los archivos se leen en un grupo de hilos, así que su tiempo
+de CPU y su memoria no se pueden separar: solo se miden por etapa.
+
+También mueve la barra de progreso: cada etapa ocupa un tramo del plan
+(nombre de etapa -> porcentaje al terminarla) y, si la etapa informa de su
+avance con `avance(hechos, total)`, la barra avanza dentro del tramo a medida
+que se hace el trabajo en lugar de saltar a valores fijos.
+
+El pico de memoria es el de Python y NumPy durante la etapa (tracemalloc)
+con asignaciones=True, que ralentiza la carga de muchos archivos; si no, es
+el pico de memoria residente del proceso al terminar la etapa.
+
+Los resultados se leen con `a_dict()` (listo para JSON), `guardar_json()` o
+`tabla()`, y al_terminar(etapa) recibe cada etapa (como dict) en cuanto acaba.
+`CanalProgreso` lleva el progreso de un hilo de trabajo a la interfaz.
+
+Solo usa la biblioteca estándar: se puede importar sin retrasar el arranque.
+"""
+
+import sys
+import json
+import time
+import queue
+from contextlib import contextmanager
+
+INTERVALO_SIN_TOTAL = 0.5  # Segundos entre avisos de avance cuando no se conoce el total
+
+
+def _sin_aviso(*args):
+    """Callback por defecto: descarta los avisos"""
+
+
+def rss_pico_mb():
+    """Pico de memoria residente del proceso en MB (None si no se puede medir)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 2**20 if sys.platform == "darwin" else pico / 2**10  # bytes en macOS, KiB en Linux
+
+
+class Etapa:
+    """Mediciones de una etapa del análisis"""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.segundos = 0.0
+        self.cpu = 0.0
+        self.filas = None
+        self.pico_mb = None
+        self.asignaciones = False  # pico_mb es de tracemalloc (True) o RSS del proceso (False)
+
+    def a_dict(self):
+        return {"etapa": self.nombre, "segundos": self.segundos, "cpu": self.cpu, "filas": self.filas,
+                "pico_mb": self.pico_mb, "memoria": "asignaciones" if self.asignaciones else "rss"}
+
+
+class Medidor:
+    """Cronometra las etapas de un análisis y convierte su avance en progreso real"""
+
+    def __init__(self, progreso=None, plan=None, asignaciones=False, al_terminar=None, paso=1):
+        self.progreso = progreso or _sin_aviso
+        self.plan = plan or {}
+        self.paso = paso  # Puntos mínimos entre dos avisos de avance dentro de una etapa
+        self.al_terminar = al_terminar or _sin_aviso
+        self.etapas = []
+        self.archivos = []  # (ruta, segundos, filas) de cada archivo leído
+        self._porcentaje = 0
+        self._tramo = (0, 0)
+        self._mensaje = ""
+        self._mensaje_etapa = ""
+        self._ultimo_aviso = 0.0
+        self._iniciado_tracemalloc = False
+
+        self.asignaciones = asignaciones
+        if asignaciones:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._iniciado_tracemalloc = True
+
+    def usar_plan(self, plan):
+        """Cambia el plan de progreso (si el medidor lo creó quien llama sin plan)"""
+        self.plan = dict(plan, **self.plan)
+
+    def _notificar(self, porcentaje, mensaje):
+        porcentaje = int(porcentaje)
+        if porcentaje != self._porcentaje or mensaje != self._mensaje:
+            self._porcentaje, self._mensaje = porcentaje, mensaje
+            self.progreso(porcentaje, mensaje)
+
+    @contextmanager
+    def etapa(self, nombre, mensaje):
+        """Mide el bloque como la etapa `nombre`
+
+        Se notifica el comienzo de la etapa; al salir la barra queda en el
+        porcentaje del plan, que se muestra con el mensaje de la siguiente.
+        """
+        registro = Etapa(nombre)
+        self._tramo = (self._porcentaje, self.plan.get(nombre, self._porcentaje))
+        self._mensaje_etapa = mensaje
+        self._notificar(self._porcentaje, mensaje)
+        if self.asignaciones:
+            import tracemalloc
+            tracemalloc.reset_peak()
+
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield registro
+        finally:
+            registro.segundos = time.perf_counter() - inicio
+            registro.cpu = time.process_time() - inicio_cpu
+            if self.asignaciones:
+                import tracemalloc
+                registro.pico_mb = tracemalloc.get_traced_memory()[1] / 2**20
+                registro.asignaciones = True
+            else:
+                registro.pico_mb = rss_pico_mb()
+            self.etapas.append(registro)
+            self._porcentaje = self._tramo[1]
+            self.al_terminar(registro.a_dict())
+
+    def avance(self, hechos, total=None):
+        """Avance dentro de la etapa actual (por ejemplo archivos leídos de total)
+
+        Sin total (filas agregadas en streaming) solo se actualiza el mensaje.
+        """
+        if not total:
+            if time.monotonic() - self._ultimo_aviso >= INTERVALO_SIN_TOTAL:
+                self._ultimo_aviso = time.monotonic()
+                self._notificar(self._porcentaje, f"{self._mensaje_etapa} ({hechos})")
+            return
+        inicio, fin = self._tramo
+        porcentaje = inicio + (fin - inicio) * min(hechos / total, 1)
+        if porcentaje - self._porcentaje >= self.paso or hechos >= total:
+            self._notificar(porcentaje, f"{self._mensaje_etapa} ({hechos}/{total})")
+
+    def registrar_archivos(self, tiempos):
+        """Añade los tiempos por archivo de una carga ((ruta, segundos, filas))"""
+        self.archivos.extend(tiempos)
+
+    @property
+    def segundos(self):
+        return sum(e.segundos for e in self.etapas)
+
+    def a_dict(self):
+        """Resumen de las mediciones, listo para JSON"""
+        return {
+            "segundos": self.segundos,
+            "cpu": sum(e.cpu for e in self.etapas),
+            "etapas": [e.a_dict() for e in self.etapas],
+            "archivos_leidos": len(self.archivos),
+            "segundos_archivos": sum(t[1] for t in self.archivos),
+            "archivos": [{"archivo": ruta, "segundos": segundos, "filas": filas}
+                         for ruta, segundos, filas in self.archivos],
+        }
+
+    def guardar_json(self, ruta):
+        """Escribe a_dict() en ruta"""
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.a_dict(), f, ensure_ascii=False, indent=2)
+        return ruta
+
+    def tabla(self):
+        """Líneas de texto con los tiempos de cada etapa"""
+        memoria = "asign. MB" if self.asignaciones else "   RSS MB"
+        lineas = [f"   {'etapa':<20} {'real s':>8} {'CPU s':>8} {'filas':>10} {memoria}"]
+        for e in self.etapas:
+            filas = "" if e.filas is None else e.filas
+            pico = "" if e.pico_mb is None else f"{e.pico_mb:.0f}"
+            lineas.append(f"   {e.nombre:<20} {e.segundos:8.3f} {e.cpu:8.3f} {filas:>10} {pico:>9}")
+        lineas.append(f"   {'total':<20} {self.segundos:8.3f}")
+        if self.archivos:
+            ruta, segundos, filas = max(self.archivos, key=lambda t: t[1])
+            lineas.append(f"   {len(self.archivos)} archivos leídos; el más lento: {ruta} "
+                          f"({segundos * 1000:.1f} ms, {filas} filas)")
+        return lineas
+
+    def resumen(self, etapas=3):
+        """Una línea con el tiempo total y las etapas más lentas"""
+        lentas = sorted(self.etapas, key=lambda e: -e.segundos)[:etapas]
+        detalle = " · ".join(f"{e.nombre} {e.segundos:.1f} s" for e in lentas)
+        return f"{self.segundos:.1f} s ({detalle})" if lentas else f"{self.segundos:.1f} s"
+
+    def cerrar(self):
+        """Detiene tracemalloc si lo inició este medidor"""
+        if self._iniciado_tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+            self._iniciado_tracemalloc = False
+
+
+class CanalProgreso:
+    """Eventos de progreso de un hilo de trabajo hacia el hilo de la interfaz
+
+    El hilo de trabajo solo encola tuplas (progreso, aviso y fin), sin tocar
+    los widgets; la interfaz llama a `recoger` a ritmo fijo (por ejemplo con
+    `after` de Tk), que vacía la cola y fusiona los eventos: de todo lo
+    recibido desde la última vez solo importan el último porcentaje y el
+    último mensaje.
+    """
+
+    def __init__(self):
+        self._cola = queue.SimpleQueue()
+
+    def progreso(self, porcentaje, mensaje):
+        """Callback de progreso de `Medidor`"""
+        self._cola.put(("progreso", porcentaje, mensaje))
+
+    def aviso(self, mensaje):
+        """Callback avisar(mensaje) del análisis"""
+        self._cola.put(("aviso", None, mensaje))
+
+    def terminar(self, **resultado):
+        """Último evento del trabajo, con su resultado (por ejemplo ruta=... o error=...)"""
+        self._cola.put(("fin", None, resultado))
+
+    def recoger(self):
+        """(porcentaje, mensaje, resultado) de los eventos pendientes; None en lo que no ha cambiado"""
+        porcentaje = mensaje = resultado = None
+        while True:
+            try:
+                tipo, valor, dato = self._cola.get_nowait()
+            except queue.Empty:
+                return porcentaje, mensaje, resultado
+            if tipo == "fin":
+                resultado = dato
+            else:
+                mensaje = dato
+                if valor is not None:
+                    porcentaje = valor
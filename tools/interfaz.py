@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Interfaz gráfica (Tkinter) del Analizador de Simulaciones Diabéticas
+====================================================================
+
+Ventana de escritorio para seleccionar los CSV exportados desde la app web
+y generar el informe. Todo el análisis se delega en el módulo `nucleo`,
+que no depende de Tkinter.
+"""
+
+import os
+import platform
+from itertools import islice
+from threading import Thread
+from tkinter import (Tk, Frame, Label, Button,
+                    filedialog, messagebox, StringVar, Toplevel, ttk)
+from tkinter.font import BOLD
+
+import nucleo
+import instrumentacion
+import descubrimiento
+from lista_archivos import ListaArchivos
+from nucleo import (BG_COLOR, BTN_COLOR, BTN_HOVER, SUCCESS_COLOR,
+                    WARNING_COLOR, DANGER_COLOR, TEXT_COLOR)
+
+TITLE_FONT = ("Segoe UI", 14, BOLD)
+NORMAL_FONT = ("Segoe UI", 10)
+SMALL_FONT = ("Segoe UI", 9)
+LOTE_DESCUBRIMIENTO = 2000  # Archivos añadidos a la lista en cada vuelta del bucle de Tk
+EXTENSIONES_SELECCION = descubrimiento.EXTENSIONES + (".eqd",)
+INTERVALO_PROGRESO_MS = 50  # La ventana recoge el progreso del análisis 20 veces por segundo
+
+class AnalizadorDiabetesApp:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("⚕️ Analizador de Simulaciones Diabéticas")
+        self.root.geometry("700x660")
+        self.root.configure(bg=BG_COLOR)
+        self.root.resizable(False, False)
+        
+        # Centrar ventana en la pantalla
+        self.root.update_idletasks()
+        width = self.root.winfo_width()
+        height = self.root.winfo_height()
+        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.root.winfo_screenheight() // 2) - (height // 2)
+        self.root.geometry(f"+{x}+{y}")
+        
+        # Variables
+        self.archivos_seleccionados = []
+        self._vistos = set()  # Claves de `descubrimiento` de los archivos ya seleccionados
+        self._seleccion = 0  # Cambia al limpiar: los recorridos pendientes de antes se abandonan
+        self.ruta_datos = None
+        self.progreso = StringVar()
+        self.progreso.set("Listo para analizar")
+        
+        # Crear interfaz
+        self.crear_interfaz()
+        
+        # Cargar datos de ejemplo automáticamente
+        self.cargar_datos_ejemplo()
+
+        # pandas y matplotlib se cargan en segundo plano cuando la ventana ya es visible
+        self.root.after_idle(lambda: Thread(target=nucleo.precargar, daemon=True).start())
+    
+    def crear_interfaz(self):
+        """Crea toda la interfaz gráfica de la aplicación"""
+        # Fuente para títulos
+        title_font = ("Segoe UI", 16, BOLD)
+        subtitle_font = ("Segoe UI", 12, "italic")
+        
+        # Frame principal
+        main_frame = Frame(self.root, bg=BG_COLOR, padx=20, pady=20)
+        main_frame.pack(fill="both", expand=True)
+        
+        # Título
+        title_label = Label(main_frame, text="⚕️ Analizador de Simulaciones Diabéticas", 
+                           font=title_font, bg=BG_COLOR, fg=BTN_COLOR)
+        title_label.pack(pady=(0, 10))
+        
+        # Subtítulo
+        subtitle_label = Label(main_frame, text="Herramienta educativa para pacientes con diabetes tipo 2", 
+                              font=subtitle_font, bg=BG_COLOR, fg=TEXT_COLOR)
+        subtitle_label.pack(pady=(0, 20))
+        
+        # Frame para selección de archivos
+        select_frame = Frame(main_frame, bg="white", bd=2, relief="groove", padx=15, pady=15)
+        select_frame.pack(fill="x", pady=10)
+        
+        Label(select_frame, text="📁 Archivos CSV seleccionados:", 
+              font=("Segoe UI", 10, BOLD), bg="white", fg=TEXT_COLOR).pack(anchor="w")
+        
+        # Lista virtual de archivos (solo se pintan las filas visibles), con filtro y resumen
+        self.lista_archivos = ListaArchivos(select_frame, filas=6, fuente=SMALL_FONT, bg="#f8fafc",
+                                            selectbackground=BTN_COLOR, selectforeground="white")
+        self.lista_archivos.pack(fill="both", expand=True, pady=(5, 10))
+        
+        # Botones de selección
+        btn_frame = Frame(select_frame, bg="white")
+        btn_frame.pack(fill="x", pady=(5, 0))
+        
+        Button(btn_frame, text="➕ Agregar Archivos", command=self.seleccionar_archivos,
+               bg=BTN_COLOR, fg="white", font=NORMAL_FONT, padx=15, pady=5,
+               activebackground=BTN_HOVER, cursor="hand2").pack(side="left", padx=5)
+
+        Button(btn_frame, text="📂 Agregar Carpeta", command=self.seleccionar_carpeta,
+               bg=BTN_COLOR, fg="white", font=NORMAL_FONT, padx=15, pady=5,
+               activebackground=BTN_HOVER, cursor="hand2").pack(side="left", padx=5)
+        
+        Button(btn_frame, text="🗑️ Limpiar Selección", command=self.limpiar_seleccion,
+               bg=WARNING_COLOR, fg="white", font=NORMAL_FONT, padx=15, pady=5,
+               activebackground="#d68910", cursor="hand2").pack(side="left", padx=5)
+        
+        # Frame para el botón de análisis
+        analyze_frame = Frame(main_frame, bg=BG_COLOR, pady=20)
+        analyze_frame.pack(fill="x")
+        
+        self.analyze_btn = Button(analyze_frame, text="📊 GENERAR INFORME", 
+                                command=self.iniciar_analisis,
+                                bg=SUCCESS_COLOR, fg="white", font=("Segoe UI", 12, BOLD),
+                                padx=30, pady=12, state="disabled",
+                                activebackground="#27ae60", cursor="hand2")
+        self.analyze_btn.pack(pady=10)
+        
+        # Frame para progreso
+        progress_frame = Frame(main_frame, bg=BG_COLOR)
+        progress_frame.pack(fill="x")
+        
+        Label(progress_frame, text="Estado:", font=("Segoe UI", 9, BOLD), 
+              bg=BG_COLOR, fg=TEXT_COLOR).pack(anchor="w")
+        
+        self.progress_bar = ttk.Progressbar(progress_frame, mode='determinate', length=600)
+        self.progress_bar.pack(fill="x", pady=(5, 10))
+        
+        self.progreso_label = Label(progress_frame, textvariable=self.progreso,
+                                   font=SMALL_FONT, bg=BG_COLOR, fg=TEXT_COLOR)
+        self.progreso_label.pack(anchor="w")
+        
+        # Frame para información
+        info_frame = Frame(main_frame, bg="#e3f2fd", bd=1, relief="solid", padx=15, pady=15)
+        info_frame.pack(fill="x", pady=10)
+        
+        Label(info_frame, text="💡 ¿Cómo usar esta herramienta?", 
+              font=("Segoe UI", 10, BOLD), bg="#e3f2fd", fg=BTN_COLOR).pack(anchor="w")
+        
+        instrucciones = [
+            "1. Haz clic en 'Agregar Archivos' o 'Agregar Carpeta' para seleccionar tus CSVs exportados",
+            "2. O usa los archivos de ejemplo que ya están cargados",
+            "3. Haz clic en 'GENERAR INFORME' para crear tu análisis",
+            "4. El informe se abrirá automáticamente en tu navegador"
+        ]
+        
+        for instruccion in instrucciones:
+            Label(info_frame, text=instruccion, font=SMALL_FONT, 
+                  bg="#e3f2fd", fg=TEXT_COLOR, anchor="w", justify="left").pack(anchor="w", pady=2)
+        
+        # Pie de página
+        footer_frame = Frame(main_frame, bg=BG_COLOR, pady=10)
+        footer_frame.pack(fill="x")
+        
+        Label(footer_frame, text="© 2025 - Herramienta educativa basada en guías de la ADA", 
+              font=SMALL_FONT, bg=BG_COLOR, fg="#7f8c8d").pack()
+        
+        Label(footer_frame, text="* Este análisis es con fines educativos. Consulta siempre con tu médico.",
+              font=SMALL_FONT, bg=BG_COLOR, fg=DANGER_COLOR).pack()
+    
+    def cargar_datos_ejemplo(self):
+        """Carga archivos de ejemplo automáticamente si no hay archivos seleccionados"""
+        try:
+            # Buscar carpeta ejemplo_datos
+            rutas_posibles = [
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ejemplo_datos"),
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), "ejemplo_datos"),
+                os.path.join(os.getcwd(), "ejemplo_datos"),
+                "ejemplo_datos"
+            ]
+            
+            carpeta_encontrada = None
+            for ruta in rutas_posibles:
+                ruta_normalizada = os.path.normpath(ruta)
+                if os.path.exists(ruta_normalizada):
+                    carpeta_encontrada = ruta_normalizada
+                    break
+            
+            if not carpeta_encontrada:
+                # Crear carpeta de ejemplo con archivos
+                carpeta_encontrada = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ejemplo_datos")
+                os.makedirs(carpeta_encontrada, exist_ok=True)
+                
+                # Crear archivos de ejemplo
+                ejemplo1 = os.path.join(carpeta_encontrada, "simulacion_ejemplo1.csv")
+                with open(ejemplo1, 'w', encoding='utf-8') as f:
+                    f.write("Fecha,Hora,Hidratos (g),Caminata (min),Sueño (h),Glucosa (mg/dL),Efecto HC,Efecto Caminar,Efecto Sueño\n")
+                    f.write("23/11/2025,08:30,50,20,7,95,+60,-16,0 por sueño óptimo\n")
+                
+                ejemplo2 = os.path.join(carpeta_encontrada, "simulacion_ejemplo2.csv")
+                with open(ejemplo2, 'w', encoding='utf-8') as f:
+                    f.write("Fecha,Hora,Hidratos (g),Caminata (min),Sueño (h),Glucosa (mg/dL),Efecto HC,Efecto Caminar,Efecto Sueño\n")
+                    f.write("23/11/2025,13:45,80,10,5,165,+96,-8,+5.0 por <7h sueño\n")
+                
+                self.progreso.set("✅ Archivos de ejemplo creados automáticamente")
+            
+            # Cargar las exportaciones de la carpeta (y sus subcarpetas)
+            if carpeta_encontrada:
+                self.agregar_rutas([carpeta_encontrada], "archivos de ejemplo listos para analizar",
+                                   "⚠️ No se encontraron archivos CSV ni JSON en la carpeta de ejemplo")
+        
+        except Exception as e:
+            self.progreso.set(f"❌ Error al cargar ejemplos: {str(e)}")
+    
+    def seleccionar_archivos(self):
+        """Abre diálogo para seleccionar archivos CSV o JSON"""
+        archivos = filedialog.askopenfilenames(
+            title="Seleccionar archivos CSV o JSON",
+            filetypes=[("Exportaciones CSV o JSON", "*.csv *.json *.ndjson *.jsonl"),
+                       ("Archivos compactos", "*.eqd"),
+                       ("Archivos CSV", "*.csv"), ("Archivos JSON", "*.json *.ndjson *.jsonl"),
+                       ("Todos los archivos", "*.*")],
+            initialdir=os.path.dirname(os.path.abspath(__file__))
+        )
+        
+        if archivos:
+            self.agregar_rutas(archivos)
+
+    def seleccionar_carpeta(self):
+        """Añade todas las exportaciones de una carpeta y sus subcarpetas"""
+        carpeta = filedialog.askdirectory(title="Seleccionar carpeta de exportaciones",
+                                          initialdir=os.path.dirname(os.path.abspath(__file__)))
+        if carpeta:
+            self.agregar_rutas([carpeta])
+
+    def agregar_rutas(self, rutas, mensaje_final="archivos seleccionados",
+                      mensaje_vacio="⚠️ No se encontraron archivos CSV ni JSON"):
+        """Añade archivos y carpetas a la selección sin bloquear la ventana
+
+        `descubrimiento` genera las rutas a medida que recorre las carpetas;
+        se añaden a la lista virtual por lotes de LOTE_DESCUBRIMIENTO en cada
+        vuelta del bucle de Tk y los duplicados se descartan con el conjunto
+        self._vistos.
+        """
+        encontrados = descubrimiento.descubrir(rutas, extensiones=EXTENSIONES_SELECCION, vistos=self._vistos)
+        seleccion = self._seleccion
+        self.analyze_btn.config(state="disabled")
+
+        def siguiente_lote():
+            if seleccion != self._seleccion:
+                return
+            lote = list(islice(encontrados, LOTE_DESCUBRIMIENTO))
+            if lote:
+                self.archivos_seleccionados.extend(lote)
+                self.lista_archivos.agregar(lote)
+            if len(lote) == LOTE_DESCUBRIMIENTO:
+                self.progreso.set(f"🔎 {len(self.archivos_seleccionados)} archivos encontrados...")
+                self.root.after(1, siguiente_lote)
+            elif self.archivos_seleccionados:
+                self.analyze_btn.config(state="normal")
+                self.progreso.set(f"✅ {len(self.archivos_seleccionados)} {mensaje_final}")
+            else:
+                self.progreso.set(mensaje_vacio)
+
+        siguiente_lote()
+    
+    def limpiar_seleccion(self):
+        """Limpia la selección de archivos"""
+        self.archivos_seleccionados = []
+        self._vistos = set()
+        self._seleccion += 1
+        self.lista_archivos.limpiar()
+        self.analyze_btn.config(state="disabled")
+        self.progreso.set(" Selección de archivos limpiada")
+    
+    def iniciar_analisis(self):
+        """Inicia el análisis en un hilo separado para no bloquear la interfaz"""
+        if not self.archivos_seleccionados:
+            messagebox.showwarning("Advertencia", "Por favor selecciona al menos un archivo CSV para analizar")
+            return
+        
+        # Deshabilitar botones durante el análisis
+        self.analyze_btn.config(state="disabled", text="⏳ ANALIZANDO...")
+        self.progress_bar['value'] = 0
+        self.progreso.set("Iniciando análisis...")
+        
+        # Crear hilo para el análisis; solo se comunica con la ventana a través del canal
+        canal = instrumentacion.CanalProgreso()
+        Thread(target=self.ejecutar_analisis, args=(list(self.archivos_seleccionados), canal), daemon=True).start()
+        self.root.after(INTERVALO_PROGRESO_MS, self.mostrar_progreso, canal)
+    
+    def ejecutar_analisis(self, archivos, canal):
+        """Ejecuta el análisis en segundo plano (no toca los widgets de Tk)"""
+        medidor = instrumentacion.Medidor(canal.progreso)
+        try:
+            ruta_informe = nucleo.ejecutar_analisis(archivos, avisar=canal.aviso, medidor=medidor)
+            canal.terminar(ruta=ruta_informe, tiempos=medidor.resumen())
+        except Exception as e:
+            canal.terminar(error=str(e))
+
+    def mostrar_progreso(self, canal):
+        """Aplica los eventos del canal a la barra y al estado, INTERVALO_PROGRESO_MS ms cada vez"""
+        porcentaje, mensaje, resultado = canal.recoger()
+        if porcentaje is not None:
+            self.progress_bar['value'] = porcentaje
+        if mensaje is not None:
+            self.progreso.set(mensaje)
+        if resultado is None:
+            self.root.after(INTERVALO_PROGRESO_MS, self.mostrar_progreso, canal)
+            return
+
+        ruta_informe = resultado.get("ruta")
+        if "error" in resultado:
+            self.progreso.set(f"❌ Error durante el análisis: {resultado['error']}")
+            messagebox.showerror("Error de análisis", f"Se produjo un error durante el análisis:\n{resultado['error']}")
+        elif ruta_informe and os.path.exists(ruta_informe):
+            self.progreso.set("✅ ¡Análisis completado con éxito!")
+            self.mostrar_resultado_exitoso(ruta_informe, resultado.get("tiempos"))
+        else:
+            self.progreso.set("❌ Error al generar el informe")
+            messagebox.showerror("Error", "No se pudo generar el informe. Verifica los archivos CSV.")
+        # Rehabilitar botones
+        self.analyze_btn.config(state="normal", text="📊 GENERAR INFORME")
+    
+    def mostrar_resultado_exitoso(self, ruta_informe, tiempos=None):
+        """Muestra un cuadro de diálogo con el resultado exitoso (versión compatible con Windows)"""
+        resultado_win = Toplevel(self.root)
+        resultado_win.title("✅ ¡Análisis Completado!")
+        resultado_win.geometry("500x330")
+        resultado_win.configure(bg=BG_COLOR)
+        resultado_win.resizable(False, False)
+        resultado_win.transient(self.root)
+        resultado_win.grab_set()
+        
+        # === CORRECCIÓN PARA WINDOWS - CENTRAR VENTANA SIN USAR eval ===
+        resultado_win.update_idletasks()
+        width = resultado_win.winfo_width()
+        height = resultado_win.winfo_height()
+        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.root.winfo_screenheight() // 2) - (height // 2)
+        resultado_win.geometry(f"+{x}+{y}")
+        # ===============================================================
+        
+        # Contenido
+        frame = Frame(resultado_win, bg=BG_COLOR, padx=20, pady=20)
+        frame.pack(fill="both", expand=True)
+        
+        Label(frame, text="🎉 ¡Informe Generado con Éxito!", 
+              font=("Segoe UI", 14, BOLD), bg=BG_COLOR, fg=SUCCESS_COLOR).pack(pady=(0, 10))
+        
+        Label(frame, text=f"Ubicación del informe:", 
+              font=("Segoe UI", 10), bg=BG_COLOR, fg=TEXT_COLOR).pack(pady=(5, 2))
+        
+        ruta_label = Label(frame, text=ruta_informe, 
+                          font=("Segoe UI", 9), bg=BG_COLOR, fg=BTN_COLOR,
+                          wraplength=450, justify="center")
+        ruta_label.pack(pady=5)
+
+        if tiempos:
+            Label(frame, text=f"⏱️ {tiempos}", font=SMALL_FONT, bg=BG_COLOR, fg=TEXT_COLOR,
+                  wraplength=450, justify="center").pack(pady=(2, 0))
+        
+        # Frame para botones
+        btn_frame = Frame(frame, bg=BG_COLOR)
+        btn_frame.pack(pady=20)
+        
+        Button(btn_frame, text="🌐 ABRIR INFORME", 
+               command=lambda: self.abrir_informe(ruta_informe),
+               bg=SUCCESS_COLOR, fg="white", font=NORMAL_FONT,
+               padx=20, pady=8, cursor="hand2").pack(side="left", padx=5)
+        
+        Button(btn_frame, text="📁 ABRIR CARPETA", 
+               command=lambda: self.abrir_carpeta(ruta_informe),
+               bg=BTN_COLOR, fg="white", font=NORMAL_FONT,
+               padx=20, pady=8, cursor="hand2").pack(side="left", padx=5)
+        
+        Button(btn_frame, text="OK", 
+               command=resultado_win.destroy,
+               bg="#95a5a6", fg="white", font=NORMAL_FONT,
+               padx=20, pady=8, cursor="hand2").pack(side="left", padx=5)
+        
+        # Abrir el informe automáticamente
+        self.root.after(1000, lambda: self.abrir_informe(ruta_informe))
+    
+    def abrir_informe(self, ruta):
+        """Abre el informe en el navegador predeterminado"""
+        import webbrowser
+        try:
+            webbrowser.open(f"file://{os.path.abspath(ruta)}")
+        except:
+            messagebox.showinfo("Información", 
+                               f"Abre manualmente este archivo:\n{ruta}")
+    
+    def abrir_carpeta(self, ruta):
+        """Abre la carpeta que contiene el informe"""
+        carpeta = os.path.dirname(ruta)
+        try:
+            if platform.system() == "Windows":
+                os.startfile(carpeta)
+            elif platform.system() == "Darwin":
+                os.system(f'open "{carpeta}"')
+            else:
+                os.system(f'xdg-open "{carpeta}"')
+        except:
+            messagebox.showinfo("Información", 
+                               f"Abre manualmente esta carpeta:\n{carpeta}")
+
+
+def iniciar_interfaz():
+    """Crea la ventana principal y arranca el bucle de Tkinter"""
+    root = Tk()
+    app = AnalizadorDiabetesApp(root)
+    root.mainloop()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Lista virtual de archivos seleccionados (Tkinter)
+=================================================
+
+Un `Listbox` con una fila por archivo se vuelve lento con miles de
+inserciones. `ListaArchivos` guarda las rutas en un índice en memoria y el
+`Listbox` solo contiene las filas visibles: al desplazarse (barra, rueda o
+teclado) se vuelven a pintar esas pocas filas, así que el coste de añadir
+100.000 archivos es el de ampliar dos listas de Python.
+
+- El filtro busca el texto en el nombre del archivo, sin distinguir
+  mayúsculas. Si el texto nuevo contiene al anterior (se sigue escribiendo)
+  solo se filtran las filas que ya coincidían; los archivos que se añaden
+  con un filtro activo se filtran al llegar.
+- El resumen (número de archivos, tamaño total y fechas de modificación) se
+  calcula por lotes de LOTE_RESUMEN archivos en el bucle de Tk, sin
+  bloquear la ventana mientras se añaden selecciones grandes.
+"""
+
+import os
+import time
+from tkinter import Frame, Label, Entry, Listbox, Scrollbar, StringVar
+
+LOTE_RESUMEN = 5000  # Archivos cuyo tamaño y fecha se leen en cada vuelta del bucle de Tk
+ESPERA_FILTRO_MS = 150  # Pausa al escribir antes de aplicar el filtro
+
+
+class ListaArchivos(Frame):
+    """Lista de archivos con desplazamiento virtual, filtro y resumen"""
+
+    def __init__(self, padre, filas=6, fuente=None, **colores):
+        super().__init__(padre, bg="white")
+        self.filas = filas
+        self.rutas = []
+        self._nombres = []  # Nombre en minúsculas de cada ruta, para filtrar
+        self._visibles = None  # Índices que coinciden con el filtro (None: todas)
+        self._texto_filtro = ""
+        self._primera = 0  # Primera fila visible de la vista
+        self._espera_filtro = None
+
+        self._resumidos = 0  # Rutas ya incluidas en el resumen
+        self._resumiendo = False
+        self._bytes = 0
+        self._fechas = (None, None)
+
+        barra_filtro = Frame(self, bg="white")
+        barra_filtro.pack(fill="x")
+        Label(barra_filtro, text="🔍", font=fuente, bg="white").pack(side="left")
+        self.filtro = StringVar()
+        Entry(barra_filtro, textvariable=self.filtro, font=fuente, relief="solid", bd=1
+              ).pack(side="left", fill="x", expand=True, padx=(2, 0))
+        self.filtro.trace_add("write", lambda *args: self._programar_filtro())
+
+        marco = Frame(self, bg="white")
+        marco.pack(fill="both", expand=True, pady=(5, 0))
+        self.barra = Scrollbar(marco, command=self._desplazar)
+        self.barra.pack(side="right", fill="y")
+        self.listbox = Listbox(marco, height=filas, width=50, font=fuente, activestyle="none", **colores)
+        self.listbox.pack(fill="both", expand=True)
+        for evento in ("<MouseWheel>", "<Button-4>", "<Button-5>", "<Up>", "<Down>", "<Prior>", "<Next>"):
+            self.listbox.bind(evento, self._rueda)
+
+        self.resumen = StringVar()
+        Label(self, textvariable=self.resumen, font=fuente, bg="white", fg="#7f8c8d", anchor="w"
+              ).pack(fill="x", pady=(2, 0))
+        self._pintar()
+
+    def __len__(self):
+        return len(self.rutas)
+
+    def agregar(self, rutas):
+        """Añade rutas al índice (sin comprobar duplicados) y repinta la vista"""
+        inicio = len(self.rutas)
+        self.rutas.extend(rutas)
+        self._nombres.extend(os.path.basename(ruta).lower() for ruta in rutas)
+        if self._visibles is not None:
+            self._visibles.extend(self._coincidencias(range(inicio, len(self.rutas)), self._texto_filtro))
+        self._pintar()
+        self._programar_resumen()
+
+    def limpiar(self):
+        """Vacía la lista y el resumen"""
+        self.rutas, self._nombres = [], []
+        self._visibles = [] if self._texto_filtro else None
+        self._primera = 0
+        self._resumidos, self._bytes, self._fechas = 0, 0, (None, None)
+        self._pintar()
+
+    # --- Vista virtual -------------------------------------------------
+
+    def _total_vista(self):
+        return len(self.rutas) if self._visibles is None else len(self._visibles)
+
+    def _pintar(self):
+        """Vuelve a llenar el Listbox con las filas visibles y ajusta la barra"""
+        total = self._total_vista()
+        self._primera = max(0, min(self._primera, total - self.filas))
+        fin = min(total, self._primera + self.filas)
+        if self._visibles is None:
+            nombres = [os.path.basename(ruta) for ruta in self.rutas[self._primera:fin]]
+        else:
+            nombres = [os.path.basename(self.rutas[i]) for i in self._visibles[self._primera:fin]]
+        self.listbox.delete(0, "end")
+        if nombres:
+            self.listbox.insert("end", *nombres)
+        if total:
+            self.barra.set(self._primera / total, fin / total)
+        else:
+            self.barra.set(0, 1)
+        self._actualizar_resumen()
+
+    def _desplazar(self, accion, cantidad, unidad=None):
+        """Comando de la barra: ("moveto", fracción) o ("scroll", n, "units"|"pages")"""
+        if accion == "moveto":
+            self._primera = int(float(cantidad) * self._total_vista())
+        elif accion == "scroll":
+            self._primera += int(cantidad) * (self.filas if unidad == "pages" else 1)
+        self._pintar()
+
+    def _rueda(self, evento):
+        teclas = {"Up": -1, "Down": 1, "Prior": -self.filas, "Next": self.filas}
+        if evento.keysym in teclas:
+            paso = teclas[evento.keysym]
+        elif evento.num == 4 or getattr(evento, "delta", 0) > 0:
+            paso = -3
+        else:
+            paso = 3
+        self._primera += paso
+        self._pintar()
+        return "break"
+
+    # --- Filtro --------------------------------------------------------
+
+    def _programar_filtro(self):
+        if self._espera_filtro is not None:
+            self.after_cancel(self._espera_filtro)
+        self._espera_filtro = self.after(ESPERA_FILTRO_MS, self._filtrar)
+
+    def _coincidencias(self, indices, texto):
+        nombres = self._nombres
+        return [i for i in indices if texto in nombres[i]]
+
+    def _filtrar(self):
+        self._espera_filtro = None
+        texto = self.filtro.get().strip().lower()
+        if not texto:
+            self._visibles = None
+        elif self._visibles is not None and self._texto_filtro in texto:
+            self._visibles = self._coincidencias(self._visibles, texto)  # Se sigue escribiendo: se acota
+        else:
+            self._visibles = self._coincidencias(range(len(self.rutas)), texto)
+        self._texto_filtro = texto
+        self._primera = 0
+        self._pintar()
+
+    # --- Resumen -------------------------------------------------------
+
+    def _programar_resumen(self):
+        if not self._resumiendo:
+            self._resumiendo = True
+            self.after_idle(self._resumir_lote)
+
+    def _resumir_lote(self):
+        """Suma el tamaño y las fechas de LOTE_RESUMEN rutas más"""
+        lote = self.rutas[self._resumidos:self._resumidos + LOTE_RESUMEN]
+        primera, ultima = self._fechas
+        for ruta in lote:
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                continue
+            self._bytes += st.st_size
+            primera = st.st_mtime if primera is None else min(primera, st.st_mtime)
+            ultima = st.st_mtime if ultima is None else max(ultima, st.st_mtime)
+        self._fechas = (primera, ultima)
+        self._resumidos += len(lote)
+        self._actualizar_resumen()
+        if self._resumidos < len(self.rutas):
+            self.after(1, self._resumir_lote)
+        else:
+            self._resumiendo = False
+
+    def _actualizar_resumen(self):
+        total = len(self.rutas)
+        if not total:
+            self.resumen.set("")
+            return
+        partes = [f"{total} archivos"]
+        if self._visibles is not None:
+            partes[0] = f"{len(self._visibles)} de {total} archivos coinciden"
+        partes.append(f"{self._bytes / 2**20:.1f} MB")
+        primera, ultima = self._fechas
+        if primera is not None:
+            formato = "%d/%m/%Y"
+            partes.append(f"modificados del {time.strftime(formato, time.localtime(primera))} "
+                          f"al {time.strftime(formato, time.localtime(ultima))}")
+        if self._resumidos < total:
+            partes.append(f"calculando... ({self._resumidos}/{total})")
+        self.resumen.set("📊 " + " · ".join(partes))
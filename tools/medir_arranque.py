@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Medición del tiempo de arranque del analizador
+==============================================
+
+Comprueba que la ventana y la línea de comandos aparecen rápido, sin esperar
+a pandas ni matplotlib (que se importan solo cuando hay análisis real):
+
+- Tiempo de importación de los módulos de entrada con `python -X importtime`,
+  con las importaciones más lentas y la lista de módulos pesados cargados.
+- Tiempo hasta la primera salida de `run` (la línea "🚀 Analizando...").
+- Tiempo hasta que la ventana de Tkinter se dibuja (si hay pantalla).
+
+Uso:
+    python medir_arranque.py                 # tabla con la mediana de 5 repeticiones
+    python medir_arranque.py --json          # resultados en JSON
+    python medir_arranque.py --limite 1.0    # código 1 si algún tiempo supera el límite
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+CARPETA_TOOLS = os.path.dirname(os.path.abspath(__file__))
+CARPETA_EJEMPLOS = os.path.join(CARPETA_TOOLS, "..", "ejemplo_datos")
+
+MODULOS_ENTRADA = ["analisis_simulaciones", "interfaz", "nucleo"]
+MODULOS_PESADOS = ["pandas", "numpy", "matplotlib", "seaborn", "pyarrow"]
+LIMITE_SEGUNDOS = 1.0
+
+CODIGO_VENTANA = """
+import tkinter, interfaz
+root = tkinter.Tk()
+interfaz.AnalizadorDiabetesApp(root)
+root.update()
+print("ventana", flush=True)
+root.destroy()
+"""
+
+
+def _entorno():
+    """Entorno de los subprocesos: sin bytecode nuevo y con tools/ en el path"""
+    entorno = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    entorno["PYTHONPATH"] = os.pathsep.join(filter(None, [CARPETA_TOOLS, entorno.get("PYTHONPATH")]))
+    return entorno
+
+
+def medir_importacion(modulo):
+    """Importa el módulo con -X importtime y devuelve el total, los más lentos y los pesados"""
+    codigo = (f"import {modulo}; import sys, json; "
+              f"print(json.dumps(sorted(m for m in {MODULOS_PESADOS!r} if m in sys.modules)))")
+    proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo],
+                             cwd=CARPETA_TOOLS, env=_entorno(), capture_output=True, text=True)
+    if proceso.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}: {proceso.stderr.strip().splitlines()[-1:]}")
+
+    # Cada línea es "import time: propio [us] | acumulado | paquete", con dos espacios
+    # de sangría por nivel; los hijos se imprimen antes que el módulo que los importa.
+    total, hijos, directos = 0, [], []
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        nivel = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        if nivel == 1:
+            hijos.append((nombre.strip(), int(acumulado)))
+        elif nivel == 0:
+            if nombre.strip() == modulo:
+                total, directos = int(acumulado), hijos
+            hijos = []
+
+    lentos = sorted(directos, key=lambda t: -t[1])[:3]
+    return {"modulo": modulo, "segundos": total / 1e6,
+            "mas_lentos": [{"modulo": nombre, "segundos": us / 1e6} for nombre, us in lentos],
+            "pesados": json.loads(proceso.stdout.strip().splitlines()[-1])}
+
+
+def _hasta_primera_linea(comando, flujo):
+    """Segundos desde que se lanza el proceso hasta su primera línea de salida"""
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(comando, cwd=CARPETA_TOOLS, env=_entorno(), text=True,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        linea = getattr(proceso, flujo).readline()
+        segundos = time.perf_counter() - inicio
+    finally:
+        proceso.kill()
+        proceso.communicate()
+    return segundos if linea else None
+
+
+def medir_primera_salida_cli():
+    """Tiempo hasta la primera línea de `run` sobre los CSV de ejemplo"""
+    comando = [sys.executable, "analisis_simulaciones.py", "run", CARPETA_EJEMPLOS, "--no-cache"]
+    return _hasta_primera_linea(comando, "stderr")
+
+
+def medir_primera_ventana():
+    """Tiempo hasta que la ventana principal se dibuja (None si no hay pantalla)"""
+    return _hasta_primera_linea([sys.executable, "-c", CODIGO_VENTANA], "stdout")
+
+
+def _mediana(valores):
+    valores = [v for v in valores if v is not None]
+    return statistics.median(valores) if valores else None
+
+
+def medir(repeticiones):
+    """Ejecuta todas las mediciones y devuelve un dict con las medianas"""
+    importaciones = []
+    for modulo in MODULOS_ENTRADA:
+        muestras = [medir_importacion(modulo) for _ in range(repeticiones)]
+        resultado = muestras[-1]
+        resultado["segundos"] = _mediana([m["segundos"] for m in muestras])
+        importaciones.append(resultado)
+
+    return {
+        "python": sys.version.split()[0],
+        "repeticiones": repeticiones,
+        "importaciones": importaciones,
+        "primera_salida_cli": _mediana([medir_primera_salida_cli() for _ in range(repeticiones)]),
+        "primera_ventana": _mediana([medir_primera_ventana() for _ in range(repeticiones)]),
+    }
+
+
+def _segundos(valor):
+    return "   n/d" if valor is None else f"{valor:6.3f}"
+
+
+def imprimir_tabla(resultados):
+    """Resumen legible de las mediciones"""
+    print(f"⏱️ Arranque (mediana de {resultados['repeticiones']} repeticiones, Python {resultados['python']})")
+    for importacion in resultados["importaciones"]:
+        pesados = ", ".join(importacion["pesados"]) or "ninguno"
+        print(f"   import {importacion['modulo']:<22} {_segundos(importacion['segundos'])} s"
+              f"   módulos pesados: {pesados}")
+        for lento in importacion["mas_lentos"]:
+            print(f"      └ {lento['modulo']:<25} {_segundos(lento['segundos'])} s")
+    print(f"   Primera salida de `run`         {_segundos(resultados['primera_salida_cli'])} s")
+    ventana = resultados["primera_ventana"]
+    print(f"   Primera ventana                 {_segundos(ventana)} s"
+          + ("   (sin pantalla)" if ventana is None else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide el tiempo de arranque del analizador")
+    parser.add_argument("-n", "--repeticiones", type=int, default=5, help="Repeticiones por medición")
+    parser.add_argument("--limite", type=float, default=LIMITE_SEGUNDOS,
+                        help="Segundos máximos hasta la primera salida o ventana")
+    parser.add_argument("--json", action="store_true", help="Salida en formato JSON")
+    args = parser.parse_args(argv)
+
+    resultados = medir(args.repeticiones)
+    if args.json:
+        print(json.dumps(resultados, ensure_ascii=False, indent=2))
+    else:
+        imprimir_tabla(resultados)
+
+    tiempos = [resultados["primera_salida_cli"], resultados["primera_ventana"]]
+    lentos = [t for t in tiempos if t is not None and t > args.limite]
+    if lentos:
+        print(f"❌ Arranque por encima de {args.limite} s", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Banco de pruebas de rendimiento del análisis
+============================================
+
+Mide cómo escala el pipeline de `nucleo.ejecutar_analisis` con exportaciones
+sintéticas (`exportaciones_sinteticas`) de 1.000, 100.000 y 10 millones de
+filas, tanto en muchos archivos de una fila como en unos pocos grandes.
+
+Cada escenario se ejecuta en un proceso nuevo y se cronometra por etapas:
+
+- importar: módulos del análisis, pandas y matplotlib
+- carga: lectura de los CSV (`ingesta.cargar_archivos`, sin caché)
+- fechas: interpretación de Fecha/Hora (`esquema.interpretar_fecha_hora`)
+- normalizar: esquema tipado completo (incluye otra vez las fechas)
+- estadisticas, perfil (tiempo en rango y AGP), grafico_tendencia, grafico_factores
+- html: escritura del informe (`nucleo.generar_informe_html`)
+
+El escenario de 10 millones usa el pipeline `--streaming` (etapa `agregar`
+en lugar de carga/fechas/normalizar), que es el que se usa con archivos
+mayores que la memoria.
+
+Las etapas se miden con `instrumentacion.Medidor`: tiempo real, tiempo de
+CPU, filas y pico de memoria del proceso (RSS) al terminarlas o, con
+--asignaciones, pico de memoria reservada por Python y NumPy durante la etapa
+(tracemalloc, que ralentiza la medición). Los resultados se guardan en JSON
+y --comparar los contrasta con una ejecución anterior para detectar
+regresiones.
+
+Uso:
+    python medir_rendimiento.py                                  # escenarios de 1k y 100k
+    python medir_rendimiento.py --escenarios 10M-grande -n 1
+    python medir_rendimiento.py --escenarios 100k-grande 100k-grande-json   # CSV frente a JSON
+    python medir_rendimiento.py --guardar base.json
+    python medir_rendimiento.py --comparar base.json             # código 1 si algo empeora
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+
+CARPETA_TOOLS = os.path.dirname(os.path.abspath(__file__))
+CARPETA_DATOS = os.path.join(tempfile.gettempdir(), "equilibrio_rendimiento")
+
+# nombre: (filas, archivos, pipeline)
+ESCENARIOS = {
+    "1k-archivos": (1_000, 1_000, "completo"),
+    "1k-grande": (1_000, 1, "completo"),
+    "100k-archivos": (100_000, 100_000, "completo"),
+    "100k-grande": (100_000, 4, "completo"),
+    "100k-archivos-json": (100_000, 100_000, "completo"),
+    "100k-grande-json": (100_000, 4, "completo"),
+    "10M-grande": (10_000_000, 10, "streaming"),
+}
+ESCENARIOS_POR_DEFECTO = ["1k-archivos", "1k-grande", "100k-archivos", "100k-grande"]
+SUFIJO_JSON = "-json"  # Mismas filas como exportaciones JSON (NDJSON en los archivos grandes)
+EXTENSIONES = (".csv", ".json", ".ndjson", ".jsonl")
+SEMILLA = 2025
+
+TOLERANCIA = 0.25  # Se avisa si una etapa tarda un 25 % más que en la referencia...
+MINIMO_SEGUNDOS = 0.05  # ...y al menos 50 ms más (las etapas muy cortas son ruido)
+
+
+def _entorno():
+    """Entorno de los subprocesos: sin bytecode nuevo y con tools/ en el path"""
+    entorno = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    entorno["PYTHONPATH"] = os.pathsep.join(filter(None, [CARPETA_TOOLS, entorno.get("PYTHONPATH")]))
+    return entorno
+
+
+def _avisar(mensaje):
+    print(mensaje, file=sys.stderr)
+
+
+def preparar_datos(nombre, carpeta_datos=CARPETA_DATOS, regenerar=False, avisar=_avisar):
+    """Carpeta con las exportaciones del escenario, generadas la primera vez
+
+    Se generan en otro proceso: en Linux el pico de RSS se hereda al lanzar un
+    hijo y falsearía la memoria de los escenarios.
+    """
+    filas, archivos, _ = ESCENARIOS[nombre]
+    carpeta = os.path.join(carpeta_datos, nombre)
+    marca = os.path.join(carpeta, ".completo")
+    if regenerar and os.path.isdir(carpeta):
+        shutil.rmtree(carpeta)
+    if not os.path.exists(marca):
+        avisar(f"🧪 Generando {nombre}: {filas} filas en {archivos} archivos...")
+        if os.path.isdir(carpeta):
+            shutil.rmtree(carpeta)  # Generación interrumpida
+        comando = [sys.executable, "exportaciones_sinteticas.py", "--filas", str(filas),
+                   "--archivos", str(archivos), "--semilla", str(SEMILLA), "--salida", carpeta,
+                   "--formato", "json" if nombre.endswith(SUFIJO_JSON) else "csv"]
+        proceso = subprocess.run(comando, cwd=CARPETA_TOOLS, env=_entorno(), capture_output=True, text=True)
+        if proceso.returncode != 0:
+            raise RuntimeError(f"No se pudieron generar los datos de {nombre}: "
+                               f"{proceso.stderr.strip().splitlines()[-1:]}")
+        with open(marca, "w") as f:
+            f.write(datetime.now().isoformat())
+    return carpeta
+
+
+def listar_csv(carpeta):
+    """Rutas de todas las exportaciones (CSV o JSON) de la carpeta y sus subcarpetas, en orden"""
+    rutas = []
+    for raiz, carpetas, nombres in os.walk(carpeta):
+        carpetas.sort()
+        rutas.extend(os.path.join(raiz, n) for n in sorted(nombres) if n.lower().endswith(EXTENSIONES))
+    return rutas
+
+
+def _medir(medidor, etapa, funcion, *args, **kwargs):
+    """Ejecuta funcion como una etapa del medidor y devuelve su resultado"""
+    with medidor.etapa(etapa, etapa):
+        return funcion(*args, **kwargs)
+
+
+def _importar():
+    import nucleo, ingesta, esquema, agregados, perfil, graficos, informe  # noqa: F401,E401
+    import matplotlib.figure  # noqa: F401
+
+
+def _grafico(tipo, datos):
+    import graficos
+    return graficos.Imagen(graficos.renderizar(tipo, datos), "png")
+
+
+def ejecutar_escenario(carpeta, pipeline, carpeta_salida, asignaciones=False):
+    """Ejecuta el pipeline por etapas sobre los CSV de carpeta (dentro del proceso hijo)"""
+    import instrumentacion
+
+    medidor = instrumentacion.Medidor(asignaciones=asignaciones)
+    _medir(medidor, "importar", _importar)
+    import nucleo, ingesta, esquema, agregados, perfil, graficos  # noqa: E401
+
+    archivos = listar_csv(carpeta)
+    if pipeline == "streaming":
+        resumen, _ = _medir(medidor, "agregar", agregados.agregar, archivos)
+        filas = resumen.filas
+        estadisticas = _medir(medidor, "estadisticas", resumen.estadisticas)
+        perfil_glucosa = resumen.perfil  # Se calcula mientras se agrega
+        df = resumen.muestra
+    else:
+        resultado = _medir(medidor, "carga", ingesta.cargar_archivos, archivos)
+        filas = resultado.filas
+        _medir(medidor, "fechas", esquema.interpretar_fecha_hora, resultado.df["Fecha"], resultado.df["Hora"])
+        df = _medir(medidor, "normalizar", esquema.normalizar, resultado.df)
+        del resultado
+        estadisticas = _medir(medidor, "estadisticas", nucleo.calcular_estadisticas, df)
+        perfil_glucosa = _medir(medidor, "perfil", perfil.calcular_perfil, df)
+
+    tendencia = _medir(medidor, "grafico_tendencia", lambda: _grafico("tendencia", graficos.datos_tendencia(df)))
+    factores = _medir(medidor, "grafico_factores", lambda: _grafico(
+        "factores", graficos.datos_factores(nucleo._valores_factores(df, nucleo._sin_aviso, estadisticas))))
+    _medir(medidor, "html", nucleo.generar_informe_html, None if pipeline == "streaming" else df,
+                     tendencia, factores, archivos, carpeta_salida, estadisticas, perfil_glucosa=perfil_glucosa)
+
+    return {"filas": filas, "archivos": len(archivos), "etapas": [e.a_dict() for e in medidor.etapas],
+            "rss_pico_mb": instrumentacion.rss_pico_mb()}
+
+
+def medir_escenario(nombre, carpeta_datos=CARPETA_DATOS, asignaciones=False):
+    """Ejecuta un escenario en un proceso nuevo y devuelve sus mediciones"""
+    _, _, pipeline = ESCENARIOS[nombre]
+    carpeta = os.path.join(carpeta_datos, nombre)
+    with tempfile.TemporaryDirectory() as salida:
+        comando = [sys.executable, os.path.abspath(__file__), "_hijo", carpeta, pipeline, salida]
+        if asignaciones:
+            comando.append("--asignaciones")
+        proceso = subprocess.run(comando, cwd=CARPETA_TOOLS, env=_entorno(), capture_output=True, text=True)
+    if proceso.returncode != 0:
+        raise RuntimeError(f"Falló el escenario {nombre}: {proceso.stderr.strip().splitlines()[-1:]}")
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def _combinar_repeticiones(muestras):
+    """Mediana de cada medida entre repeticiones (etapa a etapa)"""
+    resultado = dict(muestras[-1])
+    resultado["etapas"] = []
+    for posicion, etapa in enumerate(muestras[-1]["etapas"]):
+        combinada = {"etapa": etapa["etapa"], "memoria": etapa["memoria"]}
+        for clave in etapa:
+            if clave not in combinada:
+                valores = [m["etapas"][posicion][clave] for m in muestras if m["etapas"][posicion][clave] is not None]
+                combinada[clave] = statistics.median(valores) if valores else None
+        resultado["etapas"].append(combinada)
+    resultado["segundos"] = sum(e["segundos"] for e in resultado["etapas"])
+    picos = [m["rss_pico_mb"] for m in muestras if m["rss_pico_mb"] is not None]
+    resultado["rss_pico_mb"] = statistics.median(picos) if picos else None
+    return resultado
+
+
+def _versiones():
+    """Versiones de las bibliotecas que más influyen en los tiempos"""
+    versiones = {"python": sys.version.split()[0]}
+    for modulo in ("numpy", "pandas", "matplotlib"):
+        try:
+            versiones[modulo] = __import__(modulo).__version__
+        except ImportError:
+            versiones[modulo] = None
+    return versiones
+
+
+def medir(nombres, repeticiones=3, carpeta_datos=CARPETA_DATOS, asignaciones=False, regenerar=False):
+    """Genera los datos que falten y mide cada escenario; devuelve un dict listo para JSON"""
+    escenarios = []
+    for nombre in nombres:
+        carpeta = preparar_datos(nombre, carpeta_datos, regenerar)
+        _avisar(f"⏱️ Midiendo {nombre} ({repeticiones} repeticiones)...")
+        muestras = [medir_escenario(nombre, carpeta_datos, asignaciones) for _ in range(repeticiones)]
+        resultado = _combinar_repeticiones(muestras)
+        resultado["nombre"] = nombre
+        resultado["pipeline"] = ESCENARIOS[nombre][2]
+        resultado["bytes"] = sum(os.path.getsize(r) for r in listar_csv(carpeta))
+        escenarios.append(resultado)
+
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "maquina": {"sistema": platform.platform(), "procesador": platform.processor() or platform.machine(),
+                    "cpus": os.cpu_count()},
+        "versiones": _versiones(),
+        "repeticiones": repeticiones,
+        "asignaciones": asignaciones,
+        "escenarios": escenarios,
+    }
+
+
+def comparar(actual, referencia, tolerancia=TOLERANCIA):
+    """Lista de regresiones (textos) de actual frente a referencia, etapa a etapa"""
+    anteriores = {e["nombre"]: e for e in referencia["escenarios"]}
+    regresiones = []
+    for escenario in actual["escenarios"]:
+        anterior = anteriores.get(escenario["nombre"])
+        if anterior is None:
+            continue
+        etapas_anteriores = {e["etapa"]: e for e in anterior["etapas"]}
+        for etapa in escenario["etapas"] + [{"etapa": "total", "segundos": escenario["segundos"]}]:
+            previa = anterior if etapa["etapa"] == "total" else etapas_anteriores.get(etapa["etapa"])
+            if previa is None:
+                continue
+            antes, ahora = previa["segundos"], etapa["segundos"]
+            if ahora > antes * (1 + tolerancia) and ahora - antes > MINIMO_SEGUNDOS:
+                regresiones.append(f"{escenario['nombre']} / {etapa['etapa']}: "
+                                   f"{antes:.3f} s → {ahora:.3f} s (+{(ahora / antes - 1) * 100:.0f} %)")
+        antes, ahora = anterior.get("rss_pico_mb"), escenario.get("rss_pico_mb")
+        if antes and ahora and ahora > antes * (1 + tolerancia):
+            regresiones.append(f"{escenario['nombre']} / memoria: {antes:.0f} MB → {ahora:.0f} MB")
+    return regresiones
+
+
+def _mb(valor):
+    return "      n/d" if valor is None else f"{valor:9.0f}"
+
+
+def imprimir_tabla(resultados):
+    """Resumen legible de las mediciones"""
+    print(f"⏱️ Rendimiento (mediana de {resultados['repeticiones']} repeticiones, "
+          f"Python {resultados['versiones']['python']}, {resultados['maquina']['cpus']} CPU)")
+    memoria = "asign. MB" if resultados["asignaciones"] else "   RSS MB"
+    for escenario in resultados["escenarios"]:
+        print(f"\n   {escenario['nombre']}: {escenario['filas']} filas en {escenario['archivos']} archivos "
+              f"({escenario['bytes'] / 2**20:.1f} MB), pipeline {escenario['pipeline']}")
+        print(f"      etapa                  real s    CPU s {memoria}")
+        for etapa in escenario["etapas"]:
+            print(f"      {etapa['etapa']:<20} {etapa['segundos']:8.3f} {etapa['cpu']:8.3f} {_mb(etapa['pico_mb'])}")
+        print(f"      {'total':<20} {escenario['segundos']:8.3f}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["_hijo"]:
+        # Proceso hijo de medir_escenario: mide y escribe el resultado en JSON
+        carpeta, pipeline, salida = argv[1:4]
+        print(json.dumps(ejecutar_escenario(carpeta, pipeline, salida, "--asignaciones" in argv)))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Mide el rendimiento del análisis por etapas")
+    parser.add_argument("--escenarios", nargs="+", default=ESCENARIOS_POR_DEFECTO,
+                        choices=list(ESCENARIOS) + ["todos"], help="Escenarios a medir")
+    parser.add_argument("-n", "--repeticiones", type=int, default=3, help="Repeticiones por escenario")
+    parser.add_argument("--datos", default=CARPETA_DATOS, help="Carpeta de los datos sintéticos generados")
+    parser.add_argument("--regenerar", action="store_true", help="Vuelve a generar los datos sintéticos")
+    parser.add_argument("--asignaciones", action="store_true",
+                        help="Mide también el pico de memoria reservada por etapa (más lento)")
+    parser.add_argument("--guardar", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="Resultados JSON anteriores con los que comparar")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA,
+                        help="Aumento relativo a partir del cual se considera regresión")
+    parser.add_argument("--json", action="store_true", help="Salida en formato JSON")
+    args = parser.parse_args(argv)
+
+    nombres = list(ESCENARIOS) if "todos" in args.escenarios else args.escenarios
+    try:
+        resultados = medir(nombres, args.repeticiones, args.datos, args.asignaciones, args.regenerar)
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps(resultados, ensure_ascii=False, indent=2))
+    else:
+        imprimir_tabla(resultados)
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"💾 Resultados guardados en {os.path.abspath(args.guardar)}", file=sys.stderr)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regresiones = comparar(resultados, json.load(f), args.tolerancia)
+        if regresiones:
+            print(f"❌ {len(regresiones)} regresiones frente a {args.comparar}:", file=sys.stderr)
+            for regresion in regresiones:
+                print(f"   {regresion}", file=sys.stderr)
+            return 1
+        print(f"✅ Sin regresiones frente a {args.comparar}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Modelo de glucosa vectorizado (port de `simulateGlucose` en js/script.js)
+=========================================================================
+
+Evalúa exactamente el mismo modelo que la app web sobre arrays de NumPy:
+
+    glucosa = 90 + 1.2·hidratos - min(0.8·caminata, 30) + ajuste_sueño
+    ajuste_sueño = (7 - sueño)·2.5            si sueño < 7
+                 = max(-5, (sueño - 8)·-0.7)  si sueño > 8
+                 = 0                          en otro caso
+    glucosa se limita a [70, 200]
+
+Las operaciones se hacen en float64 y en el mismo orden que en JavaScript, y
+el redondeo reproduce `Math.round` (empates hacia +∞) y `toFixed(1)` (valor
+decimal exacto del double, empates alejándose de cero), así que los valores
+redondeados coinciden bit a bit con los que exporta la app.
+
+Permite generar cohortes sintéticas y tablas "¿qué pasaría si...?" sin
+mover los deslizadores.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pandas as pd
+
+GLUCOSA_BASE = 90
+FACTOR_HIDRATOS = 1.2
+FACTOR_CAMINATA = 0.8
+MAX_DESCUENTO_CAMINATA = 30
+GLUCOSA_MIN = 70
+GLUCOSA_MAX = 200
+
+# Rangos de los deslizadores de index.html
+RANGO_HIDRATOS = (0, 100)
+RANGO_CAMINATA = (0, 60)
+RANGO_SUEÑO = (4, 12)
+
+TAMANO_TRAMO = 1 << 16  # Elementos por tramo: mantiene los temporales en caché
+
+
+def redondear_js(x):
+    """Math.round de JavaScript: entero más cercano, empates hacia +∞"""
+    x = np.asarray(x, dtype=np.float64)
+    base = np.floor(x)
+    return base + (x - base >= 0.5)
+
+
+def _decimas_exactas(valor):
+    """toFixed(1) sobre el valor exacto del double, como entero de décimas"""
+    decimas = (abs(Decimal(valor)) * 10).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    return -int(decimas) if valor < 0 else int(decimas)
+
+
+def redondear_decimas_js(x):
+    """Valor numérico de `x.toFixed(1)` de JavaScript
+
+    El redondeo rápido de x·10 puede equivocarse cerca de los empates (x·10
+    redondea en binario), así que esos pocos valores se resuelven con Decimal
+    sobre su representación exacta.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    escalado = x * 10
+    decimas = np.sign(escalado) * np.floor(np.abs(escalado) + 0.5)
+    fraccion = np.abs(escalado) - np.floor(np.abs(escalado))
+    dudosos = np.abs(fraccion - 0.5) < 1e-6
+    if dudosos.any():
+        valores = np.unique(x[dudosos])
+        exactas = np.array([_decimas_exactas(float(v)) for v in valores], dtype=np.float64)
+        decimas[dudosos] = exactas[np.searchsorted(valores, x[dudosos])]
+    return decimas / 10
+
+
+def ajuste_sueño(sueño):
+    """Ajuste de glucosa por horas de sueño (sin redondear)"""
+    sueño = np.asarray(sueño, dtype=np.float64)
+    poco = (7 - sueño) * 2.5
+    mucho = np.maximum(-5, (sueño - 8) * -0.7)
+    return np.where(sueño < 7, poco, np.where(sueño > 8, mucho, 0.0))
+
+
+def _simular_tramo(hidratos, caminata, sueño):
+    """Evalúa el modelo sobre un tramo de arrays float64"""
+    incremento = hidratos * FACTOR_HIDRATOS
+    descuento = np.minimum(caminata * FACTOR_CAMINATA, MAX_DESCUENTO_CAMINATA)
+    ajuste = ajuste_sueño(sueño)
+
+    # Mismo orden de operaciones que en JS: ((90 + hc) - caminar) + sueño
+    glucosa = GLUCOSA_BASE + incremento
+    glucosa -= descuento
+    glucosa += ajuste
+    np.clip(glucosa, GLUCOSA_MIN, GLUCOSA_MAX, out=glucosa)
+    return glucosa, incremento, descuento, ajuste
+
+
+def simular_glucosa(hidratos, caminata, sueño, exacto=False):
+    """Evalúa simulateGlucose sobre arrays (o escalares) de hidratos, caminata y sueño
+
+    Devuelve un dict de arrays:
+    - glucosa: Math.round(glucosa) (int16)
+    - efecto_hc: +Math.round(1.2·hidratos) (int16)
+    - efecto_caminar: -Math.round(min(0.8·caminata, 30)), con el signo del CSV (int16)
+    - efecto_sueño: ajuste de sueño con toFixed(1) (float64)
+    Con exacto=True se añaden los valores sin redondear (*_exacto).
+    """
+    hidratos, caminata, sueño = np.broadcast_arrays(
+        np.asarray(hidratos, dtype=np.float64),
+        np.asarray(caminata, dtype=np.float64),
+        np.asarray(sueño, dtype=np.float64))
+    forma = hidratos.shape
+    hidratos, caminata, sueño = hidratos.ravel(), caminata.ravel(), sueño.ravel()
+    n = hidratos.size
+
+    resultado = {
+        "glucosa": np.empty(n, dtype=np.int16),
+        "efecto_hc": np.empty(n, dtype=np.int16),
+        "efecto_caminar": np.empty(n, dtype=np.int16),
+        "efecto_sueño": np.empty(n, dtype=np.float64),
+    }
+    if exacto:
+        for clave in ("glucosa_exacto", "efecto_hc_exacto", "efecto_caminar_exacto", "efecto_sueño_exacto"):
+            resultado[clave] = np.empty(n, dtype=np.float64)
+
+    for inicio in range(0, n, TAMANO_TRAMO):
+        tramo = slice(inicio, min(inicio + TAMANO_TRAMO, n))
+        glucosa, incremento, descuento, ajuste = _simular_tramo(
+            hidratos[tramo], caminata[tramo], sueño[tramo])
+        resultado["glucosa"][tramo] = redondear_js(glucosa)
+        resultado["efecto_hc"][tramo] = redondear_js(incremento)
+        resultado["efecto_caminar"][tramo] = -redondear_js(descuento)
+        resultado["efecto_sueño"][tramo] = redondear_decimas_js(ajuste)
+        if exacto:
+            resultado["glucosa_exacto"][tramo] = glucosa
+            resultado["efecto_hc_exacto"][tramo] = incremento
+            resultado["efecto_caminar_exacto"][tramo] = -descuento
+            resultado["efecto_sueño_exacto"][tramo] = ajuste
+
+    return {clave: valores.reshape(forma) for clave, valores in resultado.items()}
+
+
+def textos_efecto_sueño(sueño):
+    """Texto de la columna "Efecto Sueño" del CSV (sleepText en JS)"""
+    sueño = np.asarray(sueño, dtype=np.float64).ravel()
+    valores, inversa = np.unique(sueño, return_inverse=True)
+    ajustes = redondear_decimas_js(ajuste_sueño(valores))
+    textos = []
+    for s, ajuste in zip(valores, ajustes):
+        if s < 7:
+            textos.append(f"+{ajuste:.1f} por <7h sueño")
+        elif s > 8:
+            textos.append(f"{ajuste:.1f} por >8h sueño")
+        else:
+            textos.append("0 por sueño óptimo")
+    return np.array(textos, dtype=object)[inversa]
+
+
+def formatear_momentos(momentos):
+    """Textos de Fecha y Hora como los escribe la app en es-ES ("1/11/2025", "08:30")
+
+    toLocaleDateString('es-ES') no rellena el día ni el mes con ceros y la
+    hora va con dos dígitos. Cada día y cada minuto del día distinto se
+    formatea una sola vez.
+    """
+    momentos = pd.DatetimeIndex(momentos)
+    codigos_dia, dias = pd.factorize(momentos.normalize())
+    codigos_hora, minutos = pd.factorize((momentos.hour * 60 + momentos.minute).to_numpy())
+    textos_dia = np.array([f"{d.day}/{d.month}/{d.year}" for d in dias], dtype=object)
+    textos_hora = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in minutos], dtype=object)
+    return textos_dia[codigos_dia], textos_hora[codigos_hora]
+
+
+def simular_exportaciones(hidratos, caminata, sueño, momentos):
+    """DataFrame con el esquema de `exportToCSV` para cada escenario
+
+    momentos es un array datetime64 (o algo convertible) con la fecha/hora de
+    cada simulación, que se formatea como en es-ES ("1/11/2025", "08:30").
+    """
+    hidratos = np.asarray(hidratos)
+    caminata = np.asarray(caminata)
+    sueño = np.asarray(sueño)
+    resultado = simular_glucosa(hidratos, caminata, sueño)
+    fechas, horas = formatear_momentos(momentos)
+
+    return pd.DataFrame({
+        "Fecha": fechas,
+        "Hora": horas,
+        "Hidratos (g)": hidratos,
+        "Caminata (min)": caminata,
+        "Sueño (h)": sueño,
+        "Glucosa (mg/dL)": resultado["glucosa"],
+        "Efecto HC": np.char.add("+", resultado["efecto_hc"].astype(str)),
+        "Efecto Caminar": np.char.add("-", np.abs(resultado["efecto_caminar"]).astype(str)),
+        "Efecto Sueño": textos_efecto_sueño(sueño),
+    })
+
+
+def generar_cohorte(n, semilla=None):
+    """Posiciones aleatorias de los deslizadores (enteros, como en la app)"""
+    rng = np.random.default_rng(semilla)
+    return (rng.integers(RANGO_HIDRATOS[0], RANGO_HIDRATOS[1] + 1, n),
+            rng.integers(RANGO_CAMINATA[0], RANGO_CAMINATA[1] + 1, n),
+            rng.integers(RANGO_SUEÑO[0], RANGO_SUEÑO[1] + 1, n))
+
+
+def tabla_que_pasaria(hidratos=None, caminata=None, sueño=None):
+    """Tabla con todas las combinaciones de los valores indicados
+
+    Por defecto recorre todas las posiciones enteras de los deslizadores.
+    """
+    hidratos = np.arange(RANGO_HIDRATOS[0], RANGO_HIDRATOS[1] + 1) if hidratos is None else np.asarray(hidratos)
+    caminata = np.arange(RANGO_CAMINATA[0], RANGO_CAMINATA[1] + 1) if caminata is None else np.asarray(caminata)
+    sueño = np.arange(RANGO_SUEÑO[0], RANGO_SUEÑO[1] + 1) if sueño is None else np.asarray(sueño)
+
+    hc, cam, su = (eje.ravel() for eje in np.meshgrid(hidratos, caminata, sueño, indexing="ij"))
+    resultado = simular_glucosa(hc, cam, su)
+    return pd.DataFrame({
+        "Hidratos (g)": hc,
+        "Caminata (min)": cam,
+        "Sueño (h)": su,
+        "Glucosa (mg/dL)": resultado["glucosa"],
+        "Efecto HC": resultado["efecto_hc"],
+        "Efecto Caminar": resultado["efecto_caminar"],
+        "Efecto Sueño": resultado["efecto_sueño"],
+    })
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Núcleo de análisis de simulaciones diabéticas
+=============================================
+
+Lógica de análisis separada de la interfaz gráfica: carga de los CSV
+exportados por la app web, gráficos de tendencia y factores, e informe HTML.
+No importa Tkinter, así que la usan tanto la ventana de escritorio como la
+línea de comandos en equipos sin pantalla.
+
+Los avisos de progreso se comunican mediante callbacks opcionales:
+- avisar(mensaje): mensajes de estado para el usuario
+- progreso(porcentaje, mensaje): avance de las etapas del análisis
+
+Cada etapa se mide con un `instrumentacion.Medidor` (tiempo real y de CPU,
+filas, memoria), que también calcula el porcentaje de progreso a partir del
+trabajo hecho: la carga avanza con cada lote de archivos leído.
+"""
+
+import os
+import html
+import tempfile
+from datetime import datetime
+
+import instrumentacion
+
+# ingesta, cache_ingesta, agregados, perfil, esquema y graficos arrastran pandas y
+# matplotlib (~1 s): se importan dentro de las funciones que los usan, así la
+# ventana y la línea de comandos arrancan sin esperar a que carguen.
+
+# Paleta compartida por la interfaz, los gráficos y el informe
+BG_COLOR = "#f0f8ff"  # Azul claro muy suave
+BTN_COLOR = "#2980b9"  # Azul profesional
+BTN_HOVER = "#1c5980"  # Azul más oscuro para hover
+SUCCESS_COLOR = "#2ecc71"  # Verde éxito
+WARNING_COLOR = "#f39c12"  # Naranja advertencia
+DANGER_COLOR = "#e74c3c"  # Rojo peligro
+TEXT_COLOR = "#2c3e50"    # Azul oscuro texto
+
+CARPETA_INFORMES = "Informes Diabetes"
+
+# Porcentaje de la barra al terminar cada etapa (la carga domina el tiempo)
+PLAN_ANALISIS = {"carga": 60, "normalizar": 65, "estadisticas": 66, "perfil": 67, "grafico_tendencia": 82,
+                 "grafico_factores": 90, "graficos": 90, "datos_graficos": 90, "informe": 100}
+PLAN_STREAMING = dict(PLAN_ANALISIS, agregar=66)
+
+MENSAJE_CARGA = "📊 Cargando datos de los archivos CSV..."
+MENSAJE_GRAFICOS = "📈 Generando gráficos de tendencia y factores..."
+MENSAJE_INFORME = "📝 Creando informe interactivo..."
+
+
+class SinDatosError(Exception):
+    """Ningún archivo seleccionado contenía datos válidos"""
+
+
+def _sin_aviso(*args):
+    """Callback por defecto: descarta los avisos"""
+
+
+def precargar():
+    """Importa los módulos pesados del análisis (para hacerlo en segundo plano)"""
+    import ingesta, cache_ingesta, agregados, perfil, esquema, graficos  # noqa: F401,E401
+    import matplotlib.figure  # noqa: F401
+
+
+def cargar_datos(archivos, avisar=None, avance=None, usar_cache=True, carpeta_cache=None, medidor=None):
+    """Carga y combina todos los archivos CSV indicados, con el esquema tipado de `esquema`
+
+    Con medidor se registran las etapas "carga" y "normalizar" y el tiempo de
+    cada archivo leído; el avance de la carga mueve su barra de progreso.
+    """
+    import ingesta
+    import cache_ingesta
+    import esquema
+    import compacto
+
+    avisar = avisar or _sin_aviso
+    medidor = medidor or instrumentacion.Medidor()
+    avance = avance or medidor.avance
+    resultado = None
+    compactos = [ruta for ruta in archivos if ruta.lower().endswith(compacto.EXTENSION)]
+    if compactos:
+        archivos = [ruta for ruta in archivos if not ruta.lower().endswith(compacto.EXTENSION)]
+        return _cargar_con_compactos(archivos, compactos, avisar, avance, usar_cache, carpeta_cache, medidor)
+
+    with medidor.etapa("carga", MENSAJE_CARGA) as etapa:
+        if usar_cache:
+            try:
+                cache = cache_ingesta.CacheIngesta(carpeta_cache or obtener_carpeta_informes())
+                resultado = cache.cargar(archivos, avisar, avance)
+                ultima = cache.estadisticas["ultima_ejecucion"]
+                avisar(f"💾 Caché: {ultima['aciertos']} archivos reutilizados, {ultima['fallos']} leídos")
+            except Exception as e:
+                avisar(f"⚠️ Caché no disponible, se leen todos los archivos: {e}")
+
+        if resultado is None:
+            resultado = ingesta.cargar_archivos(archivos, avance=avance)
+        etapa.filas = resultado.filas
+        medidor.registrar_archivos(resultado.tiempos)
+
+    for ruta, error in resultado.errores:
+        avisar(f"⚠️ Error al cargar {os.path.basename(ruta)}: {error}")
+
+    if resultado.df.empty:
+        raise SinDatosError("No se pudieron cargar datos válidos de ningún archivo")
+
+    avisar(f"✅ Cargados {resultado.archivos_leidos} archivos ({resultado.filas} simulaciones)")
+    with medidor.etapa("normalizar", "🧮 Interpretando fechas y tipos de columna...") as etapa:
+        etapa.filas = resultado.filas
+        return esquema.normalizar(resultado.df, avisar)
+
+
+def _cargar_con_compactos(archivos, compactos, avisar, avance, usar_cache, carpeta_cache, medidor):
+    """cargar_datos con archivos compactos (`compacto`): se mapean y se unen al resto ya normalizado"""
+    import pandas as pd
+    import compacto
+
+    with medidor.etapa("compacto", "🗜️ Leyendo archivos compactos...") as etapa:
+        try:
+            df = compacto.leer(compactos)
+        except (OSError, compacto.ArchivoCompactoError) as e:
+            raise SinDatosError(f"No se pudo leer el archivo compacto: {e}")
+        etapa.filas = len(df)
+    avisar(f"✅ Leídas {len(df)} simulaciones de {len(compactos)} archivos compactos")
+    if not archivos:
+        if df.empty:
+            raise SinDatosError("Los archivos compactos no tienen simulaciones")
+        return df
+    try:
+        resto = cargar_datos(archivos, avisar, avance, usar_cache, carpeta_cache, medidor)
+    except SinDatosError:
+        if df.empty:
+            raise
+        return df
+    df = pd.concat([df, resto], ignore_index=True)
+    df["archivo_origen"] = df["archivo_origen"].astype("category")
+    return df
+
+
+def cargar_almacen(ruta=None, desde=None, hasta=None, fuentes=None, avisar=None, medidor=None):
+    """Consulta el almacén SQLite (ver `almacen`): (DataFrame normalizado, rutas de origen)
+
+    desde/hasta acotan las fechas ([desde, hasta)) y fuentes las carpetas o
+    archivos; solo se leen las filas pedidas gracias a los índices.
+    """
+    import almacen
+
+    avisar = avisar or _sin_aviso
+    medidor = medidor or instrumentacion.Medidor()
+    medidor.usar_plan(PLAN_ANALISIS)
+    with medidor.etapa("carga", "🗄️ Consultando el almacén de simulaciones...") as etapa:
+        with almacen.Almacen(ruta) as base:
+            df, rutas = base.consultar(desde, hasta, fuentes)
+        etapa.filas = len(df)
+    if df.empty:
+        raise SinDatosError("El almacén no tiene simulaciones en el intervalo y las fuentes indicadas")
+    avisar(f"✅ Leídas {len(df)} simulaciones de {len(rutas)} archivos del almacén")
+    return df, rutas
+
+
+def calcular_estadisticas(df):
+    """Medias de las columnas del informe (None si la columna no existe)"""
+    import agregados
+
+    estadisticas = {"simulaciones": len(df)}
+    for columna, clave in agregados.COLUMNAS_RESUMEN.items():
+        estadisticas[clave] = df[columna].mean() if columna in df.columns else None
+    return estadisticas
+
+
+def _valor_o_defecto(estadisticas, clave, defecto):
+    """Valor de las estadísticas o el valor por defecto si la columna faltaba"""
+    valor = estadisticas.get(clave)
+    return defecto if valor is None else valor
+
+
+def _imagen_tendencia(df, formato='png', puntos=None):
+    """Dibuja el gráfico de tendencia y devuelve un graficos.Imagen"""
+    import graficos
+
+    puntos = graficos.PUNTOS_TENDENCIA if puntos is None else puntos
+    datos = graficos.datos_tendencia(df, puntos)
+    return graficos.Imagen(graficos.renderizar('tendencia', datos, formato), formato)
+
+
+def _grafico_tendencia_respaldo(df, avisar, formato='png', puntos=None):
+    """Gráfico de tendencia o, si también falla, una figura en blanco"""
+    import graficos
+
+    try:
+        return _imagen_tendencia(df, formato, puntos)
+    except Exception as e:
+        avisar(f"❌ Error en gráfico de tendencia: {e}")
+        return graficos.Imagen(graficos.renderizar('tendencia', None, formato), formato)
+
+
+def generar_grafico_tendencia(df):
+    """Genera gráfico de tendencia de glucosa"""
+    return _imagen_tendencia(df).a_data_uri()
+
+
+def _valores_factores(df, avisar, estadisticas):
+    """Medias de hidratos, caminata y sueño, con valores por defecto si falta la columna"""
+    if estadisticas is None:
+        estadisticas = calcular_estadisticas(df)
+
+    hc_valor = _valor_o_defecto(estadisticas, 'hidratos', 50)
+    if estadisticas.get('hidratos') is None:
+        avisar("⚠️ Usando valor por defecto para Hidratos")
+
+    caminata_valor = _valor_o_defecto(estadisticas, 'caminata', 20)
+    if estadisticas.get('caminata') is None:
+        avisar("⚠️ Usando valor por defecto para Caminata")
+
+    sueño_valor = _valor_o_defecto(estadisticas, 'sueño', 7)
+    if estadisticas.get('sueño') is None:
+        avisar("⚠️ Usando valor por defecto para Sueño")
+
+    return [hc_valor, caminata_valor, sueño_valor]
+
+
+def _grafico_factores_ejemplo(error, avisar, formato='png'):
+    """Gráfico de respaldo con datos de ejemplo"""
+    import graficos
+
+    avisar(f"❌ Error en gráfico de factores: {error}")
+    datos = graficos.datos_factores(graficos.VALORES_EJEMPLO, ejemplo=True)
+    return graficos.Imagen(graficos.renderizar('factores', datos, formato), formato)
+
+
+def generar_grafico_factores(df, avisar=None, estadisticas=None):
+    """Genera gráfico de barras de factores - VERSIÓN CORREGIDA"""
+    import graficos
+
+    avisar = avisar or _sin_aviso
+    try:
+        datos = graficos.datos_factores(_valores_factores(df, avisar, estadisticas))
+        return graficos.a_data_uri(graficos.renderizar('factores', datos))
+    except Exception as e:
+        return _grafico_factores_ejemplo(e, avisar).a_data_uri()
+
+
+def _graficos_por_separado(df, datos_factores, puntos, formato, medidor):
+    """Dibuja la tendencia y los factores uno tras otro, cada uno como una etapa"""
+    import graficos
+
+    with medidor.etapa("grafico_tendencia", "📈 Generando gráfico de tendencia...") as etapa:
+        etapa.filas = len(df)
+        tendencia = graficos.renderizar('tendencia', graficos.datos_tendencia(df, puntos), formato)
+    with medidor.etapa("grafico_factores", "📊 Generando gráfico de factores..."):
+        factores = graficos.renderizar('factores', datos_factores, formato)
+    return tendencia, factores
+
+
+def generar_graficos(df, avisar=None, estadisticas=None, pool=None, formato='png',
+                     puntos_tendencia=None, medidor=None):
+    """Genera los dos gráficos del informe, en paralelo si se pasa un pool de procesos
+
+    Devuelve dos graficos.Imagen (tendencia, factores) en el formato pedido
+    (png, svg o webp). df puede ser la muestra acotada del modo streaming; las
+    medias de los factores se toman de estadisticas si se indican. La tendencia
+    se reduce a puntos_tendencia puntos (graficos.PUNTOS_TENDENCIA por defecto).
+    Con medidor cada gráfico es una etapa (una sola, "graficos", si van en paralelo).
+    """
+    import graficos
+
+    avisar = avisar or _sin_aviso
+    medidor = medidor or instrumentacion.Medidor()
+    puntos = graficos.PUNTOS_TENDENCIA if puntos_tendencia is None else puntos_tendencia
+    try:
+        datos_factores = graficos.datos_factores(_valores_factores(df, avisar, estadisticas))
+        if pool is None:
+            tendencia, factores = _graficos_por_separado(df, datos_factores, puntos, formato, medidor)
+        else:
+            with medidor.etapa("graficos", MENSAJE_GRAFICOS) as etapa:
+                etapa.filas = len(df)
+                trabajos = [('tendencia', graficos.datos_tendencia(df, puntos)), ('factores', datos_factores)]
+                tendencia, factores = graficos.renderizar_varios(trabajos, pool, formato)
+    except Exception as e:
+        with medidor.etapa("graficos", MENSAJE_GRAFICOS):
+            return (_grafico_tendencia_respaldo(df, avisar, formato, puntos),
+                    _grafico_factores_ejemplo(e, avisar, formato))
+    return graficos.Imagen(tendencia, formato), graficos.Imagen(factores, formato)
+
+
+def preparar_graficos(df, avisar=None, estadisticas=None, pool=None, formato='png',
+                      puntos_tendencia=None, modo_informe=None, medidor=None):
+    """Gráficos para generar_informe_html según el modo del informe
+
+    En modo interactivo no se dibuja nada: se devuelven los datos de la
+    tendencia y de los factores que el navegador dibuja (informe.datos_interactivos).
+    """
+    import informe
+    import graficos
+
+    if modo_informe != informe.MODO_INTERACTIVO:
+        return generar_graficos(df, avisar, estadisticas, pool, formato, puntos_tendencia, medidor)
+
+    avisar = avisar or _sin_aviso
+    medidor = medidor or instrumentacion.Medidor()
+    puntos = graficos.PUNTOS_INTERACTIVO if puntos_tendencia is None else puntos_tendencia
+    with medidor.etapa("datos_graficos", "📈 Preparando los datos de los gráficos...") as etapa:
+        etapa.filas = len(df)
+        try:
+            factores = graficos.datos_factores(_valores_factores(df, avisar, estadisticas))
+        except Exception as e:
+            avisar(f"❌ Error en gráfico de factores: {e}")
+            factores = graficos.datos_factores(graficos.VALORES_EJEMPLO, ejemplo=True)
+        return graficos.datos_tendencia(df, puntos), factores
+
+
+def obtener_carpeta_informes():
+    """Carpeta por defecto de los informes (Documentos/Informes Diabetes)"""
+    try:
+        documentos = os.path.expanduser("~/Documents")
+        carpeta_app = os.path.join(documentos, CARPETA_INFORMES)
+        os.makedirs(carpeta_app, exist_ok=True)
+        return carpeta_app
+    except:
+        # Carpeta temporal como fallback
+        return tempfile.gettempdir()
+
+
+def obtener_ruta_segura(nombre_archivo, carpeta=None):
+    """Obtiene una ruta segura para guardar archivos en Windows"""
+    if carpeta:
+        try:
+            os.makedirs(carpeta, exist_ok=True)
+            return os.path.join(carpeta, nombre_archivo)
+        except:
+            pass
+    return os.path.join(obtener_carpeta_informes(), nombre_archivo)
+
+
+def generar_informe_html(df, grafico_tendencia, grafico_factores, archivos, carpeta_salida=None,
+                         estadisticas=None, modo=None, diagnostico=None, nombre_archivo=None,
+                         perfil_glucosa=None, archivo=None):
+    """Genera el informe HTML con los resultados
+
+    En modo streaming df es None y las medias llegan ya calculadas en estadisticas.
+    Los gráficos son graficos.Imagen o data URI; modo es informe.MODO_AUTONOMO
+    (por defecto, un solo archivo), informe.MODO_CARPETA (gráficos al lado) o
+    informe.MODO_INTERACTIVO (con los datos de preparar_graficos). Con
+    diagnostico (un instrumentacion.Medidor) se añade la sección de tiempos.
+    nombre_archivo fija el nombre del HTML (por defecto lleva la fecha y hora).
+    Con perfil_glucosa (perfil.PerfilGlucosa) se añaden el tiempo en rango,
+    el perfil por hora (AGP) y los resúmenes por día y por origen. Con
+    archivo (de texto, por ejemplo io.StringIO) el informe se escribe en él,
+    sin tocar el disco, y se devuelve archivo.
+    """
+    import informe
+    import recomendaciones
+
+    modo = modo or informe.MODO_AUTONOMO
+    # Calcular estadísticas
+    if estadisticas is None:
+        estadisticas = calcular_estadisticas(df)
+    glucosa_promedio = _valor_o_defecto(estadisticas, 'glucosa', 95)
+    hc_promedio = _valor_o_defecto(estadisticas, 'hidratos', 50)
+    caminata_promedio = _valor_o_defecto(estadisticas, 'caminata', 20)
+    sueño_promedio = _valor_o_defecto(estadisticas, 'sueño', 7)
+
+    # Determinar estado
+    if glucosa_promedio > 140:
+        estado = "⚠️ ALTO - Requiere atención"
+        color_estado = DANGER_COLOR
+        color_glucosa = DANGER_COLOR
+    elif glucosa_promedio < 80:
+        estado = "⚠️ BAJO - Riesgo de hipoglucemia"
+        color_estado = WARNING_COLOR
+        color_glucosa = WARNING_COLOR
+    else:
+        estado = "✅ ÓPTIMO - Buen control"
+        color_estado = SUCCESS_COLOR
+        color_glucosa = SUCCESS_COLOR
+
+    # Recomendaciones: tabla de reglas evaluada con las medias del informe
+    recomendaciones_informe = recomendaciones.para_medias({
+        "glucosa": glucosa_promedio, "hidratos": hc_promedio,
+        "caminata": caminata_promedio, "sueño": sueño_promedio})
+
+    # Nombre del informe
+    nombre_archivo = nombre_archivo or f"informe_diabetes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+    ruta_informe = None if archivo is not None else obtener_ruta_segura(nombre_archivo, carpeta_salida)
+
+    valores = {
+        "fecha": datetime.now().strftime("%d de %B de %Y a las %H:%M"),
+        "archivos": len(archivos),
+        "origen": html.escape(os.path.basename(os.path.dirname(archivos[0]))) if archivos else 'Ejemplo automático',
+        "simulaciones": estadisticas['simulaciones'],
+        "glucosa_promedio": glucosa_promedio,
+        "hc_promedio": hc_promedio,
+        "caminata_promedio": caminata_promedio,
+        "sueño_promedio": sueño_promedio,
+        "color_glucosa": color_glucosa,
+        "color_estado": color_estado,
+        "estado": estado,
+        "recomendaciones": ''.join(f'<li>{regla.html}</li>' for regla in recomendaciones_informe),
+        "perfil": informe.seccion_perfil(perfil_glucosa),
+        "diagnostico": informe.seccion_diagnostico(diagnostico.a_dict()) if diagnostico else "",
+    }
+    graficos_informe = {
+        "grafico_tendencia": (grafico_tendencia, "Gráfico de tendencia"),
+        "grafico_factores": (grafico_factores, "Gráfico de factores"),
+    }
+
+    # Guardar el archivo (escrito por partes desde la plantilla compilada)
+    if archivo is not None:
+        return informe.guardar(None, valores, graficos_informe, modo, archivo)
+    try:
+        return informe.guardar(ruta_informe, valores, graficos_informe, modo)
+    except Exception as e:
+        # Intentar en carpeta temporal
+        ruta_temp = os.path.join(tempfile.gettempdir(), nombre_archivo)
+        return informe.guardar(ruta_temp, valores, graficos_informe, modo)
+
+
+def ejecutar_analisis(archivos, carpeta_salida=None, avisar=None, progreso=None,
+                      usar_cache=True, carpeta_cache=None, pool_graficos=None,
+                      modo_informe=None, formato_graficos='png', puntos_tendencia=None,
+                      medidor=None, diagnostico=False, df=None):
+    """Ejecuta el pipeline completo y devuelve la ruta del informe generado
+
+    Con pool_graficos (graficos.crear_pool) los dos gráficos se dibujan en paralelo.
+    modo_informe y formato_graficos eligen la salida (ver `informe` y `graficos`).
+    puntos_tendencia es el presupuesto de puntos del gráfico de tendencia.
+    medidor (instrumentacion.Medidor) recoge los tiempos de cada etapa; si se
+    pasa, el progreso se notifica a su callback. Con diagnostico=True el
+    informe incluye la sección de tiempos. Con df (ya normalizado, por
+    ejemplo de `cargar_almacen`) no se leen los archivos.
+    """
+    import perfil
+
+    medidor = medidor or instrumentacion.Medidor(progreso)
+    medidor.usar_plan(PLAN_ANALISIS)
+
+    if df is None:
+        df = cargar_datos(archivos, avisar, usar_cache=usar_cache, carpeta_cache=carpeta_cache, medidor=medidor)
+    with medidor.etapa("estadisticas", "🧮 Calculando medias...") as etapa:
+        etapa.filas = len(df)
+        estadisticas = calcular_estadisticas(df)
+    with medidor.etapa("perfil", "🎯 Calculando tiempo en rango y perfil por hora...") as etapa:
+        etapa.filas = len(df)
+        perfil_glucosa = perfil.calcular_perfil(df)
+
+    grafico_tendencia, grafico_factores = preparar_graficos(df, avisar, estadisticas, pool_graficos,
+                                                            formato_graficos, puntos_tendencia,
+                                                            modo_informe, medidor)
+
+    with medidor.etapa("informe", MENSAJE_INFORME):
+        ruta_informe = generar_informe_html(df, grafico_tendencia, grafico_factores, archivos,
+                                            carpeta_salida, estadisticas, modo_informe,
+                                            medidor if diagnostico else None,
+                                            perfil_glucosa=perfil_glucosa)
+
+    medidor.progreso(100, "✅ Informe generado")
+    return ruta_informe
+
+
+def ejecutar_analisis_streaming(archivos, carpeta_salida=None, avisar=None, progreso=None,
+                                filas_por_bloque=None, pool_graficos=None,
+                                modo_informe=None, formato_graficos='png', puntos_tendencia=None,
+                                medidor=None, diagnostico=False):
+    """Pipeline con memoria acotada: agrega por bloques sin concatenar todas las filas"""
+    import agregados
+
+    filas_por_bloque = filas_por_bloque or agregados.FILAS_POR_BLOQUE
+    avisar = avisar or _sin_aviso
+    medidor = medidor or instrumentacion.Medidor(progreso)
+    medidor.usar_plan(PLAN_STREAMING)
+
+    with medidor.etapa("agregar", "📊 Agregando datos por bloques...") as etapa:
+        resumen, errores = agregados.agregar(archivos, filas_por_bloque, avance=medidor.avance)
+        etapa.filas = resumen.filas
+    for ruta, error in errores:
+        avisar(f"⚠️ Error al cargar {os.path.basename(ruta)}: {error}")
+    if resumen.filas == 0:
+        raise SinDatosError("No se pudieron cargar datos válidos de ningún archivo")
+
+    estadisticas = resumen.estadisticas()
+    muestra = resumen.muestra
+    if len(muestra) < resumen.filas:
+        avisar(f"ℹ️ Tendencia dibujada con {len(muestra)} de {resumen.filas} simulaciones "
+               "(la mínima y la máxima de cada tramo)")
+
+    grafico_tendencia, grafico_factores = preparar_graficos(muestra, avisar, estadisticas, pool_graficos,
+                                                            formato_graficos, puntos_tendencia,
+                                                            modo_informe, medidor)
+
+    with medidor.etapa("informe", MENSAJE_INFORME):
+        ruta_informe = generar_informe_html(None, grafico_tendencia, grafico_factores, archivos,
+                                            carpeta_salida, estadisticas, modo_informe,
+                                            medidor if diagnostico else None,
+                                            perfil_glucosa=resumen.perfil)
+
+    medidor.progreso(100, "✅ Informe generado")
+    return ruta_informe
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Perfil ambulatorio de glucosa (AGP) y tiempo en rango
+=====================================================
+
+Además de la media, el informe muestra cómo se reparte la glucosa:
+
+- tiempo por debajo, dentro y por encima del rango 80-140 mg/dL
+- percentiles 5/25/50/75/95 por hora del día (el gráfico AGP)
+- resumen por día (simulaciones, media, mínimo, máximo, tiempo en rango)
+- desglose por archivo de origen
+
+Todo sale de histogramas de la glucosa redondeada a 1 mg/dL (la app ya la
+exporta entera), calculados con `np.bincount` en una sola pasada sobre las
+columnas, sin bucles por fila ni ordenaciones: hora × glucosa, día × glucosa
+y origen × banda. Los percentiles, mínimos y máximos se leen de los
+recuentos acumulados, con la misma interpolación lineal que `np.percentile`.
+
+Los histogramas se suman, así que `PerfilGlucosa` se combina como los
+acumuladores de `agregados`: sirve igual para un DataFrame completo, para
+bloques en streaming y para los agregados persistidos de la vigilancia.
+"""
+
+import numpy as np
+import pandas as pd
+
+from agregados import UMBRAL_BAJO, UMBRAL_ALTO
+
+GLUCOSA_MAXIMA = 600  # mg/dL; los valores mayores cuentan en el último intervalo
+ANCHO = GLUCOSA_MAXIMA + 1
+CUANTILES = (5, 25, 50, 75, 95)
+BANDAS = ("bajo", "rango", "alto")
+COLUMNA_GLUCOSA = "Glucosa (mg/dL)"
+NS_POR_HORA = 3_600 * 10**9
+NS_POR_DIA = 24 * NS_POR_HORA
+
+
+def momentos_ns(df):
+    """Momento de cada fila en ns desde 1970 (NaT como el mínimo de int64)"""
+    import esquema
+
+    if esquema.COLUMNA_MOMENTO in df.columns:
+        momentos = df[esquema.COLUMNA_MOMENTO]
+    elif "Fecha" in df.columns and "Hora" in df.columns:
+        momentos = esquema.combinar_fecha_hora(df["Fecha"], df["Hora"])
+    else:
+        return None
+    return momentos.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def _codigos_origen(df):
+    """(códigos, nombres) del archivo de origen de cada fila"""
+    if "archivo_origen" not in df.columns:
+        return None, []
+    serie = df["archivo_origen"]
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Una parte de un DataFrame mayor conserva las categorías de los demás archivos
+        serie = serie.cat.remove_unused_categories()
+        codigos, nombres = serie.cat.codes.to_numpy(), list(serie.cat.categories)
+    else:
+        codigos, nombres = pd.factorize(serie)
+        nombres = list(nombres)
+    return codigos.astype(np.int64), nombres  # Los códigos de categoría pueden ser int8
+
+
+def _percentiles(histogramas, cuantiles):
+    """Percentiles (interpolación lineal) de cada fila de histogramas: matriz filas × cuantiles
+
+    Los valores son los índices de los intervalos (mg/dL); NaN si la fila no tiene datos.
+    """
+    acumulado = histogramas.cumsum(axis=1)
+    n = acumulado[:, -1]
+    resultado = np.full((len(histogramas), len(cuantiles)), np.nan)
+    con_datos = n > 0
+    if not con_datos.any():
+        return resultado
+    acumulado, n = acumulado[con_datos], n[con_datos]
+
+    def valor_en(rango):
+        # Valor del elemento `rango` (desde 0) de la muestra ordenada
+        return (acumulado <= rango[:, None]).sum(axis=1)
+
+    for j, q in enumerate(cuantiles):
+        posicion = q / 100 * (n - 1)
+        abajo = np.floor(posicion)
+        bajo, alto = valor_en(abajo), valor_en(np.ceil(posicion))
+        resultado[con_datos, j] = bajo + (alto - bajo) * (posicion - abajo)
+    return resultado
+
+
+def _por_banda(recuentos):
+    """Dict bajo/rango/alto a partir de una matriz (..., 3) de recuentos"""
+    return {banda: recuentos[..., i] for i, banda in enumerate(BANDAS)}
+
+
+class PerfilGlucosa:
+    """Histogramas combinables de la glucosa por hora, por día y por origen"""
+
+    def __init__(self):
+        self.bandas = np.zeros(3, dtype=np.int64)  # Todas las filas con glucosa, tengan fecha o no
+        self.horas = np.zeros((24, ANCHO), dtype=np.int64)
+        self.dias = np.empty(0, dtype=np.int64)  # Días desde 1970, ordenados
+        self.histogramas_dias = np.zeros((0, ANCHO), dtype=np.int64)
+        self.sumas_dias = np.zeros(0)
+        self.origenes = []  # Nombres, en el orden de las filas de recuentos_origenes
+        self.recuentos_origenes = np.zeros((0, 3), dtype=np.int64)
+        self.sumas_origenes = np.zeros(0)
+
+    @property
+    def simulaciones(self):
+        return int(self.bandas.sum())
+
+    def actualizar(self, df, momentos=None):
+        """Incorpora las filas de un DataFrame (completo o un bloque) y devuelve el perfil
+
+        momentos son los de `momentos_ns(df)` si quien llama ya los tiene.
+        """
+        if COLUMNA_GLUCOSA not in df.columns or df.empty:
+            return self
+        glucosa = pd.to_numeric(df[COLUMNA_GLUCOSA], errors="coerce").to_numpy(dtype=np.float64)
+        validas = np.isfinite(glucosa)
+        banda = (glucosa >= UMBRAL_BAJO).astype(np.int64) + (glucosa > UMBRAL_ALTO)
+        intervalo = np.clip(np.rint(np.where(validas, glucosa, 0)), 0, GLUCOSA_MAXIMA).astype(np.int64)
+        self.bandas += np.bincount(banda[validas], minlength=3)
+
+        if momentos is None:
+            momentos = momentos_ns(df)
+        if momentos is not None:
+            con_fecha = validas & (momentos != np.iinfo(np.int64).min)
+            if con_fecha.any():
+                ns, valor = momentos[con_fecha], intervalo[con_fecha]
+                dia = ns // NS_POR_DIA
+                hora = (ns - dia * NS_POR_DIA) // NS_POR_HORA
+                self.horas += np.bincount(hora * ANCHO + valor, minlength=24 * ANCHO).reshape(24, ANCHO)
+                self._sumar_dias(dia, valor, glucosa[con_fecha])
+
+        codigos, nombres = _codigos_origen(df)
+        if codigos is not None:
+            con_origen = validas & (codigos >= 0)
+            n = len(nombres)
+            recuentos = np.bincount(codigos[con_origen] * 3 + banda[con_origen], minlength=3 * n).reshape(n, 3)
+            sumas = np.bincount(codigos[con_origen], weights=glucosa[con_origen], minlength=n)
+            self._sumar_origenes(nombres, recuentos, sumas)
+        return self
+
+    def _sumar_dias(self, dia, valor, glucosa):
+        """Histograma día × glucosa de un bloque, sumado a los días ya vistos"""
+        primero = int(dia.min())
+        desplazado = dia - primero
+        dias_bloque = int(desplazado.max()) + 1
+        if dias_bloque * ANCHO <= 50 * 10**6:
+            histogramas = np.bincount(desplazado * ANCHO + valor,
+                                      minlength=dias_bloque * ANCHO).reshape(dias_bloque, ANCHO)
+            sumas = np.bincount(desplazado, weights=glucosa, minlength=dias_bloque)
+            presentes = np.flatnonzero(histogramas.any(axis=1))
+            dias, histogramas, sumas = presentes + primero, histogramas[presentes], sumas[presentes]
+        else:  # Fechas muy dispersas (exportaciones editadas a mano): solo los días presentes
+            dias, codigo = np.unique(dia, return_inverse=True)
+            histogramas = np.bincount(codigo * ANCHO + valor, minlength=len(dias) * ANCHO).reshape(-1, ANCHO)
+            sumas = np.bincount(codigo, weights=glucosa, minlength=len(dias))
+        self.dias, (self.histogramas_dias, self.sumas_dias) = _unir(
+            self.dias, (self.histogramas_dias, self.sumas_dias), dias, (histogramas, sumas))
+
+    def _sumar_origenes(self, nombres, recuentos, sumas):
+        posicion = {nombre: i for i, nombre in enumerate(self.origenes)}
+        nuevos = [nombre for nombre in nombres if nombre not in posicion]
+        if nuevos:
+            for nombre in nuevos:
+                posicion[nombre] = len(self.origenes)
+                self.origenes.append(nombre)
+            self.recuentos_origenes = np.vstack([self.recuentos_origenes,
+                                                 np.zeros((len(nuevos), 3), dtype=np.int64)])
+            self.sumas_origenes = np.concatenate([self.sumas_origenes, np.zeros(len(nuevos))])
+        indices = np.array([posicion[nombre] for nombre in nombres], dtype=np.int64)  # Sin repetidos
+        self.recuentos_origenes[indices] += recuentos
+        self.sumas_origenes[indices] += sumas
+
+    def combinar(self, otro):
+        """Une el perfil de otro bloque o proceso"""
+        self.bandas += otro.bandas
+        self.horas += otro.horas
+        self.dias, (self.histogramas_dias, self.sumas_dias) = _unir(
+            self.dias, (self.histogramas_dias, self.sumas_dias), otro.dias, (otro.histogramas_dias, otro.sumas_dias))
+        if otro.origenes:
+            self._sumar_origenes(otro.origenes, otro.recuentos_origenes, otro.sumas_origenes)
+        return self
+
+    def tiempo_en_rango(self):
+        """Fracción de simulaciones por debajo, dentro y por encima del rango"""
+        total = self.simulaciones
+        return {banda: (cuenta / total if total else 0.0) for banda, cuenta in zip(BANDAS, self.bandas)}
+
+    def perfil_horario(self, cuantiles=CUANTILES):
+        """DataFrame de 24 filas: simulaciones y percentiles de glucosa de cada hora del día"""
+        tabla = pd.DataFrame(_percentiles(self.horas, cuantiles), columns=[f"p{q}" for q in cuantiles])
+        tabla.insert(0, "simulaciones", self.horas.sum(axis=1))
+        tabla.insert(0, "hora", np.arange(24))
+        return tabla
+
+    def resumen_diario(self):
+        """DataFrame con una fila por día: simulaciones, media, mínimo, máximo y fracción por banda"""
+        n = self.histogramas_dias.sum(axis=1)
+        extremos = _percentiles(self.histogramas_dias, (0, 100))
+        acumulado = self.histogramas_dias.cumsum(axis=1)
+        bajo = acumulado[:, UMBRAL_BAJO - 1] if len(n) else n
+        alto = n - acumulado[:, UMBRAL_ALTO] if len(n) else n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.DataFrame({
+                "fecha": self.dias.astype("datetime64[D]"),
+                "simulaciones": n,
+                "media": self.sumas_dias / n,
+                "minimo": extremos[:, 0],
+                "maximo": extremos[:, 1],
+                "bajo": bajo / n,
+                "rango": (n - bajo - alto) / n,
+                "alto": alto / n,
+            })
+
+    def por_origen(self):
+        """DataFrame con una fila por origen, de más a menos simulaciones"""
+        n = self.recuentos_origenes.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            tabla = pd.DataFrame({"origen": self.origenes, "simulaciones": n, "media": self.sumas_origenes / n,
+                                  **{banda: cuenta / n for banda, cuenta in
+                                     _por_banda(self.recuentos_origenes).items()}})
+        return tabla.sort_values(["simulaciones", "origen"], ascending=[False, True], ignore_index=True)
+
+
+def _unir(claves, columnas, claves_otro, columnas_otro):
+    """Suma dos conjuntos de filas indexados por claves ordenadas; devuelve (claves, columnas)"""
+    if len(claves_otro) == 0:
+        return claves, columnas
+    if len(claves) == 0:
+        return claves_otro, columnas_otro
+    union = np.union1d(claves, claves_otro)
+    resultado = []
+    for propia, otra in zip(columnas, columnas_otro):
+        suma = np.zeros((len(union),) + propia.shape[1:], dtype=np.result_type(propia, otra))
+        suma[np.searchsorted(union, claves)] += propia
+        suma[np.searchsorted(union, claves_otro)] += otra
+        resultado.append(suma)
+    return union, tuple(resultado)
+
+
+def calcular_perfil(df):
+    """PerfilGlucosa de un DataFrame de simulaciones (normalizado o con Fecha/Hora de texto)"""
+    return PerfilGlucosa().actualizar(df)
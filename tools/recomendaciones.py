@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Reglas de recomendación evaluadas por grupos
+============================================
+
+Las recomendaciones del informe son una tabla declarativa (`REGLAS`): cada
+regla tiene una condición sobre la media de una columna ("glucosa > 140",
+"80 <= glucosa <= 140", "siempre"), una gravedad y un mensaje. Las
+condiciones se interpretan una vez al importar el módulo y se convierten en
+intervalos, así que evaluarlas es comparar matrices:
+
+- `evaluar(df, por)` calcula las medias de cada grupo (archivo, día o una
+  columna como Paciente) con `np.bincount` y evalúa todas las reglas a la vez
+  como una máscara grupos × reglas, sin bucles por grupo ni por regla.
+- `para_medias(medias)` evalúa las mismas reglas sobre las medias globales
+  del informe (también en modo streaming, donde no hay DataFrame).
+
+Las reglas son las de la app web (`generarRecomendaciones` en js/script.js),
+con los textos del informe.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+POR_ARCHIVO = "archivo"
+POR_DIA = "dia"
+
+GRAVEDADES = ("alta", "media", "baja")
+
+# Clave de las condiciones -> columna del DataFrame (las de agregados.COLUMNAS_RESUMEN)
+COLUMNAS = {
+    "glucosa": "Glucosa (mg/dL)",
+    "hidratos": "Hidratos (g)",
+    "caminata": "Caminata (min)",
+    "sueño": "Sueño (h)",
+}
+
+
+class Regla:
+    """Condición sobre la media de una columna, con su gravedad y mensaje"""
+
+    def __init__(self, clave, condicion, gravedad, icono, titulo, texto):
+        self.clave = clave
+        self.condicion = condicion
+        self.gravedad = gravedad
+        self.icono = icono
+        self.titulo = titulo
+        self.texto = texto
+        self.columna, self.minimo, self.minimo_incluido, self.maximo, self.maximo_incluido = \
+            _interpretar(condicion)
+
+    @property
+    def html(self):
+        return f"{self.icono} <strong>{self.titulo}:</strong> {self.texto}"
+
+    @property
+    def mensaje(self):
+        return f"{self.icono} {self.titulo}: {self.texto}"
+
+
+_PATRON_SIMPLE = re.compile(r"^\s*(\w+)\s*(<=|>=|<|>)\s*([\d.]+)\s*$")
+_PATRON_ENTRE = re.compile(r"^\s*([\d.]+)\s*(<=|<)\s*(\w+)\s*(<=|<)\s*([\d.]+)\s*$")
+
+
+def _interpretar(condicion):
+    """(columna, mínimo, incluido, máximo, incluido) de una condición; columna None si es "siempre" """
+    if condicion.strip() == "siempre":
+        return None, -np.inf, True, np.inf, True
+    simple = _PATRON_SIMPLE.match(condicion)
+    if simple:
+        columna, operador, valor = simple.group(1), simple.group(2), float(simple.group(3))
+        if operador.startswith(">"):
+            return columna, valor, operador == ">=", np.inf, True
+        return columna, -np.inf, True, valor, operador == "<="
+    entre = _PATRON_ENTRE.match(condicion)
+    if entre:
+        return (entre.group(3), float(entre.group(1)), entre.group(2) == "<=",
+                float(entre.group(5)), entre.group(4) == "<=")
+    raise ValueError(f"Condición de regla no reconocida: {condicion!r}")
+
+
+REGLAS = (
+    Regla("glucosa_alta", "glucosa > 140", "alta", "🔴", "Glucosa alta",
+          "Considera reducir hidratos de carbono a 45-50g por comida y aumentar caminata a 30-40 minutos diarios."),
+    Regla("glucosa_baja", "glucosa < 80", "alta", "🟡", "Glucosa baja",
+          "Asegúrate de consumir al menos 40g de hidratos por comida y reduce la intensidad de la caminata "
+          "si es muy prolongada."),
+    Regla("buen_control", "80 <= glucosa <= 140", "baja", "🟢", "Buen control",
+          "Mantén estos hábitos. Pequeños ajustes en el sueño (7-8 horas) pueden mejorar aún más el control."),
+    Regla("sueño_insuficiente", "sueño < 7", "media", "💤", "Sueño insuficiente",
+          "Prioriza dormir 7-8 horas. La falta de sueño aumenta la resistencia a la insulina un 25-30%."),
+    Regla("sueño_excesivo", "sueño > 8", "baja", "💤", "Sueño excesivo",
+          "Dormir más de 8 horas de forma habitual puede afectar al metabolismo. 7-8 horas es lo ideal."),
+    Regla("actividad_reducida", "caminata < 30", "media", "🚶‍♂️", "Actividad reducida",
+          "Caminar 30 minutos diarios puede reducir la glucosa en un 15-20%."),
+    Regla("siguiente_paso", "siempre", "baja", "📊", "Siguiente paso",
+          "Exporta más simulaciones de diferentes momentos del día para ver patrones completos."),
+)
+
+
+def _tabla(reglas):
+    """Arrays de la tabla de reglas: índice de columna (-1 si siempre), límites y si se incluyen"""
+    claves = list(COLUMNAS)
+    for regla in reglas:
+        if regla.columna is not None and regla.columna not in COLUMNAS:
+            raise ValueError(f"La regla {regla.clave} usa una columna desconocida: {regla.columna}")
+        if regla.gravedad not in GRAVEDADES:
+            raise ValueError(f"La regla {regla.clave} tiene una gravedad desconocida: {regla.gravedad}")
+    return (np.array([-1 if r.columna is None else claves.index(r.columna) for r in reglas]),
+            np.array([r.minimo for r in reglas]), np.array([r.minimo_incluido for r in reglas]),
+            np.array([r.maximo for r in reglas]), np.array([r.maximo_incluido for r in reglas]))
+
+
+def evaluar_medias(medias, reglas=REGLAS):
+    """Máscara grupos × reglas para una matriz de medias grupos × COLUMNAS (NaN: sin datos)"""
+    columna, minimo, minimo_incluido, maximo, maximo_incluido = _tabla(reglas)
+    valores = medias[:, np.maximum(columna, 0)]
+    with np.errstate(invalid="ignore"):
+        cumple = (((valores > minimo) | (minimo_incluido & (valores == minimo)))
+                  & ((valores < maximo) | (maximo_incluido & (valores == maximo))))
+    return cumple | (columna < 0)
+
+
+def para_medias(medias, reglas=REGLAS):
+    """Reglas que se cumplen con las medias globales ({"glucosa": ..., "sueño": ...}), en orden"""
+    fila = np.array([[np.nan if medias.get(clave) is None else medias[clave] for clave in COLUMNAS]])
+    return [regla for regla, cumple in zip(reglas, evaluar_medias(fila, reglas)[0]) if cumple]
+
+
+def _codigos_grupo(df, por):
+    """(códigos por fila, nombres de los grupos) para agrupar por archivo, día o una columna"""
+    if por == POR_DIA:
+        import esquema
+        if esquema.COLUMNA_MOMENTO not in df.columns:
+            raise ValueError("Para agrupar por día hacen falta las columnas Fecha y Hora")
+        codigos, dias = pd.factorize(df[esquema.COLUMNA_MOMENTO].to_numpy(dtype="datetime64[D]"), sort=True)
+        return codigos, [str(d) for d in np.asarray(dias, dtype="datetime64[D]")]
+    columna = "archivo_origen" if por == POR_ARCHIVO else por
+    if columna not in df.columns:
+        raise ValueError(f"La columna '{columna}' no existe (columnas: {', '.join(df.columns)})")
+    codigos, nombres = pd.factorize(df[columna], sort=True)
+    return codigos, [str(n) for n in nombres]
+
+
+def medias_por_grupo(df, codigos, grupos):
+    """Matriz grupos × COLUMNAS con la media de cada columna (NaN sin datos) y simulaciones por grupo"""
+    codigos = np.asarray(codigos, dtype=np.int64)
+    con_grupo = codigos >= 0
+    simulaciones = np.bincount(codigos[con_grupo], minlength=grupos)
+    medias = np.full((grupos, len(COLUMNAS)), np.nan)
+    for j, columna in enumerate(COLUMNAS.values()):
+        if columna not in df.columns:
+            continue
+        valores = pd.to_numeric(df[columna], errors="coerce").to_numpy(dtype=np.float64)
+        validos = con_grupo & ~np.isnan(valores)
+        n = np.bincount(codigos[validos], minlength=grupos)
+        suma = np.bincount(codigos[validos], weights=valores[validos], minlength=grupos)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            medias[:, j] = suma / n
+    return medias, simulaciones
+
+
+def evaluar(df, por=POR_ARCHIVO, reglas=REGLAS):
+    """Recomendaciones de cada grupo en una tabla larga (una fila por grupo y regla que se cumple)
+
+    por es POR_ARCHIVO, POR_DIA o el nombre de una columna (por ejemplo Paciente).
+    """
+    codigos, nombres = _codigos_grupo(df, por)
+    medias, simulaciones = medias_por_grupo(df, codigos, len(nombres))
+    grupo, regla = np.nonzero(evaluar_medias(medias, reglas))  # Ordenadas por grupo y por regla
+    nombres = np.array(nombres, dtype=object)
+    return pd.DataFrame({
+        "grupo": nombres[grupo],
+        "simulaciones": simulaciones[grupo],
+        "glucosa_media": medias[grupo, list(COLUMNAS).index("glucosa")],
+        "regla": np.array([r.clave for r in reglas], dtype=object)[regla],
+        "gravedad": np.array([r.gravedad for r in reglas], dtype=object)[regla],
+        "mensaje": np.array([r.mensaje for r in reglas], dtype=object)[regla],
+    })
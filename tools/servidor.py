@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Servicio local de análisis (HTTP)
+=================================
+
+Servidor HTTP en localhost al que la app web (o un script) envía
+simulaciones y del que recibe el resumen en JSON o el informe HTML, sin
+descargar archivos ni arrancar el analizador en cada análisis:
+
+    POST   /simulaciones?sesion=S   añade exportaciones a la sesión S (JSON,
+                                    lista de JSON o NDJSON, como los archivos)
+    GET    /resumen?sesion=S        resumen JSON de la sesión
+    GET    /informe?sesion=S        informe HTML de la sesión (&modo=autonomo
+                                    para gráficos de matplotlib)
+    DELETE /simulaciones?sesion=S   olvida la sesión
+    POST   /analizar                resumen (o informe con ?formato=html) de
+                                    un lote, sin guardarlo
+    GET    /salud                   sesiones y simulaciones en memoria
+
+  El nombre de una sesión tiene hasta 64 letras, cifras, ".", "-" o "_".
+
+- Cada sesión mantiene en memoria sus agregados (`agregados.ResumenStreaming`:
+  medias, bandas, perfil y extremos para la tendencia). Un lote nuevo se suma
+  a ellos; el resumen y el informe no vuelven a leer nada. Se guardan como
+  mucho MAX_SESIONES (se olvida la usada hace más tiempo).
+- pandas y los módulos del análisis se importan al arrancar el servicio, no
+  en la primera petición. El informe es interactivo por defecto (el navegador
+  dibuja los gráficos), así que no se espera a matplotlib.
+- Las conexiones se atienden en un grupo acotado de hilos. Se usa HTTP/1.1
+  con keep-alive: un cliente que reutiliza la conexión (`ClienteAnalisis`, o
+  `fetch` en el navegador) no la abre en cada petición. Una conexión
+  inactiva se cierra a los TIEMPO_INACTIVO segundos para liberar su hilo.
+- Escucha en 127.0.0.1 y solo permite (CORS) las páginas de ORIGENES: la app
+  publicada, la abierta desde el disco y las servidas desde localhost. Las
+  peticiones con otro Origin se rechazan (403) y los lotes tienen que ser
+  JSON o NDJSON (415): un formulario o un `fetch` "simple" de otra página,
+  que no pasan por la consulta previa de CORS, no llegan a la sesión.
+"""
+
+import io
+import re
+import json
+import select
+import threading
+import http.client
+from collections import OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+HOST = "127.0.0.1"
+PUERTO = 8765
+HILOS = 4
+SESION = "principal"
+MAX_SESIONES = 64
+MAX_CUERPO = 64 * 2**20  # Bytes como mucho por petición
+PATRON_SESION = re.compile(r"[\w.-]{1,64}")  # El nombre de la sesión aparece en el informe
+TIEMPO_INACTIVO = 15  # Segundos sin peticiones antes de cerrar una conexión keep-alive
+ORIGENES = ("null", "https://whoissif.github.io")  # "null": index.html abierto desde el disco
+HOSTS_LOCALES = ("localhost", "127.0.0.1")
+TIPO_JSON = "application/json; charset=utf-8"
+TIPO_HTML = "text/html; charset=utf-8"
+TIPOS_LOTE = {"application/json": False, "application/x-ndjson": True,  # Content-Type -> es NDJSON
+              "application/ndjson": True, "application/jsonl": True}
+METODOS_IDEMPOTENTES = ("GET", "DELETE")  # `ClienteAnalisis` solo los repite si se pierde la respuesta
+
+
+def _sin_aviso(*args):
+    """Descarta los avisos en modo silencioso"""
+
+
+class PeticionIncorrecta(Exception):
+    """Error del cliente: se responde con el estado HTTP indicado"""
+
+    def __init__(self, mensaje, estado=400):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class ErrorServicio(Exception):
+    """Respuesta de error del servicio en `ClienteAnalisis`"""
+
+    def __init__(self, mensaje, estado):
+        super().__init__(f"{estado}: {mensaje}")
+        self.estado = estado
+
+
+def _a_json(valor):
+    """Números de NumPy (y NaN) a tipos de JSON"""
+    if hasattr(valor, "item"):
+        valor = valor.item()
+    if isinstance(valor, float) and valor != valor:
+        return None
+    if isinstance(valor, dict):
+        return {clave: _a_json(v) for clave, v in valor.items()}
+    return valor
+
+
+class Sesion:
+    """Agregados en memoria de los lotes recibidos con un mismo nombre de sesión"""
+
+    def __init__(self, nombre):
+        import agregados
+
+        self.nombre = nombre
+        self.resumen = agregados.ResumenStreaming()
+        self.lotes = []  # Nombre de cada lote ("<sesión>/lote_N"), como las rutas de un informe
+        self.cerrojo = threading.Lock()
+
+    def anadir(self, df):
+        with self.cerrojo:
+            self.lotes.append(f"{self.nombre}/lote_{len(self.lotes) + 1}")
+            df["archivo_origen"] = self.lotes[-1].rsplit("/", 1)[1]
+            self.resumen.actualizar(df)
+
+
+class ServicioAnalisis:
+    """Sesiones en memoria y respuestas del servicio, sin depender de HTTP"""
+
+    def __init__(self, max_sesiones=MAX_SESIONES):
+        import nucleo
+
+        nucleo.precargar()  # Los módulos del análisis quedan importados antes de la primera petición
+        import informe, recomendaciones  # noqa: F401,E401
+        self.max_sesiones = max_sesiones
+        self._sesiones = OrderedDict()
+        self._cerrojo = threading.Lock()
+        self._cerrojo_graficos = threading.Lock()  # matplotlib no dibuja en varios hilos a la vez
+
+    def sesion(self, nombre, crear=False):
+        """Sesión por nombre (la más reciente al final); None si no existe y no se crea"""
+        with self._cerrojo:
+            sesion = self._sesiones.get(nombre)
+            if sesion is None and crear:
+                sesion = self._sesiones[nombre] = Sesion(nombre)
+                while len(self._sesiones) > self.max_sesiones:
+                    self._sesiones.popitem(last=False)
+            if sesion is not None:
+                self._sesiones.move_to_end(nombre)
+            return sesion
+
+    def olvidar(self, nombre):
+        with self._cerrojo:
+            return self._sesiones.pop(nombre, None) is not None
+
+    def salud(self):
+        with self._cerrojo:
+            sesiones = list(self._sesiones.values())
+        return {"estado": "ok", "sesiones": len(sesiones),
+                "simulaciones": sum(sesion.resumen.filas for sesion in sesiones)}
+
+    @staticmethod
+    def leer_lote(cuerpo, ndjson=False):
+        """DataFrame (esquema del CSV) de las exportaciones JSON o NDJSON recibidas"""
+        import ingesta
+
+        try:
+            df = ingesta.dataframe_json(cuerpo, "lote", ndjson)
+        except (ValueError, TypeError, KeyError) as e:
+            raise PeticionIncorrecta(f"Las simulaciones no son JSON de exportación válido: {e}")
+        if df.empty:
+            raise PeticionIncorrecta("El lote no contiene simulaciones")
+        return df
+
+    def resumen(self, sesion):
+        """Resumen JSON (dict) de los agregados de una sesión"""
+        import recomendaciones
+
+        with sesion.cerrojo:
+            estadisticas = sesion.resumen.estadisticas()
+            tiempo_en_rango = sesion.resumen.perfil.tiempo_en_rango()
+            lotes = len(sesion.lotes)
+        medias = {clave: estadisticas.get(clave) for clave in ("glucosa", "hidratos", "caminata", "sueño")}
+        return _a_json({
+            "sesion": sesion.nombre,
+            "lotes": lotes,
+            "simulaciones": estadisticas["simulaciones"],
+            "medias": medias,
+            "bandas_glucosa": estadisticas["bandas_glucosa"],
+            "tiempo_en_rango": tiempo_en_rango,
+            "recomendaciones": [{"gravedad": regla.gravedad, "mensaje": regla.mensaje}
+                                for regla in recomendaciones.para_medias(medias)],
+        })
+
+    def informe(self, sesion, modo=None):
+        """Informe HTML (texto) de una sesión, generado en memoria"""
+        import informe
+        import nucleo
+
+        modo = modo or informe.MODO_INTERACTIVO
+        if modo not in (informe.MODO_INTERACTIVO, informe.MODO_AUTONOMO):
+            raise PeticionIncorrecta(f"Modo de informe no disponible en el servicio: {modo}")
+        with sesion.cerrojo:
+            if not sesion.resumen.filas:
+                raise PeticionIncorrecta("La sesión no tiene simulaciones", 404)
+            estadisticas = sesion.resumen.estadisticas()
+            with self._cerrojo_graficos if modo != informe.MODO_INTERACTIVO else nullcontext():
+                graficos = nucleo.preparar_graficos(sesion.resumen.muestra, None, estadisticas,
+                                                    modo_informe=modo)
+            salida = nucleo.generar_informe_html(None, *graficos, list(sesion.lotes), None, estadisticas, modo,
+                                                 perfil_glucosa=sesion.resumen.perfil, archivo=io.StringIO())
+        return salida.getvalue()
+
+    def atender(self, metodo, ruta, parametros, cuerpo=b"", ndjson=False):
+        """(estado HTTP, tipo de contenido, cuerpo en bytes) de una petición"""
+        nombre = parametros.get("sesion", [SESION])[0]
+        if not PATRON_SESION.fullmatch(nombre):
+            raise PeticionIncorrecta("Nombre de sesión no válido: hasta 64 letras, cifras, '.', '-' o '_'")
+        if ruta == "/salud" and metodo == "GET":
+            return 200, TIPO_JSON, _json(self.salud())
+
+        if ruta == "/simulaciones" and metodo == "POST":
+            df = self.leer_lote(cuerpo, ndjson)
+            sesion = self.sesion(nombre, crear=True)
+            sesion.anadir(df)
+            return 200, TIPO_JSON, _json(self.resumen(sesion))
+        if ruta == "/simulaciones" and metodo == "DELETE":
+            return (200 if self.olvidar(nombre) else 404), TIPO_JSON, _json({"sesion": nombre})
+
+        if ruta in ("/resumen", "/informe") and metodo == "GET":
+            sesion = self.sesion(nombre)
+            if sesion is None:
+                raise PeticionIncorrecta(f"No existe la sesión {nombre}", 404)
+            if ruta == "/resumen":
+                return 200, TIPO_JSON, _json(self.resumen(sesion))
+            return 200, TIPO_HTML, self.informe(sesion, parametros.get("modo", [None])[0]).encode("utf-8")
+
+        if ruta == "/analizar" and metodo == "POST":
+            sesion = Sesion(nombre)  # De un solo uso: no se guarda
+            sesion.anadir(self.leer_lote(cuerpo, ndjson))
+            if parametros.get("formato", ["json"])[0] == "html":
+                return 200, TIPO_HTML, self.informe(sesion, parametros.get("modo", [None])[0]).encode("utf-8")
+            return 200, TIPO_JSON, _json(self.resumen(sesion))
+
+        raise PeticionIncorrecta(f"No existe {metodo} {ruta}", 404)
+
+
+def _json(datos):
+    return json.dumps(datos, ensure_ascii=False).encode("utf-8")
+
+
+class ManejadorAnalisis(BaseHTTPRequestHandler):
+    """Peticiones HTTP/1.1 (keep-alive) del servicio"""
+
+    protocol_version = "HTTP/1.1"
+    timeout = TIEMPO_INACTIVO
+    disable_nagle_algorithm = True  # Cabeceras y cuerpo van en dos escrituras: sin esto, ~40 ms por respuesta
+    server_version = "EquilibrioDiabetico/1"
+
+    def do_GET(self):
+        self._atender("GET")
+
+    def do_POST(self):
+        self._atender("POST")
+
+    def do_DELETE(self):
+        self._atender("DELETE")
+
+    def do_OPTIONS(self):
+        """Respuesta previa de CORS del navegador"""
+        self.send_response(204)
+        self._cabeceras_cors()
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, DELETE, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Allow-Private-Network", "true")
+        self.send_header("Access-Control-Max-Age", "600")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, formato, *args):
+        self.server.avisar(f"🌐 {self.address_string()} {formato % args}")
+
+    def _origen_permitido(self, origen):
+        return origen in self.server.origenes or urlsplit(origen).hostname in HOSTS_LOCALES
+
+    def _cabeceras_cors(self):
+        origen = self.headers.get("Origin")
+        if origen and self._origen_permitido(origen):
+            self.send_header("Access-Control-Allow-Origin", origen)
+            self.send_header("Vary", "Origin")
+
+    def _comprobar_peticion(self, metodo):
+        """Rechaza otros orígenes y lotes que no son JSON; devuelve si el lote es NDJSON"""
+        origen = self.headers.get("Origin")
+        if origen and not self._origen_permitido(origen):
+            raise PeticionIncorrecta(f"Origen no permitido: {origen}", 403)
+        if metodo != "POST":
+            return False
+        tipo = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if tipo not in TIPOS_LOTE:
+            raise PeticionIncorrecta(f"El lote tiene que ser JSON o NDJSON (Content-Type: {tipo or '-'})", 415)
+        return TIPOS_LOTE[tipo]
+
+    def _leer_cuerpo(self):
+        longitud = self.headers.get("Content-Length")
+        if longitud is None or not longitud.isdigit():
+            raise PeticionIncorrecta("Falta Content-Length", 411)
+        longitud = int(longitud)
+        if longitud > MAX_CUERPO:
+            self.close_connection = True  # El cuerpo no se lee: la conexión no se puede reutilizar
+            raise PeticionIncorrecta(f"El lote supera {MAX_CUERPO // 2**20} MB", 413)
+        return self.rfile.read(longitud)
+
+    def _atender(self, metodo):
+        url = urlsplit(self.path)
+        try:
+            try:
+                ndjson = self._comprobar_peticion(metodo)
+            except PeticionIncorrecta:
+                self.close_connection = metodo == "POST"  # El cuerpo rechazado no se lee
+                raise
+            cuerpo = self._leer_cuerpo() if metodo == "POST" else b""
+            estado, tipo_respuesta, datos = self.server.servicio.atender(
+                metodo, url.path.rstrip("/") or "/", parse_qs(url.query), cuerpo, ndjson=ndjson)
+        except PeticionIncorrecta as e:
+            estado, tipo_respuesta, datos = e.estado, TIPO_JSON, _json({"error": str(e)})
+        except Exception as e:
+            self.server.avisar(f"❌ {metodo} {url.path}: {e}")
+            estado, tipo_respuesta, datos = 500, TIPO_JSON, _json({"error": str(e)})
+
+        self.send_response(estado)
+        self._cabeceras_cors()
+        self.send_header("Content-Type", tipo_respuesta)
+        self.send_header("Content-Length", str(len(datos)))
+        self.send_header("Cache-Control", "no-store")
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(datos)
+
+
+class ServidorAnalisis(HTTPServer):
+    """Servidor HTTP que atiende cada conexión en un grupo acotado de hilos"""
+
+    def __init__(self, direccion, servicio, hilos=HILOS, origenes=ORIGENES, avisar=None):
+        super().__init__(direccion, ManejadorAnalisis)
+        self.servicio = servicio
+        self.origenes = set(origenes)
+        self.avisar = avisar or _sin_aviso
+        self._hilos = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="servicio")
+
+    def process_request(self, peticion, direccion):
+        self._hilos.submit(self._atender_conexion, peticion, direccion)
+
+    def _atender_conexion(self, peticion, direccion):
+        try:
+            self.finish_request(peticion, direccion)
+        except Exception:
+            self.handle_error(peticion, direccion)
+        finally:
+            self.shutdown_request(peticion)
+
+    def server_close(self):
+        super().server_close()
+        self._hilos.shutdown(wait=False, cancel_futures=True)
+
+
+def servir(host=HOST, puerto=PUERTO, hilos=HILOS, origenes=(), avisar=None):
+    """Arranca el servicio y atiende peticiones hasta Ctrl+C"""
+    avisar = avisar or _sin_aviso
+    servidor = ServidorAnalisis((host, puerto), ServicioAnalisis(), hilos, ORIGENES + tuple(origenes), avisar)
+    avisar(f"🌐 Servicio de análisis en http://{host}:{servidor.server_port} ({hilos} hilos); Ctrl+C para salir")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        avisar("👋 Servicio detenido")
+    finally:
+        servidor.server_close()
+
+
+class ClienteAnalisis:
+    """Cliente del servicio con una sola conexión persistente (keep-alive)"""
+
+    def __init__(self, host=HOST, puerto=PUERTO, sesion=SESION, tiempo_maximo=60):
+        self.sesion = sesion
+        self._conexion = http.client.HTTPConnection(host, puerto, timeout=tiempo_maximo)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def cerrar(self):
+        self._conexion.close()
+
+    def _cerrada_por_el_servidor(self):
+        """Entre peticiones la conexión solo tiene algo que leer si el servidor la cerró"""
+        sock = self._conexion.sock
+        return sock is not None and bool(select.select([sock], [], [], 0)[0])
+
+    def _pedir(self, metodo, ruta, cuerpo=None, tipo=None, **parametros):
+        ruta = f"{ruta}?{urlencode(dict(parametros, sesion=self.sesion))}"
+        cabeceras = {"Content-Type": tipo} if tipo else {}
+        for intento in range(2):
+            if self._cerrada_por_el_servidor():
+                self._conexion.close()  # Conexión inactiva cerrada: la petición va por una nueva
+            enviada = False
+            try:
+                try:
+                    self._conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+                    enviada = True
+                except (ConnectionResetError, BrokenPipeError):
+                    pass  # El servidor dejó de leer el cuerpo: puede haber respondido ya (413)
+                respuesta = self._conexion.getresponse()
+                datos = respuesta.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self._conexion.close()
+                # Sin respuesta se repite una vez si la petición no llegó entera o si
+                # repetirla no cambia nada; un POST ya enviado podría duplicar un lote
+                if intento or (enviada and metodo not in METODOS_IDEMPOTENTES):
+                    raise
+        if respuesta.status >= 400:
+            try:
+                mensaje = json.loads(datos)["error"]
+            except (ValueError, KeyError, TypeError):
+                mensaje = datos.decode("utf-8", "replace")
+            raise ErrorServicio(mensaje, respuesta.status)
+        return datos
+
+    @staticmethod
+    def _cuerpo(simulaciones):
+        """(bytes, tipo): bytes ya en JSON/NDJSON o una lista de exportaciones (dicts) como NDJSON"""
+        if isinstance(simulaciones, (bytes, bytearray)):
+            return bytes(simulaciones), TIPO_JSON
+        lineas = (json.dumps(documento, ensure_ascii=False) for documento in simulaciones)
+        return "\n".join(lineas).encode("utf-8"), "application/x-ndjson"
+
+    def enviar(self, simulaciones):
+        """Añade simulaciones a la sesión y devuelve su resumen"""
+        return json.loads(self._pedir("POST", "/simulaciones", *self._cuerpo(simulaciones)))
+
+    def resumen(self):
+        return json.loads(self._pedir("GET", "/resumen"))
+
+    def informe(self, modo=None):
+        """Informe HTML de la sesión (texto)"""
+        parametros = {"modo": modo} if modo else {}
+        return self._pedir("GET", "/informe", **parametros).decode("utf-8")
+
+    def analizar(self, simulaciones, formato="json"):
+        """Resumen (dict) o informe HTML (formato="html") de un lote, sin guardarlo en la sesión"""
+        datos = self._pedir("POST", "/analizar", *self._cuerpo(simulaciones), formato=formato)
+        return datos.decode("utf-8") if formato == "html" else json.loads(datos)
+
+    def borrar(self):
+        """Olvida la sesión en el servicio"""
+        try:
+            self._pedir("DELETE", "/simulaciones")
+        except ErrorServicio as e:
+            if e.estado != 404:
+                raise
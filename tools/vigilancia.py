@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Vigilancia de carpetas con reanálisis incremental
+=================================================
+
+Modo de larga duración para carpetas compartidas donde se van dejando
+exportaciones (CSV y JSON) a lo largo del día:
+
+- Un bucle de sondeo detecta archivos nuevos o modificados. Solo se listan
+  las carpetas cuyo mtime ha cambiado (añadir un archivo cambia el mtime de
+  su carpeta), así que un sondeo no recorre todo el archivo histórico; cada
+  `revision` segundos se comprueban además todas las firmas (tamaño y mtime)
+  para detectar archivos modificados o borrados.
+- Un archivo nuevo se lee cuando su firma no cambia entre dos sondeos (o es
+  más antiguo que `espera`), para no leer descargas a medio escribir.
+- Cada carpeta con exportaciones es un grupo con sus agregados
+  (`agregados.ResumenStreaming`: medias, bandas y extremos para la tendencia).
+  Las filas nuevas se suman a los agregados sin releer lo ya visto; solo si
+  un archivo ya incorporado cambia o desaparece se reconstruye su grupo.
+- Los agregados se guardan en `<salida>/.vigilancia/`, así que al reiniciar
+  no se vuelve a leer nada que no haya cambiado.
+- El informe de un grupo (`<salida>/<grupo>/informe.html`) se regenera
+  cuando pasan `espera` segundos sin cambios en el grupo (antirrebote), y
+  `<salida>/indice.html` enlaza todos.
+
+El tiempo de CPU de cada ciclo es proporcional a los archivos nuevos y al
+número de carpetas, no al tamaño del archivo histórico.
+"""
+
+import os
+import json
+import time
+
+import nucleo
+
+NOMBRE_CARPETA = ".vigilancia"
+NOMBRE_ESTADO = "estado.json"
+NOMBRE_INFORME = "informe.html"
+NOMBRE_INDICE = "indice.html"
+EXTENSIONES = (".csv", ".json", ".ndjson", ".jsonl")
+VERSION = 2  # Los agregados incluyen el perfil de glucosa
+
+INTERVALO = 1.0  # Segundos entre sondeos
+ESPERA = 2.0  # Segundos sin cambios en un grupo antes de regenerar su informe
+REVISION = 300.0  # Segundos entre comprobaciones completas de firmas
+
+
+def _firma(entrada_o_ruta):
+    """Tamaño y mtime (ns) de un os.DirEntry o ruta, o None si ya no existe"""
+    try:
+        st = entrada_o_ruta.stat() if isinstance(entrada_o_ruta, os.DirEntry) else os.stat(entrada_o_ruta)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class Grupo:
+    """Agregados persistidos de las exportaciones de una carpeta"""
+
+    def __init__(self, clave, nombre):
+        import agregados
+        self.clave = clave  # Ruta absoluta de la carpeta
+        self.nombre = nombre  # Carpeta del informe dentro de la salida
+        self.firmas = {}  # ruta -> [tamaño, mtime_ns] de los archivos ya incorporados
+        self.errores = {}  # ruta -> mensaje de los archivos que no se pudieron leer
+        self.resumen = agregados.ResumenStreaming()
+        self.ruta_informe = None
+        self.ultimo_cambio = None  # time.monotonic() del último cambio sin informe regenerado
+        self.sin_guardar = False  # Agregados cambiados desde el último pickle
+
+    @property
+    def pendiente(self):
+        return self.ultimo_cambio is not None
+
+    def incorporar(self, rutas_firmas, avisar):
+        """Lee solo los archivos indicados ({ruta: firma}) y suma sus filas a los agregados"""
+        import ingesta
+
+        resultado = ingesta.cargar_archivos(sorted(rutas_firmas))
+        fallidos = dict(resultado.errores)
+        for ruta, firma in rutas_firmas.items():
+            if ruta in fallidos:
+                self.errores[ruta] = fallidos[ruta]
+                avisar(f"⚠️ Error al cargar {os.path.basename(ruta)}: {fallidos[ruta]}")
+            else:
+                self.errores.pop(ruta, None)
+            self.firmas[ruta] = firma
+        if resultado.filas:
+            self.resumen.actualizar(resultado.df)
+        self.ultimo_cambio = time.monotonic()
+        self.sin_guardar = True
+        return resultado.filas
+
+    def reconstruir(self, avisar, nuevos=None):
+        """Vuelve a calcular los agregados con los archivos que siguen existiendo (y los nuevos)"""
+        import agregados
+
+        vigentes = {ruta: _firma(ruta) for ruta in self.firmas}
+        vigentes = {ruta: firma for ruta, firma in vigentes.items() if firma is not None}
+        vigentes.update(nuevos or {})
+        self.firmas, self.errores = {}, {}
+        self.resumen = agregados.ResumenStreaming()
+        filas = self.incorporar(vigentes, avisar) if vigentes else 0
+        self.ultimo_cambio = time.monotonic()
+        self.sin_guardar = True
+        return filas
+
+    def a_dict(self):
+        """Estado serializable (firmas y agregados se guardan aparte, en pickle)"""
+        return {"clave": self.clave, "nombre": self.nombre, "ruta_informe": self.ruta_informe}
+
+    def agregados(self):
+        """Firmas, errores y agregados juntos: se guardan en el mismo pickle y siempre coinciden"""
+        return {"firmas": self.firmas, "errores": self.errores, "resumen": self.resumen}
+
+    @classmethod
+    def desde_dict(cls, datos, agregados):
+        grupo = cls(datos["clave"], datos["nombre"])
+        grupo.firmas = agregados["firmas"]
+        grupo.errores = agregados["errores"]
+        grupo.resumen = agregados["resumen"]
+        grupo.ruta_informe = datos.get("ruta_informe")
+        return grupo
+
+
+class Vigilante:
+    """Sondea las carpetas, incorpora lo nuevo y regenera los informes afectados"""
+
+    def __init__(self, carpetas, carpeta_salida=None, avisar=None, intervalo=INTERVALO, espera=ESPERA,
+                 revision=REVISION, modo_informe=None, formato_graficos='png', puntos_tendencia=None):
+        self.carpetas = [os.path.abspath(c) for c in carpetas]
+        self.carpeta_salida = os.path.abspath(carpeta_salida or nucleo.obtener_carpeta_informes())
+        self.carpeta_estado = os.path.join(self.carpeta_salida, NOMBRE_CARPETA)
+        self.avisar = avisar or nucleo._sin_aviso
+        self.intervalo = intervalo
+        self.espera = espera
+        self.revision = revision
+        self.opciones = {"modo": modo_informe, "formato": formato_graficos, "puntos": puntos_tendencia}
+
+        self.grupos = {}  # carpeta absoluta -> Grupo
+        self.candidatos = {}  # ruta -> firma vista en el sondeo anterior, aún sin incorporar
+        self._listados = {}  # carpeta -> (mtime_ns, subcarpetas, archivos) del último listado
+        self._ultima_revision = None
+        self.ruta_indice = None
+        self._cargar_estado()
+
+    # --- Estado persistido ---
+
+    def _ruta_resumen(self, nombre):
+        return os.path.join(self.carpeta_estado, f"{nombre}.resumen.pkl")
+
+    def _cargar_estado(self):
+        """Recupera los agregados guardados; un estado dañado o de otra versión se descarta"""
+        import pandas as pd
+
+        try:
+            with open(os.path.join(self.carpeta_estado, NOMBRE_ESTADO), encoding="utf-8") as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return
+        if datos.get("version") != VERSION:
+            return
+        for grupo_dict in datos["grupos"]:
+            try:
+                agregados = pd.read_pickle(self._ruta_resumen(grupo_dict["nombre"]))
+            except Exception:
+                continue  # Sin agregados: el grupo se vuelve a leer entero
+            grupo = Grupo.desde_dict(grupo_dict, agregados)
+            self.grupos[grupo.clave] = grupo
+        self.avisar(f"💾 Estado recuperado: {len(self.grupos)} grupos, "
+                    f"{sum(len(g.firmas) for g in self.grupos.values())} archivos ya incorporados")
+
+    def guardar_estado(self):
+        """Escribe el estado de forma atómica, con los agregados de los grupos que cambiaron
+
+        Las firmas van en el pickle de los agregados de su grupo, así que tras
+        un reinicio un archivo solo consta como leído si sus filas están en
+        los agregados recuperados.
+        """
+        import pandas as pd
+
+        os.makedirs(self.carpeta_estado, exist_ok=True)
+        for grupo in self.grupos.values():
+            if not grupo.sin_guardar:
+                continue
+            ruta = self._ruta_resumen(grupo.nombre)
+            pd.to_pickle(grupo.agregados(), ruta + ".tmp")
+            os.replace(ruta + ".tmp", ruta)
+            grupo.sin_guardar = False
+        ruta = os.path.join(self.carpeta_estado, NOMBRE_ESTADO)
+        with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "grupos": [g.a_dict() for g in self.grupos.values()]}, f)
+        os.replace(ruta + ".tmp", ruta)
+
+    # --- Sondeo ---
+
+    def _listar(self, carpeta, completo):
+        """Subcarpetas y exportaciones de carpeta; reutiliza el listado anterior si su mtime no cambió"""
+        try:
+            mtime = os.stat(carpeta).st_mtime_ns
+        except OSError:
+            self._listados.pop(carpeta, None)
+            return [], {}
+        anterior = self._listados.get(carpeta)
+        if anterior is not None and anterior[0] == mtime and not completo:
+            return anterior[1], None  # Sin entradas nuevas: no hace falta mirar los archivos
+
+        subcarpetas, archivos = [], {}
+        try:
+            with os.scandir(carpeta) as entradas:
+                for entrada in entradas:
+                    if entrada.name.startswith("."):
+                        continue
+                    if entrada.is_dir(follow_symlinks=False):
+                        if os.path.abspath(entrada.path) != self.carpeta_salida:
+                            subcarpetas.append(entrada.path)
+                    elif entrada.name.lower().endswith(EXTENSIONES):
+                        archivos[os.path.abspath(entrada.path)] = entrada
+        except OSError:
+            return [], {}
+        self._listados[carpeta] = (mtime, subcarpetas, list(archivos))
+        return subcarpetas, archivos
+
+    def _grupo(self, carpeta):
+        """Grupo de la carpeta, creado la primera vez"""
+        import informes_grupo
+
+        if carpeta not in self.grupos:
+            usados = {g.nombre.lower() for g in self.grupos.values()}
+            nombre = informes_grupo.nombre_carpeta(os.path.basename(carpeta), usados)
+            self.grupos[carpeta] = Grupo(carpeta, nombre)
+        return self.grupos[carpeta]
+
+    def sondear(self, completo=False):
+        """Un ciclo de detección: devuelve ({grupo: {ruta: firma}} listos para leer, grupos a reconstruir)"""
+        ahora_ns = time.time_ns()
+        vistos = {}  # ruta -> firma de los archivos encontrados en carpetas modificadas
+        pendientes = list(self.carpetas)
+        while pendientes:
+            carpeta = pendientes.pop()
+            subcarpetas, archivos = self._listar(carpeta, completo)
+            pendientes.extend(subcarpetas)
+            if archivos is None:
+                continue
+            for ruta, entrada in archivos.items():
+                grupo = self.grupos.get(os.path.dirname(ruta))
+                if not completo and grupo is not None and (ruta in grupo.firmas):
+                    continue  # Ya incorporado: sus cambios se ven en la revisión completa
+                vistos[ruta] = _firma(entrada)
+
+        # Los candidatos de sondeos anteriores se vuelven a mirar aunque su carpeta no cambie
+        for ruta in self.candidatos:
+            if ruta not in vistos:
+                vistos[ruta] = _firma(ruta)
+
+        listos, reconstruir = {}, set()
+        for ruta, firma in vistos.items():
+            grupo = self._grupo(os.path.dirname(ruta))
+            if firma is None:
+                self.candidatos.pop(ruta, None)
+                if ruta in grupo.firmas:
+                    reconstruir.add(grupo.clave)  # Borrado
+                continue
+            if ruta in grupo.firmas:
+                if grupo.firmas[ruta] != firma:
+                    reconstruir.add(grupo.clave)  # Modificado tras incorporarlo
+                continue
+            estable = self.candidatos.get(ruta) == firma or ahora_ns - firma[1] >= self.espera * 1e9
+            if estable:
+                self.candidatos.pop(ruta, None)
+                listos.setdefault(grupo.clave, {})[ruta] = firma
+            else:
+                self.candidatos[ruta] = firma
+
+        if completo:
+            # Incorporados que ya no aparecen en ninguna carpeta listada
+            for grupo in self.grupos.values():
+                if any(ruta not in vistos for ruta in grupo.firmas):
+                    reconstruir.add(grupo.clave)
+        return listos, reconstruir
+
+    # --- Informes ---
+
+    def regenerar(self, grupo):
+        """Regenera el informe de un grupo con sus agregados"""
+        import informe
+
+        if grupo.resumen.filas == 0:
+            grupo.ultimo_cambio = None
+            return None
+        estadisticas = grupo.resumen.estadisticas()
+        tendencia, factores = nucleo.preparar_graficos(
+            grupo.resumen.muestra, self.avisar, estadisticas, formato=self.opciones["formato"],
+            puntos_tendencia=self.opciones["puntos"], modo_informe=self.opciones["modo"])
+        carpeta = os.path.join(self.carpeta_salida, grupo.nombre)
+        grupo.ruta_informe = nucleo.generar_informe_html(
+            None, tendencia, factores, sorted(grupo.firmas), carpeta, estadisticas,
+            self.opciones["modo"] or informe.MODO_AUTONOMO, nombre_archivo=NOMBRE_INFORME,
+            perfil_glucosa=grupo.resumen.perfil)
+        grupo.ultimo_cambio = None
+        return grupo.ruta_informe
+
+    def _clave_indice(self, grupo):
+        """Nombre del grupo en el índice: su ruta relativa a la carpeta vigilada"""
+        for carpeta in self.carpetas:
+            if grupo.clave.startswith(carpeta + os.sep):
+                return os.path.relpath(grupo.clave, carpeta)
+        return os.path.basename(grupo.clave)
+
+    def escribir_indice(self, segundos):
+        """Página índice con el informe de cada grupo"""
+        import informes_grupo
+
+        resultados = [informes_grupo.ResultadoGrupo(
+            self._clave_indice(g), g.nombre, g.ruta_informe, g.resumen.filas,
+            g.resumen.estadisticas()["glucosa"] if g.ruta_informe else None,
+            error=None if g.ruta_informe else "Sin simulaciones válidas todavía")
+            for g in self.grupos.values() if g.firmas]
+        if resultados:
+            self.ruta_indice = informes_grupo.escribir_indice(
+                resultados, self.carpeta_salida, informes_grupo.POR_CARPETA, segundos,
+                os.path.join(self.carpeta_salida, NOMBRE_INDICE))
+        return self.ruta_indice
+
+    # --- Bucle ---
+
+    def ciclo(self, completo=False):
+        """Sondea, incorpora lo nuevo y regenera los grupos que llevan `espera` s sin cambios
+
+        Devuelve la lista de grupos regenerados.
+        """
+        inicio = time.perf_counter()
+        listos, reconstruir = self.sondear(completo)
+
+        for clave in reconstruir:
+            grupo = self.grupos[clave]
+            filas = grupo.reconstruir(self.avisar, listos.get(clave))
+            self.avisar(f"♻️ {grupo.nombre}: archivos modificados o borrados, agregados recalculados ({filas} filas)")
+        for clave, rutas_firmas in listos.items():
+            if clave in reconstruir:
+                continue  # Ya incorporados al reconstruir
+            grupo = self.grupos[clave]
+            filas = grupo.incorporar(rutas_firmas, self.avisar)
+            self.avisar(f"📥 {grupo.nombre}: {len(rutas_firmas)} archivos nuevos (+{filas} simulaciones)")
+
+        ahora = time.monotonic()
+        listos_para_informe = [g for g in self.grupos.values()
+                               if g.pendiente and ahora - g.ultimo_cambio >= self.espera]
+        regenerados = []
+        for grupo in listos_para_informe:
+            inicio_grupo = time.perf_counter()
+            try:
+                if self.regenerar(grupo):
+                    regenerados.append(grupo)
+                    self.avisar(f"🔄 {grupo.nombre}: informe actualizado ({grupo.resumen.filas} simulaciones, "
+                                f"{time.perf_counter() - inicio_grupo:.2f} s)")
+            except Exception as e:
+                grupo.ultimo_cambio = None
+                self.avisar(f"❌ {grupo.nombre}: no se pudo regenerar el informe: {e}")
+
+        if regenerados or reconstruir:
+            self.guardar_estado()
+            self.escribir_indice(time.perf_counter() - inicio)
+        return regenerados
+
+    def ejecutar(self, ciclos=None):
+        """Bucle de vigilancia hasta Ctrl+C (o `ciclos` sondeos)
+
+        El primer sondeo y uno cada `revision` segundos comprueban todas las firmas.
+        """
+        self.avisar(f"👀 Vigilando {', '.join(self.carpetas)} cada {self.intervalo:g} s "
+                    f"(informes en {self.carpeta_salida})")
+        hechos = 0
+        try:
+            while ciclos is None or hechos < ciclos:
+                inicio = time.monotonic()
+                completo = self._ultima_revision is None or inicio - self._ultima_revision >= self.revision
+                if completo:
+                    self._ultima_revision = inicio
+                self.ciclo(completo)
+                hechos += 1
+                if ciclos is None or hechos < ciclos:
+                    time.sleep(max(self.intervalo - (time.monotonic() - inicio), 0))
+        except KeyboardInterrupt:
+            self.avisar("⏹️ Vigilancia detenida")
+        finally:
+            self.guardar_estado()
+
+    def procesar_pendiente(self):
+        """Incorpora todo lo que haya y regenera ya los informes (sin esperar ni antirrebote)"""
+        espera, self.espera = self.espera, 0
+        try:
+            self.ciclo(completo=True)
+        finally:
+            self.espera = espera
+        self.guardar_estado()